@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Suíte de desempenho de ponta a ponta contra um servidor OpenAI simulado.
+
+Sobe ``mock_openai.MockOpenAI`` em ``127.0.0.1`` e mede:
+
+* ``cli``: latência da CLI completa (processo novo por execução) — tempo
+  total, tempo até os cabeçalhos e até o primeiro delta (lidos do
+  ``metrics.jsonl`` de ``METRICS_LOG``) e pico de memória residente;
+* ``stream``: vazão do *streaming* SSE dentro do processo (tokens/s e MB/s);
+* ``upload``: vazão do envio de anexos para ``/v1/files``;
+* ``memory``: pico de alocações Python (``tracemalloc``) no *stream* e no
+  envio, medido em execuções separadas para não distorcer a vazão.
+
+O resultado é um JSON (``--output``); ``--compare ANTERIOR.json`` mostra a
+variação de cada métrica em relação a uma execução anterior, para comparar
+versões.
+
+Uso::
+
+    python benchmarks/bench_e2e.py --runs 20 --output resultados.json
+    python benchmarks/bench_e2e.py --compare resultados.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+import chatgpt_cli  # noqa: E402
+from chatgpt_cli import Config, stream_chat_completion, transport  # noqa: E402
+from chatgpt_cli.files import upload_attachments  # noqa: E402
+from chatgpt_cli.output import FinalOnlySink  # noqa: E402
+from chatgpt_cli.telemetry import percentile  # noqa: E402
+from mock_openai import MockConfig, MockOpenAI  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def bench_cli(base_url: str, runs: int) -> Dict[str, Any]:
+    """Executa ``gpt`` ``runs`` vezes em processos novos."""
+    wall: List[float] = []
+    headers: List[float] = []
+    first: List[float] = []
+    rss: List[float] = []
+    with tempfile.TemporaryDirectory() as home:
+        config = Path(home) / ".config/chatgpt-cli/config"
+        config.parent.mkdir(parents=True)
+        config.write_text('METRICS_LOG="1"\n', encoding="utf-8")
+        metrics = Path(home) / ".local/state/chatgpt-cli/metrics.jsonl"
+        env = dict(
+            os.environ,
+            HOME=home,
+            OPENAI_API_KEY="bench",
+            OPENAI_BASE_URL=base_url,
+            PYTHONPATH=str(ROOT),
+        )
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, str(ROOT / "wrappers/gpt"), "--no-daemon", "pergunta"],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            assert proc.stderr is not None
+            err = proc.stderr.read()
+            proc.stderr.close()
+            # ``wait4`` devolve também o uso de recursos do filho.
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall.append((time.perf_counter() - start) * 1000)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            if proc.returncode != 0:
+                raise RuntimeError(err.decode("utf-8", "replace"))
+            # ``ru_maxrss`` é em KiB no Linux e em bytes no macOS.
+            rss.append(usage.ru_maxrss / (MB if sys.platform == "darwin" else 1024))
+        for line in metrics.read_text(encoding="utf-8").splitlines():
+            spans = {s["name"]: s for s in json.loads(line)["spans"]}
+            headers.append(spans["chat_headers"]["start_ms"] + spans["chat_headers"]["ms"])
+            stream = spans["stream_chat_completion"]
+            first.append(stream["start_ms"] + stream.get("first_delta_ms", stream["ms"]))
+    return {
+        "runs": runs,
+        "wall_ms": _summary(wall),
+        "headers_ms": _summary(headers),
+        "first_delta_ms": _summary(first),
+        "max_rss_mb": _summary(rss),
+    }
+
+
+def _stream_once() -> float:
+    sink = FinalOnlySink(io.StringIO())
+    start = time.perf_counter()
+    messages = [{"role": "user", "content": "x"}]
+    stream_chat_completion("bench", messages, Config("m", 0.0), 30.0, None, sink)
+    return time.perf_counter() - start
+
+
+def bench_stream(mock: MockOpenAI, repeat: int) -> Dict[str, Any]:
+    cfg = mock.config
+    seconds = min(_stream_once() for _ in range(repeat))
+    size = len(cfg.token) * cfg.tokens
+    return {
+        "tokens": cfg.tokens,
+        "chunk_tokens": cfg.chunk_tokens,
+        "seconds": seconds,
+        "tokens_per_s": cfg.tokens / seconds,
+        "mb_per_s": size / MB / seconds,
+    }
+
+
+def _make_files(directory: Path, count: int, size_mb: float) -> List[Tuple[str, Path]]:
+    files = []
+    block = os.urandom(MB)
+    for i in range(count):
+        path = directory / f"anexo{i}.bin"
+        with path.open("wb") as f:
+            remaining = int(size_mb * MB)
+            while remaining > 0:
+                f.write(block[: min(MB, remaining)])
+                remaining -= MB
+        files.append((f"input_file_{i}", path))
+    return files
+
+
+def bench_upload(files: List[Tuple[str, Path]], concurrency: int) -> Dict[str, Any]:
+    total = sum(p.stat().st_size for _, p in files)
+    start = time.perf_counter()
+    upload_attachments(files, "bench", 60.0, None, concurrency)
+    seconds = time.perf_counter() - start
+    return {
+        "files": len(files),
+        "total_mb": total / MB,
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "mb_per_s": total / MB / seconds,
+    }
+
+
+def _peak(fn: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / MB
+    finally:
+        tracemalloc.stop()
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any], prefix: str = "") -> List[str]:
+    """Linhas ``métrica: anterior -> atual (±x%)`` para valores que mudaram."""
+    lines: List[str] = []
+    for key, value in current.items():
+        name = f"{prefix}{key}"
+        old = previous.get(key) if isinstance(previous, dict) else None
+        if isinstance(value, dict):
+            lines.extend(compare(value, old or {}, name + "."))
+        elif (
+            isinstance(value, (int, float))
+            and isinstance(old, (int, float))
+            and old
+            and value != old  # parâmetros iguais não interessam
+        ):
+            lines.append(f"{name}: {old:.3f} -> {value:.3f} ({(value - old) / old:+.1%})")
+    return lines
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=10, help="Execuções da CLI completa.")
+    ap.add_argument("--tokens", type=int, default=100_000, help="Tokens no teste de vazão do stream.")
+    ap.add_argument("--cli-tokens", type=int, default=200, help="Tokens por resposta no teste da CLI.")
+    ap.add_argument("--chunk-tokens", type=int, default=1, help="Tokens por evento SSE.")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Latência simulada antes dos cabeçalhos.")
+    ap.add_argument("--token-rate", type=float, default=0.0, help="Tokens/s simulados na CLI (0 = sem pausa).")
+    ap.add_argument("--upload-files", type=int, default=4)
+    ap.add_argument("--upload-mb", type=float, default=16.0, help="Tamanho de cada anexo (MiB).")
+    ap.add_argument("--repeat", type=int, default=3, help="Repetições dos testes em processo (melhor tempo).")
+    ap.add_argument("--output", type=Path, help="Grava o resultado em JSON.")
+    ap.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparação.")
+    ap.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = ap.parse_args()
+
+    results: Dict[str, Any] = {
+        "version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "json")},
+    }
+    cli_config = MockConfig(args.cli_tokens, args.token_rate, args.chunk_tokens, args.latency_ms)
+    with MockOpenAI(cli_config) as mock:
+        results["cli"] = bench_cli(mock.base_url, args.runs)
+
+    with MockOpenAI(MockConfig(args.tokens, 0.0, args.chunk_tokens)) as mock, \
+            tempfile.TemporaryDirectory() as tmp:
+        transport.API_BASE = mock.base_url
+        results["stream"] = bench_stream(mock, args.repeat)
+        files = _make_files(Path(tmp), args.upload_files, args.upload_mb)
+        results["upload"] = min(
+            (bench_upload(files, args.upload_files) for _ in range(args.repeat)),
+            key=lambda r: r["seconds"],
+        )
+        results["memory"] = {
+            "stream_peak_mb": _peak(_stream_once),
+            "upload_peak_mb": _peak(lambda: upload_attachments(files, "bench", 60.0, None, 1)),
+        }
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print(results)
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"\nComparação com {args.compare} ({previous.get('version')}):")
+        keep = {k: results[k] for k in ("cli", "stream", "upload", "memory")}
+        for line in compare(keep, previous):
+            print("  " + line)
+
+
+def _version() -> str:
+    for line in (ROOT / "pyproject.toml").read_text(encoding="utf-8").splitlines():
+        if line.startswith("version"):
+            return line.split("=", 1)[1].strip().strip('"')
+    return getattr(chatgpt_cli, "__version__", "desconhecida")
+
+
+def _print(results: Dict[str, Any]) -> None:
+    cli = results["cli"]
+    print(
+        f"cli ({cli['runs']} execuções): total p50 {cli['wall_ms']['p50']:.1f} ms, "
+        f"p90 {cli['wall_ms']['p90']:.1f} ms; primeiro delta p50 "
+        f"{cli['first_delta_ms']['p50']:.1f} ms; RSS máx. {cli['max_rss_mb']['max']:.1f} MiB"
+    )
+    s = results["stream"]
+    print(f"stream: {s['tokens_per_s']:,.0f} tokens/s ({s['mb_per_s']:.1f} MiB/s)")
+    u = results["upload"]
+    print(f"upload: {u['total_mb']:.0f} MiB em {u['seconds']:.2f}s ({u['mb_per_s']:.1f} MiB/s)")
+    m = results["memory"]
+    print(f"memória: pico {m['stream_peak_mb']:.1f} MiB no stream, {m['upload_peak_mb']:.1f} MiB no upload")
+
+
+if __name__ == "__main__":
+    main()
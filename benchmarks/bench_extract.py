@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Compara a extração antiga de pacotes de atualização com a de passagem única.
+
+A implementação anterior de ``_safe_extract`` chamava ``tar.getmembers()``
+(descomprimindo o arquivo inteiro só para listar os membros), resolvia cada
+caminho com ``Path.resolve()`` e depois ``extractall`` lia o arquivo de novo.
+``update_strategies.extract_archive`` valida e grava cada membro durante uma
+única leitura em modo *stream* e troca o diretório de *staging* no lugar.
+
+Um ``.tar.gz`` sintético é gerado em um diretório temporário; cada variante é
+executada ``--repeat`` vezes e o melhor tempo é mantido.
+
+Uso::
+
+    python benchmarks/bench_extract.py --files 4000 --size-kb 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from update_strategies import extract_archive  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def legacy_extract(archive: Path, dest: Path) -> None:
+    """Cópia da implementação anterior: duas leituras do arquivo."""
+    dest.mkdir(parents=True)
+    dest_path = dest.resolve()
+    with tarfile.open(archive) as tar:
+        for member in tar.getmembers():
+            member_path = (dest_path / member.name).resolve()
+            if not str(member_path).startswith(str(dest_path)):
+                raise ValueError(f"Path traversal detected: {member.name}")
+        tar.extractall(dest_path, filter="data")
+
+
+def make_archive(path: Path, files: int, size_kb: int) -> int:
+    """Gera ``files`` arquivos meio aleatórios, meio repetitivos (compressíveis)."""
+    half = size_kb * 512
+    total = 0
+    with tarfile.open(path, "w:gz", compresslevel=1) as tar:
+        for i in range(files):
+            data = os.urandom(half) + bytes([i % 251]) * half
+            info = tarfile.TarInfo(f"pkg/d{i % 64:02d}/f{i}.bin")
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+            total += len(data)
+    return total
+
+
+def _best(fn: Callable[[Path], None], work: Path, repeat: int) -> float:
+    best = float("inf")
+    for i in range(repeat):
+        dest = work / f"run{i}" / "release"
+        dest.parent.mkdir()
+        start = time.perf_counter()
+        fn(dest)
+        best = min(best, time.perf_counter() - start)
+        shutil.rmtree(dest.parent)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=4000, help="Arquivos no pacote sintético.")
+    ap.add_argument("--size-kb", type=int, default=16, help="Tamanho de cada arquivo (KiB).")
+    ap.add_argument("--repeat", type=int, default=3, help="Repetições de cada variante (melhor tempo).")
+    ap.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        archive = work / "pacote.tar.gz"
+        total = make_archive(archive, args.files, args.size_kb)
+        legacy = _best(lambda d: legacy_extract(archive, d), work, args.repeat)
+        single = _best(lambda d: extract_archive(archive, d), work, args.repeat)
+        results: Dict[str, Any] = {
+            "files": args.files,
+            "total_mb": total / MB,
+            "archive_mb": archive.stat().st_size / MB,
+            "legacy_s": legacy,
+            "single_pass_s": single,
+            "speedup": legacy / single if single else 0.0,
+        }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{results['files']} arquivos, {results['total_mb']:.0f} MiB "
+        f"({results['archive_mb']:.0f} MiB comprimidos)"
+    )
+    print(f"antiga (getmembers + extractall): {legacy:.2f}s")
+    print(f"passagem única com staging:       {single:.2f}s ({results['speedup']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
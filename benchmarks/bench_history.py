@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark da busca no histórico (``chatgpt_cli.history``).
+
+Gera ``--entries`` interações sintéticas em um diretório temporário, mede a
+indexação inicial de um ``history.jsonl`` existente e compara a busca FTS5
+com a varredura linear do JSONL (equivalente ao antigo ``grep``).
+
+Uso::
+
+    python benchmarks/bench_history.py --entries 200000 --queries 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from chatgpt_cli.history import HistoryStore  # noqa: E402
+
+WORDS = (
+    "python sessão índice consulta arquivo rede tempo cache token modelo "
+    "resposta anexo pacote chave janela servidor cliente fluxo erro teste"
+).split()
+
+
+def _generate(path: Path, entries: int, rng: random.Random) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(entries):
+            record = {
+                "timestamp": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00",
+                "session": f"s{i % 10}",
+                "prompt": " ".join(rng.choices(WORDS, k=12)) + f" termo{i}",
+                "response": " ".join(rng.choices(WORDS, k=80)),
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _linear(path: Path, terms: List[str], limit: int) -> int:
+    found = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            text = record["prompt"] + " " + record["response"]
+            if all(t in text for t in terms):
+                found += 1
+                if found >= limit:
+                    break
+    return found
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--entries", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+    rng = random.Random(42)
+    queries = [f"termo{rng.randrange(args.entries)}" for _ in range(args.queries)]
+    results: Dict[str, float] = {"entries": args.entries}
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        _generate(base / "history.jsonl", args.entries, rng)
+        store = HistoryStore(base, max_bytes=0)
+        start = time.perf_counter()
+        store.catch_up()
+        results["index_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for q in queries:
+            store.search(q, limit=20)
+        results["fts_ms_per_query"] = (time.perf_counter() - start) * 1000 / len(queries)
+
+        sample = queries[: max(1, len(queries) // 10)]
+        start = time.perf_counter()
+        for q in sample:
+            _linear(base / "history.jsonl", [q], 20)
+        results["scan_ms_per_query"] = (time.perf_counter() - start) * 1000 / len(sample)
+
+        start = time.perf_counter()
+        store.append("s0", "nova pergunta", "nova resposta")
+        results["append_ms"] = (time.perf_counter() - start) * 1000
+        store.close()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"indexação inicial de {args.entries} interações: {results['index_seconds']:.2f}s")
+    print(f"busca FTS5: {results['fts_ms_per_query']:.2f} ms/consulta")
+    print(f"varredura linear: {results['scan_ms_per_query']:.1f} ms/consulta")
+    print(f"append + indexação incremental: {results['append_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
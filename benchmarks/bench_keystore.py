@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Latência de desbloqueio da chave criptografada: primeira vez vs. agente.
+
+Grava uma chave com ``secure_storage.save_api_key(..., passphrase=...)`` em
+um diretório temporário e mede ``load_api_key``:
+
+* ``plain``: arquivo em texto puro (referência);
+* ``first_unlock``: sem agente — derivação ``scrypt`` completa + decifração;
+* ``cached_unlock``: com o agente de ``key_agent`` já ativo — uma ida e
+  volta pelo *socket* Unix + decifração.
+
+Uso::
+
+    python benchmarks/bench_keystore.py --kdf-cost 65536 --runs 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from chatgpt_cli import key_agent  # noqa: E402
+from chatgpt_cli.secure_storage import KdfParams, KeyLocation, load_api_key, save_api_key  # noqa: E402
+from chatgpt_cli.telemetry import percentile  # noqa: E402
+
+
+def _times(fn: Callable[[], Any], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {"p50_ms": percentile(samples, 50), "p90_ms": percentile(samples, 90), "runs": len(samples)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--kdf-cost", type=int, default=1 << 16, help="Parâmetro n do scrypt.")
+    ap.add_argument("--runs", type=int, default=200, help="Desbloqueios com o agente ativo.")
+    ap.add_argument("--first-runs", type=int, default=5, help="Desbloqueios completos (sem agente).")
+    ap.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = ap.parse_args()
+
+    api_key = "sk-" + "x" * 48
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        plain = KeyLocation(base_dir=base / "plain")
+        save_api_key(api_key, loc=plain)
+        encrypted = KeyLocation(base_dir=base / "enc")
+        save_api_key(api_key, loc=encrypted, passphrase="senha", kdf=KdfParams(n=args.kdf_cost))
+        sock = base / "agent.sock"
+
+        def unlock(agent: bool) -> None:
+            assert load_api_key(
+                loc=encrypted,
+                passphrase=lambda: "senha",
+                agent=sock if agent else None,
+                agent_ttl=60.0 if agent else 0.0,
+            ) == api_key
+
+        results: Dict[str, Any] = {
+            "kdf": {"name": "scrypt", "n": args.kdf_cost, "r": 8, "p": 1},
+            "plain": _summary(_times(lambda: load_api_key(loc=plain), args.runs)),
+            "first_unlock": _summary(_times(lambda: unlock(False), args.first_runs)),
+        }
+        unlock(True)  # paga a derivação uma vez e inicia o agente
+        try:
+            results["cached_unlock"] = _summary(_times(lambda: unlock(True), args.runs))
+        finally:
+            key_agent.forget(sock)
+    first = results["first_unlock"]["p50_ms"]
+    cached = results["cached_unlock"]["p50_ms"]
+    results["speedup"] = first / cached if cached else 0.0
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"texto puro:               p50 {results['plain']['p50_ms']:.3f} ms")
+    print(f"primeiro desbloqueio:     p50 {first:.1f} ms (scrypt n={args.kdf_cost})")
+    print(f"desbloqueio via agente:   p50 {cached:.3f} ms ({results['speedup']:.0f}x mais rápido)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark dos *sinks* de saída de ``chatgpt_cli.output``.
+
+Escreve ``--tokens`` *deltas* em um arquivo descartável através de cada
+política e conta as chamadas ``write`` que chegam ao descritor (uma por
+*syscall*), comparando com o antigo ``print(c, end="", flush=True)``.
+
+Uso::
+
+    python benchmarks/bench_output.py --tokens 20000 --token-rate 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, TextIO
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from chatgpt_cli.output import (  # noqa: E402
+    BufferedSink,
+    CoalescingSink,
+    FinalOnlySink,
+    OutputSink,
+)
+
+
+class CountingRaw(io.FileIO):
+    """Arquivo cru que conta as escritas efetivas no descritor."""
+
+    writes = 0
+
+    def write(self, b) -> int:  # type: ignore[override]
+        CountingRaw.writes += 1
+        return super().write(b)
+
+
+def _stream() -> TextIO:
+    raw = CountingRaw(os.devnull, "w")
+    return io.TextIOWrapper(io.BufferedWriter(raw), encoding="utf-8")
+
+
+class PrintSink(OutputSink):
+    """Comportamento anterior: um ``flush`` por *delta*."""
+
+    def write(self, text: str) -> None:
+        print(text, end="", flush=True, file=self.stream)
+
+
+def run(factory: Callable[[TextIO], OutputSink], tokens: int, rate: float) -> Dict[str, float]:
+    CountingRaw.writes = 0
+    stream = _stream()
+    sink = factory(stream)
+    gap = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    for i in range(tokens):
+        sink.write("tok ")
+        if gap:
+            target = start + (i + 1) * gap
+            while time.perf_counter() < target:
+                pass
+    sink.close()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time()
+    stream.close()
+    return {"seconds": elapsed, "writes": CountingRaw.writes, "cpu": cpu}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tokens", type=int, default=20_000)
+    ap.add_argument("--token-rate", type=float, default=0.0, help="Tokens/s simulados (0 = sem pausa).")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+    factories: Dict[str, Callable[[TextIO], OutputSink]] = {
+        "print": PrintSink,
+        "coalescing": lambda s: CoalescingSink(s),
+        "buffered": BufferedSink,
+        "final": FinalOnlySink,
+    }
+    results = {}
+    for name, factory in factories.items():
+        before = time.process_time()
+        r = run(factory, args.tokens, args.token_rate)
+        r["cpu"] -= before
+        results[name] = r
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        print(f"{name:>10}: {r['writes']:>6} writes, {r['seconds']:.3f}s, cpu {r['cpu']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Micro-benchmark do parser SSE contra o laço anterior baseado em linhas.
+
+Gera (ou lê, com ``--stream``) uma gravação de eventos no formato enviado por
+``/v1/chat/completions`` e mede eventos/s de duas formas, ambas sobre um
+``requests.Response`` real alimentado por ``io.BytesIO``:
+
+* ``legacy``: ``iter_lines`` + ``decode``/``startswith``/``strip`` por linha,
+  como ``stream_chat_completion`` fazia antes do ``SSEParser``;
+* ``parser``: ``iter_content(chunk_size)`` + ``sse.iter_deltas``.
+
+Uso::
+
+    python benchmarks/bench_sse.py --events 50000 --chunk-size 1024
+    python benchmarks/bench_sse.py --record stream.sse  # grava a entrada
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from chatgpt_cli.sse import iter_deltas  # noqa: E402
+
+WORDS: List[str] = ["olá", " mundo", ",", " streaming", " de", " tokens", " ✓", "\n"]
+
+
+def synth_stream(events: int) -> bytes:
+    """Reproduz o formato de uma resposta real, com metadados por evento."""
+    out = io.BytesIO()
+    for i in range(events):
+        event = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {"index": 0, "delta": {"content": WORDS[i % len(WORDS)]}, "finish_reason": None}
+            ],
+        }
+        out.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+    out.write(b"data: [DONE]\n\n")
+    return out.getvalue()
+
+
+def _response(wire: bytes) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.raw = io.BytesIO(wire)
+    return resp
+
+
+def legacy(wire: bytes, chunk_size: int) -> int:
+    count = 0
+    for line in _response(wire).iter_lines():
+        if not line:
+            continue
+        decoded = line.decode("utf-8")
+        if decoded.startswith("data:"):
+            content = decoded[len("data:") :].strip()
+            if content == "[DONE]":
+                break
+            try:
+                event = json.loads(content)
+            except Exception:
+                continue
+            c = event.get("choices", [{}])[0].get("delta", {}).get("content")
+            if c:
+                count += 1
+    return count
+
+
+def parser(wire: bytes, chunk_size: int) -> int:
+    return sum(1 for _ in iter_deltas(_response(wire).iter_content(chunk_size)))
+
+
+def measure(fn: Callable[[bytes, int], int], wire: bytes, chunk_size: int, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn(wire, chunk_size)
+        best = min(best, time.perf_counter() - start)
+    return {"deltas": count, "seconds": best, "events_per_s": count / best}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--events", type=int, default=50_000)
+    ap.add_argument("--chunk-size", type=int, default=1024)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--stream", type=Path, help="Arquivo SSE gravado a usar como entrada.")
+    ap.add_argument("--record", type=Path, help="Grava o fluxo sintético neste arquivo.")
+    ap.add_argument("--json", action="store_true", help="Emite o resultado em JSON.")
+    args = ap.parse_args()
+
+    wire = args.stream.read_bytes() if args.stream else synth_stream(args.events)
+    if args.record:
+        args.record.write_bytes(wire)
+    results = {
+        name: measure(fn, wire, args.chunk_size, args.repeat)
+        for name, fn in (("legacy", legacy), ("parser", parser))
+    }
+    if results["legacy"]["deltas"] != results["parser"]["deltas"]:
+        raise SystemExit("Resultados divergentes entre as implementações")
+    if args.json:
+        print(json.dumps({"bytes": len(wire), "chunk_size": args.chunk_size, **results}, indent=2))
+        return
+    for name, r in results.items():
+        print(f"{name:>7}: {r['deltas']} deltas em {r['seconds']:.3f}s -> {r['events_per_s']:,.0f} eventos/s")
+    speedup = results["parser"]["events_per_s"] / results["legacy"]["events_per_s"]
+    print(f"ganho: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Servidor HTTP local que imita os *endpoints* da OpenAI usados pela CLI.
+
+Atende ``POST /v1/chat/completions`` (SSE com ritmo, agrupamento e latência
+configuráveis; também sem *streaming*), ``POST /v1/files`` (lê e descarta o
+corpo *multipart*, devolvendo um ``file_id``), ``DELETE /v1/files/<id>`` e
+``POST /v1/responses``. Serve de alvo reproduzível para
+``benchmarks/bench_e2e.py`` e pode ser iniciado à parte::
+
+    python benchmarks/mock_openai.py --port 8765 --token-rate 50 --latency-ms 200
+
+Para apontar a CLI para ele, use ``OPENAI_BASE_URL`` (ou ``API_BASE`` no
+arquivo de configuração) com ``MockOpenAI.base_url``; dentro do processo,
+``chatgpt_cli.transport.set_api_base`` tem o mesmo efeito.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+READ_BLOCK: int = 1 << 16
+
+
+@dataclass
+class MockConfig:
+    """Comportamento simulado do modelo e da rede.
+
+    ``tokens`` deltas de ``token`` são emitidos a ``token_rate`` por segundo
+    (``0`` = sem pausa), ``chunk_tokens`` por evento SSE, depois de
+    ``latency_ms`` de espera antes dos cabeçalhos.
+    """
+
+    tokens: int = 200
+    token_rate: float = 0.0
+    chunk_tokens: int = 1
+    latency_ms: float = 0.0
+    token: str = "tok "
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _latency(self) -> None:
+        if self.server.config.latency_ms:
+            time.sleep(self.server.config.latency_ms / 1000)
+
+    def _json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _drain(self) -> int:
+        """Consome o corpo da requisição em blocos; devolve o total lido."""
+        remaining = int(self.headers.get("Content-Length") or 0)
+        total = 0
+        while remaining > 0:
+            block = self.rfile.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            total += len(block)
+            remaining -= len(block)
+        return total
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length))
+            with self.server.lock:
+                self.server.chats.append((self.headers.get("Authorization"), payload))
+            self._latency()
+            if payload.get("stream"):
+                self._stream()
+            else:
+                self._json(200, {
+                    "choices": [{"message": {"role": "assistant", "content": self._text()}}],
+                    "usage": {"completion_tokens": self.server.config.tokens},
+                })
+        elif path.endswith("/files"):
+            size = self._drain()
+            self._latency()
+            with self.server.lock:
+                self.server.uploaded_bytes += size
+                self.server.next_id += 1
+                file_id = f"file-mock{self.server.next_id}"
+            self._json(200, {"id": file_id, "bytes": size})
+        elif path.endswith("/responses"):
+            self._drain()
+            self._latency()
+            content = [{"type": "text", "text": self._text()}]
+            self._json(200, {"output": [{"content": content}]})
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def _text(self) -> str:
+        return self.server.config.token * self.server.config.tokens
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        self._json(200, {"id": self.path.rsplit("/", 1)[-1], "deleted": True})
+
+    def _stream(self) -> None:
+        cfg = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        per_event = max(1, cfg.chunk_tokens)
+        gap = per_event / cfg.token_rate if cfg.token_rate else 0.0
+        start = time.perf_counter()
+        sent = 0
+        while sent < cfg.tokens:
+            n = min(per_event, cfg.tokens - sent)
+            event = {"choices": [{"delta": {"content": cfg.token * n}}]}
+            self._chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+            sent += n
+            if gap:
+                delay = start + (sent / per_event) * gap - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        self._chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, config: MockConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.uploaded_bytes = 0
+        self.next_id = 0
+        self.chats: List[Tuple[Optional[str], Dict[str, Any]]] = []  # (Authorization, corpo)
+
+
+class MockOpenAI:
+    """Servidor em *thread* própria, usado como gerenciador de contexto."""
+
+    def __init__(self, config: Optional[MockConfig] = None, port: int = 0) -> None:
+        self.server = _Server(("127.0.0.1", port), config or MockConfig())
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def config(self) -> MockConfig:
+        return self.server.config
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "MockOpenAI":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--tokens", type=int, default=200)
+    ap.add_argument("--token-rate", type=float, default=0.0)
+    ap.add_argument("--chunk-tokens", type=int, default=1)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    config = MockConfig(args.tokens, args.token_rate, args.chunk_tokens, args.latency_ms)
+    with MockOpenAI(config, args.port) as mock:
+        print(f"Servindo em {mock.base_url} (Ctrl-C encerra)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
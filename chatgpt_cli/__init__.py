@@ -1,28 +1,99 @@
 # -*- coding: utf-8 -*-
 
-import argparse
 import json
 import os
 import sys
 import time
 from functools import lru_cache
-from configparser import ConfigParser, MissingSectionHeaderError, ParsingError
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from io import StringIO
 
-import requests
-from requests import Response
-from requests.exceptions import RequestException
-from .secure_storage import KeyLocation, load_api_key
+from .backend import (
+    Backend,
+    BackendError,
+    auth_headers,
+    inline_attachments,
+    cache_scope,
+    resolve_backend,
+)
+from .secure_storage import KeyLocation, KeyStoreError, key_unattended, load_api_key
+from .cache import (
+    ResponseCache,
+    cache_key,
+    replay,
+)
+from .context import (
+    ContextResult,
+    ContextWindow,
+    estimate_tokens,
+    message_tokens,
+)
+from .files import (
+    FileLedger,
+    FileOwner,
+    UploadCache,
+    UploadError,
+    UploadResult,
+    attachment_key,
+    delete_files,
+    sha256_file,
+    spawn_background_delete,
+    upload_attachments,
+)
+from .output import (
+    OutputSink,
+    select_sink,
+)
+from .history import (
+    DEFAULT_SEARCH_LIMIT,
+    format_hit,
+    get_history,
+    parse_since,
+)
+from .sessions import get_store
+from .settings import (
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_STREAM_CHUNK_SIZE,
+    Settings,
+    load_settings,
+)
+from .sse import iter_deltas
+from .telemetry import (
+    TELEMETRY,
+    Span,
+    aggregate,
+    format_summary,
+    read_metrics,
+    span,
+)
+from .transport import (
+    api_url,
+    configure_transport,
+    get_session,
+    request_errors,
+    set_api_base,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import argparse
+
+    from requests import Response
+
+    from .profiles import Profile
 
 CONFIG_PATH = Path.home() / '.config/chatgpt-cli/config'
+PROFILES_PATH = Path.home() / '.config/chatgpt-cli/profiles.ini'
 STATE_DIR = Path.home() / '.local/state/chatgpt-cli'
 HISTORY_FILE = STATE_DIR / 'history.jsonl'
 SESSIONS_DIR = STATE_DIR / 'sessions'
-DEFAULT_REQUEST_TIMEOUT: float = 30.0
+UPLOAD_CACHE_FILE = STATE_DIR / 'uploads.json'
+UPLOAD_LEDGER_FILE = STATE_DIR / 'uploaded_files.jsonl'
+RESPONSE_CACHE_FILE = STATE_DIR / 'response_cache.db'
+METRICS_FILE = STATE_DIR / 'metrics.jsonl'
+DAEMON_SOCKET = STATE_DIR / 'daemon.sock'
 
 
 @dataclass
@@ -38,24 +109,25 @@ class Config:
     temperature: float
 
 
+def get_settings() -> Settings:
+    """*Snapshot* tipado de ``CONFIG_PATH`` (ver ``settings.load_settings``).
+
+    O *parse* é refeito só quando ``mtime`` ou tamanho do arquivo mudam; nas
+    demais execuções basta um ``stat`` e a leitura do cache em ``STATE_DIR``.
+    """
+    with span("read_config"):
+        return load_settings(CONFIG_PATH, STATE_DIR)
+
+
 def read_config() -> Dict[str, str]:
-    """Lê arquivo de configuração do usuário usando ``ConfigParser``.
+    """Chaves do arquivo de configuração como *strings*, sem conversão.
 
-    Utiliza o padrão *EAFP* ("Easier to Ask Forgiveness than Permission") para
-    tentativa de leitura e converte o conteúdo em ``dict``. Uma alternativa mais
-    performática seria o parse manual linha a linha, como antes, porém menos
-    robusta.
+    Mantém o contrato antigo: qualquer linha malformada invalida o arquivo
+    inteiro e o resultado é ``{}``. Para valores já convertidos, use
+    ``get_settings``.
     """
-    parser = ConfigParser()
-    parser.optionxform = str  # preserva capitalização das chaves
-    if not CONFIG_PATH.exists():
-        return {}
-    try:
-        content: str = CONFIG_PATH.read_text(encoding="utf-8")
-        parser.read_string("[DEFAULT]\n" + content)
-    except (OSError, MissingSectionHeaderError, ParsingError):
-        return {}
-    return {k: v.strip().strip('"') for k, v in parser["DEFAULT"].items()}
+    settings = get_settings()
+    return {} if settings.malformed else dict(settings.raw)
 
 
 def load_env_config(config_dict: Optional[Dict[str, str]] = None) -> Config:
@@ -87,7 +159,9 @@ def get_api_key() -> str:
     testes.
 
     Aplica também o padrão *Strategy* ao delegar a obtenção para
-    ``load_api_key``.
+    ``load_api_key``. Se ``secret.txt`` estiver criptografado, a chave
+    derivada da senha é pedida primeiro ao agente de ``key_agent``; a senha
+    só é solicitada (no terminal) quando o agente não a tem.
     """
 
     api_key = os.environ.get("OPENAI_API_KEY")
@@ -99,12 +173,100 @@ def get_api_key() -> str:
             "Erro: chave API não configurada. Rode gpt-secure-setup.py\n"
         )
         sys.exit(1)
+    from .key_agent import socket_path
+
+    agent_ttl = get_settings().key_agent_ttl
     try:
-        return load_api_key(loc=location)
+        with span("get_api_key"):
+            return load_api_key(
+                loc=location,
+                passphrase=_prompt_passphrase,
+                agent=socket_path(STATE_DIR),
+                agent_ttl=agent_ttl,
+            )
+    except KeyStoreError as e:
+        sys.stderr.write(f"Erro: {e}.\n")
+        sys.exit(1)
     except Exception:
         sys.stderr.write("Erro: falha ao ler a chave.\n")
         sys.exit(1)
 
+
+def _prompt_passphrase() -> Optional[str]:
+    """Senha da chave criptografada, lida do terminal (nunca da entrada padrão)."""
+    try:
+        with open("/dev/tty"):
+            pass
+    except OSError:
+        return None
+    import getpass
+
+    return getpass.getpass("Senha da chave API: ")
+
+def backend_api_key(backend: Backend) -> str:
+    """Chave para ``backend``; ``""`` se ele dispensa chave e nenhuma foi configurada."""
+    if backend.key_required or os.environ.get("OPENAI_API_KEY") or KeyLocation().path.exists():
+        return get_api_key()
+    return ""
+
+
+def load_profile_keys(names: List[str]) -> List[Tuple["Profile", str]]:
+    """Perfis de ``PROFILES_PATH`` (todos, se ``names`` vazio) e suas chaves.
+
+    Chaves em arquivo criptografado passam pelo mesmo agente e pela mesma
+    senha no terminal de ``get_api_key``. Erros encerram a CLI.
+    """
+    from .key_agent import socket_path
+    from .profiles import ProfileError, load_profiles, select_profiles
+
+    agent_ttl = get_settings().key_agent_ttl
+    try:
+        chosen = select_profiles(load_profiles(PROFILES_PATH), names)
+        with span("get_api_key"):
+            return [
+                (p, p.api_key(_prompt_passphrase, socket_path(STATE_DIR), agent_ttl))
+                for p in chosen
+            ]
+    except (ProfileError, KeyStoreError) as e:
+        sys.stderr.write(f"Erro: {e}.\n")
+        sys.exit(1)
+
+
+def owner_api_key(owner: FileOwner) -> str:
+    """Chave de quem enviou os arquivos de ``owner`` (ver ``files.FileOwner``).
+
+    Levanta ``ProfileError``/``KeyStoreError`` se o perfil sumiu de
+    ``PROFILES_PATH`` ou se a chave dele não pode ser lida, para que
+    ``--gc-files`` siga com os outros perfis.
+    """
+    if owner.profile is None:
+        return get_api_key()
+    from .key_agent import socket_path
+    from .profiles import load_profiles, select_profiles
+
+    profile = select_profiles(load_profiles(PROFILES_PATH), [owner.profile])[0]
+    return profile.api_key(_prompt_passphrase, socket_path(STATE_DIR), get_settings().key_agent_ttl)
+
+
+def deferred_delete_ready(profile: Optional["Profile"]) -> bool:
+    """Se o processo de ``--defer-delete``, que não tem terminal, obtém a chave.
+
+    Chaves vindas do ambiente são herdadas. Uma chave cifrada só serve se a
+    chave derivada estiver no agente (``KEY_AGENT_TTL`` > 0).
+    """
+    if profile is not None:
+        loc = profile.key_location
+        if loc is None:
+            return True
+    elif os.environ.get("OPENAI_API_KEY"):
+        return True
+    else:
+        loc = KeyLocation()
+    from .key_agent import socket_path
+
+    return key_unattended(loc=loc, agent=socket_path(STATE_DIR))
+
+
 def extract_text_from_data(data: Dict[str, Any]) -> str:
     """Extrai texto da resposta de acordo com a especificação mais recente."""
     if "output" in data and isinstance(data["output"], list):
@@ -130,18 +292,24 @@ def extract_text_from_data(data: Dict[str, Any]) -> str:
     return data.get("output_text", "")
 
 
-def stream_chat_completion(
+class ApiError(RuntimeError):
+    """Resposta de erro da API; a mensagem já vem pronta para o usuário."""
+
+
+def iter_chat_deltas(
     api_key: str,
     messages: List[Dict[str, Any]],
     config: Config,
     timeout: float,
-) -> str:
-    """Realiza streaming de tokens SSE para chat completions.
+    chunk_size: Optional[int] = DEFAULT_STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Gera os deltas de texto de um *chat completion* em *streaming*.
 
-    Emprega o padrão *Context Manager* para garantir o fechamento seguro da
-    requisição e utiliza ``StringIO`` para evitar concatenações repetidas de
-    strings. Uma alternativa igualmente performática seria acumular tokens em
-    uma lista e aplicar ``"".join`` ao final.
+    Núcleo compartilhado por ``stream_chat_completion`` e pelo *daemon*
+    (``chatgpt_cli.daemon``): não escreve nada nem encerra o processo.
+    Levanta ``ApiError`` antes do primeiro delta se o *status* não for
+    ``200``; falhas de rede propagam como ``transport.request_errors()``.
+    Fechar o gerador (``close``) libera a conexão de volta ao *pool*.
     """
     payload: Dict[str, Any] = {
         "model": config.model,
@@ -150,203 +318,731 @@ def stream_chat_completion(
         "stream": True,
     }
     headers = {
-        "Authorization": "Bearer " + api_key,
+        **auth_headers(api_key),
         "Content-Type": "application/json",
     }
-    buffer: StringIO = StringIO()
-    try:
-        with requests.post(
-            "https://api.openai.com/v1/chat/completions",
+    with span("chat_headers") as headers_span:
+        r = get_session().post(
+            api_url("chat/completions"),
             headers=headers,
             json=payload,
             stream=True,
             timeout=timeout,
-        ) as r:
-            if r.status_code != 200:
-                sys.stderr.write(f"Erro {r.status_code}: {r.text}\n")
-                sys.exit(1)
-            for line in r.iter_lines():
-                if not line:
-                    continue
-                decoded = line.decode("utf-8")
-                if decoded.startswith("data:"):
-                    content = decoded[len("data:") :].strip()
-                    if content == "[DONE]":
-                        break
-                    try:
-                        event = json.loads(content)
-                    except Exception:
-                        continue
-                    delta = event.get("choices", [{}])[0].get("delta", {})
-                    c = delta.get("content")
-                    if c:
-                        print(c, end="", flush=True)
-                        buffer.write(c)
-            print()
-    except RequestException as e:
+        )
+        headers_span.set(status=r.status_code)
+    with r:
+        if r.status_code != 200:
+            raise ApiError(f"Erro {r.status_code}: {r.text}")
+        yield from iter_deltas(r.iter_content(chunk_size=chunk_size))
+
+
+def stream_chat_completion(
+    api_key: str,
+    messages: List[Dict[str, Any]],
+    config: Config,
+    timeout: float,
+    chunk_size: Optional[int] = DEFAULT_STREAM_CHUNK_SIZE,
+    sink: Optional[OutputSink] = None,
+) -> str:
+    """Realiza streaming de tokens SSE para chat completions.
+
+    Emprega o padrão *Context Manager* para garantir o fechamento seguro da
+    requisição e utiliza ``StringIO`` para evitar concatenações repetidas de
+    strings. Uma alternativa igualmente performática seria acumular tokens em
+    uma lista e aplicar ``"".join`` ao final.
+
+    A interpretação dos eventos fica em ``sse.iter_deltas``, compartilhada com
+    o cliente assíncrono de ``chatgpt_cli.aio``; os bytes chegam crus via
+    ``iter_content`` (``chunk_size=None`` entrega os blocos como chegam).
+    A escrita é delegada a ``sink`` (por padrão ``output.select_sink()``),
+    único ponto onde o texto transmitido chega ao terminal.
+    """
+    buffer: StringIO = StringIO()
+    out: OutputSink = sink if sink is not None else select_sink()
+    deltas = iter_chat_deltas(api_key, messages, config, timeout, chunk_size)
+    with span("stream_chat_completion") as timing:
+        try:
+            _stream_to(out, buffer, deltas, timing)
+        finally:
+            deltas.close()
+    out.close()
+    return buffer.getvalue()
+
+
+def _stream_to(
+    out: OutputSink, buffer: StringIO, deltas: Iterator[str], timing: Span
+) -> None:
+    """Copia ``deltas`` para ``out`` e ``buffer``, anotando o ritmo em ``timing``.
+
+    ``first_delta_ms``/``last_delta_ms`` são relativos ao início do *span*;
+    ``tokens_per_s`` usa a estimativa de ``context.estimate_tokens`` entre o
+    primeiro e o último delta.
+    """
+    start = time.perf_counter()
+    first: Optional[float] = None
+    last = start
+    count = 0
+    try:
+        for c in deltas:
+            last = time.perf_counter()
+            if first is None:
+                first = last
+            count += 1
+            out.write(c)
+            buffer.write(c)
+    except ApiError as e:
+        sys.stderr.write(f"{e}\n")
+        sys.exit(1)
+    except request_errors() as e:
+        out.close()
         sys.stderr.write(f"Erro de conexão: {e}\n")
         sys.exit(1)
-    return buffer.getvalue()
+    except BaseException:
+        out.close()
+        raise
+    finally:
+        if first is not None and TELEMETRY.enabled:
+            elapsed = last - first
+            tokens = estimate_tokens(buffer.getvalue())
+            timing.set(
+                first_delta_ms=(first - start) * 1000,
+                last_delta_ms=(last - start) * 1000,
+                deltas=count,
+                tokens=tokens,
+                tokens_per_s=tokens / elapsed if elapsed > 0 else 0.0,
+            )
+
+
+def chat_completion(
+    api_key: str,
+    messages: List[Dict[str, Any]],
+    config: Config,
+    timeout: float,
+    base_url: Optional[str] = None,
+    on_response: Optional[Callable[["Response"], None]] = None,
+    status_retries: bool = True,
+) -> Dict[str, Any]:
+    """Realiza uma chamada *chat completions* sem streaming.
+
+    Retorna o JSON completo (incluindo ``usage``) e levanta ``RuntimeError``
+    em respostas de erro, deixando a decisão de abortar para o chamador; útil
+    quando várias requisições compartilham o processo, como no modo *batch*.
+    ``on_response`` recebe a resposta antes da checagem de *status*, para
+    que o escalonador de ``ratelimit`` leia os cabeçalhos de limite. Com
+    ``status_retries=False`` o transporte não repete ``429``: o erro volta
+    na hora para quem decide a próxima chave.
+    """
+    payload: Dict[str, Any] = {
+        "model": config.model,
+        "messages": messages,
+        "temperature": config.temperature,
+    }
+    resp: Response = get_session(status_retries).post(
+        api_url("chat/completions", base_url),
+        headers={
+            **auth_headers(api_key),
+            "Content-Type": "application/json",
+        },
+        json=payload,
+        timeout=timeout,
+    )
+    if on_response is not None:
+        on_response(resp)
+    if resp.status_code != 200:
+        raise RuntimeError(f"Erro {resp.status_code}: {resp.text}")
+    data = resp.json()
+    if not isinstance(data, dict):
+        raise RuntimeError("Resposta inesperada da API")
+    return data
 
 
 def delete_uploaded_files(
-    file_ids: List[str], api_key: str, timeout: float
+    file_ids: List[str],
+    api_key: str,
+    timeout: float,
+    base_url: Optional[str] = None,
+    missing_ok: bool = True,
 ) -> None:
-    """Remove arquivos enviados aguardando resposta do servidor."""
-    for fid in file_ids:
-        try:
-            resp: Response = requests.delete(
-                f"https://api.openai.com/v1/files/{fid}",
-                headers={"Authorization": "Bearer " + api_key},
-                timeout=timeout,
-            )
-            if resp.status_code not in (200, 202, 204):
-                sys.stderr.write(
-                    f"Erro ao remover arquivo {fid}: {resp.status_code} {resp.text}\n"
-                )
-        except RequestException as e:
-            sys.stderr.write(f"Erro ao remover arquivo {fid}: {e}\n")
-        time.sleep(0.5)
+    """Remove arquivos enviados em paralelo, com *backoff* guiado por ``429``.
+
+    Substitui a pausa fixa entre remoções por ``files.delete_files``; ids
+    removidos são baixados do *ledger* usado por ``--gc-files``.
+    """
+    _, errors = delete_files(
+        file_ids,
+        api_key,
+        timeout,
+        ledger=FileLedger(UPLOAD_LEDGER_FILE),
+        base_url=base_url,
+        missing_ok=missing_ok,
+    )
+    for err in errors:
+        sys.stderr.write(err + "\n")
 
 def load_session(name: str) -> List[Dict[str, Any]]:
-    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-    session_file = SESSIONS_DIR / f'{name}.json'
-    if session_file.exists():
-        try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                messages = json.load(f)
-                if isinstance(messages, list):
-                    return messages  # type: ignore[return-value]
-        except Exception:
-            pass
-    return []
+    """Carrega a sessão ``name`` do *log* JSONL (ver ``chatgpt_cli.sessions``).
 
-def save_session(name: str, messages: List[Dict[str, Any]]) -> None:
-    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-    session_file = SESSIONS_DIR / f'{name}.json'
+    Sessões no formato antigo (``<nome>.json``) são migradas na primeira
+    leitura; erros de E/S resultam em sessão vazia, como antes.
+    """
     try:
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(messages, f)
+        return get_store(SESSIONS_DIR).load(name)
+    except (OSError, ValueError, TypeError):
+        return []
+
+def save_session(
+    name: str,
+    messages: List[Dict[str, Any]],
+    tokens: Optional[List[Optional[int]]] = None,
+) -> None:
+    """Persiste a sessão acrescentando apenas os turnos novos.
+
+    ``tokens`` memoiza a contagem estimada de cada mensagem no próprio *log*,
+    evitando recalculá-la a cada turno (ver ``chatgpt_cli.context``).
+    """
+    try:
+        with span("save_session"):
+            get_store(SESSIONS_DIR).save(name, messages, tokens)
     except Exception as e:
         sys.stderr.write(f"Não foi possível salvar a sessão: {e}\n")
 
+def load_session_tokens(name: str) -> List[Optional[int]]:
+    """Contagens de *tokens* memoizadas da sessão (``None`` se desconhecidas)."""
+    try:
+        return get_store(SESSIONS_DIR).token_counts(name)
+    except (OSError, ValueError, TypeError):
+        return []
+
+def record_context_trim(name: Optional[str], result: ContextResult) -> None:
+    """Registra na sessão (e, em terminal, no stderr) o corte de contexto."""
+    if sys.stderr.isatty():
+        sys.stderr.write(
+            f"Contexto: {result.dropped} mensagem(ns) antiga(s) fora da janela "
+            f"(~{result.dropped_tokens} tokens"
+            + ("; resumidas" if result.summary else "")
+            + ").\n"
+        )
+    if not name:
+        return
+    info = result.record()
+    info["timestamp"] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    try:
+        get_store(SESSIONS_DIR).record_trim(name, info)
+    except OSError as e:
+        sys.stderr.write(f"Não foi possível registrar o corte de contexto: {e}\n")
+
 def append_history(session: Optional[str], prompt: str, response: str) -> None:
-    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    """Grava a interação em ``HISTORY_FILE`` e a indexa para ``--history``.
+
+    Ver ``chatgpt_cli.history``: o JSONL mantém o formato de sempre e o
+    índice FTS5 ao lado dele é atualizado apenas com as linhas novas.
+    """
     try:
-        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
-            record = {
-                "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
-                "session": session,
-                "prompt": prompt,
-                "response": response
-            }
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with span("append_history"):
+            get_history(STATE_DIR).append(session, prompt, response)
     except Exception as e:
         sys.stderr.write(f"Não foi possível gravar histórico: {e}\n")
 
+def search_history(
+    terms: str, session: Optional[str], since: Optional[str], limit: int
+) -> None:
+    """Imprime as interações do histórico que contêm ``terms``."""
+    try:
+        hits = get_history(STATE_DIR).search(
+            terms,
+            session=session,
+            since=parse_since(since) if since else None,
+            limit=limit,
+        )
+    except ValueError:
+        sys.stderr.write(f"Data inválida para --since: {since}\n")
+        sys.exit(1)
+    except Exception as e:
+        sys.stderr.write(f"Falha ao consultar histórico: {e}\n")
+        sys.exit(1)
+    for hit in hits:
+        sys.stdout.write(format_hit(hit))
+    if not hits:
+        sys.stderr.write("Nenhuma interação encontrada.\n")
+
+def _cache_get(cache: ResponseCache, key: str) -> Optional[str]:
+    """Consulta o cache de respostas; falhas de disco equivalem a uma falta."""
+    try:
+        return cache.get(key)
+    except Exception as e:
+        sys.stderr.write(f"Cache de respostas indisponível: {e}\n")
+        return None
+
+def clear_session(name: str) -> None:
+    """Remove a sessão ``name`` (JSONL ou formato antigo) e informa o resultado."""
+    store = get_store(SESSIONS_DIR)
+    if store.exists(name):
+        try:
+            store.delete(name)
+            print(f"Sessão '{name}' removida.")
+        except Exception as e:
+            print(f"Falha ao remover sessão: {e}")
+    else:
+        print(f"Sessão '{name}' não encontrada.")
+
+def _fast_path(argv: List[str]) -> bool:
+    """Atende comandos locais triviais sem ``argparse`` nem configuração.
+
+    Aplica o padrão *Chain of Responsibility* em sua forma mínima: se o
+    comando for reconhecido aqui, ``main`` encerra sem montar o *parser*;
+    caso contrário, segue o caminho completo. Um *parser* manual para todas
+    as opções seria ainda mais rápido, mas duplicaria a validação e a ajuda
+    que o ``argparse`` oferece.
+    """
+    if len(argv) == 2 and argv[0] == '--clear-session':
+        name = argv[1]
+    elif len(argv) == 1 and argv[0].startswith('--clear-session='):
+        name = argv[0].partition('=')[2]
+    else:
+        return False
+    if not name or name.startswith('-'):
+        return False
+    clear_session(name)
+    return True
+
 def main() -> None:
-    parser = argparse.ArgumentParser(description="CLI para ChatGPT com suporte a anexos e sessões.")
+    if _fast_path(sys.argv[1:]):
+        sys.exit(0)
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="gpt", description="CLI para ChatGPT com suporte a anexos e sessões.")
     parser.add_argument('prompt', nargs='?', help="Pergunta para o ChatGPT.")
     parser.add_argument('-f','--file', action='append', help="Adicionar anexo (PDF/TXT/IMG/Áudio).", default=[])
     parser.add_argument('--session', help="Nome da sessão para manter contexto.")
     parser.add_argument('--clear-session', help="Limpa a sessão especificada e sai.", default=None)
     parser.add_argument('--delete-files', action='store_true', help="Apagar arquivos enviados após resposta.")
+    parser.add_argument('--defer-delete', action='store_true', help="Apaga os anexos em segundo plano (implica --delete-files).")
+    parser.add_argument('--gc-files', action='store_true', help="Remove todos os arquivos já enviados por esta ferramenta e sai.")
+    parser.add_argument('--delete-file-ids', nargs='+', help=argparse.SUPPRESS)
     parser.add_argument('--model', help="Modelo a ser utilizado (sobrescreve config).")
     parser.add_argument('--temp', type=float, help="Temperatura (sobrescreve config).")
+    parser.add_argument('--no-stream-output', action='store_true', help="Exibe apenas o texto final, sem streaming.")
+    parser.add_argument('--batch', metavar='ARQUIVO', help="Executa os prompts de um arquivo JSONL ('-' para stdin).")
+    parser.add_argument('--batch-output', metavar='ARQUIVO', default='-', help="JSONL de saída do modo batch (padrão: stdout).")
+    parser.add_argument('--concurrency', type=int, default=4, help="Requisições simultâneas no modo batch.")
+    parser.add_argument('--history', nargs='+', metavar='ARG', help="Consulta o histórico: 'search TERMOS', 'rotate' ou 'reindex'.")
+    parser.add_argument('--since', metavar='DATA', help="Com --history search: apenas a partir de DATA (AAAA-MM-DD[THH:MM]).")
+    parser.add_argument('--limit', type=int, default=DEFAULT_SEARCH_LIMIT, help="Com --history search: número máximo de resultados.")
+    parser.add_argument('--cache', action='store_true', help="Reaproveita respostas de prompts idênticos (sobrescreve RESPONSE_CACHE).")
+    parser.add_argument('--no-cache', action='store_true', help="Ignora o cache de respostas nesta execução.")
+    parser.add_argument('--cache-stats', action='store_true', help="Exibe estatísticas do cache de respostas e sai.")
+    parser.add_argument('--context-budget', type=int, metavar='TOKENS', help="Orçamento de tokens do contexto enviado (0 desativa; sobrescreve config).")
+    parser.add_argument('--timings', action='store_true', help="Exibe em stderr o tempo de cada etapa da chamada.")
+    parser.add_argument('--timings-report', action='store_true', help="Resume em percentis as métricas gravadas com METRICS_LOG e sai.")
+    parser.add_argument('--lock-key', action='store_true', help="Descarta a chave derivada guardada pelo agente e sai.")
+    parser.add_argument('--profile', action='append', metavar='NOME', help="Usa o perfil NOME de profiles.ini (chave, modelo, URL); repetível no modo batch.")
+    parser.add_argument('--print-config', action='store_true', help="Imprime a configuração efetiva (já convertida) e sai.")
+    parser.add_argument('--format', choices=('env', 'json'), default='env', help="Com --print-config: 'env' (para eval em shell) ou 'json'.")
+    parser.add_argument('--check-update', action='store_true', help="Verifica se há nova versão (GH_REPO/UPDATE_URL) e sai.")
+    parser.add_argument('--repl', action='store_true', help="Modo interativo: conversa em memória até Ctrl-D ou /sair.")
+    parser.add_argument('--daemon', action='store_true', help="Inicia o daemon local (socket Unix) que atende as próximas chamadas.")
+    parser.add_argument('--daemon-stop', action='store_true', help="Encerra o daemon local, se estiver em execução, e sai.")
+    parser.add_argument('--no-daemon', action='store_true', help="Não encaminha esta chamada ao daemon, mesmo se ativo.")
     args = parser.parse_args()
+    # Coleta desde já; desligada abaixo se nem --timings nem METRICS_LOG.
+    TELEMETRY.enable()
+    try:
+        _run(parser, args)
+    finally:
+        TELEMETRY.finish(
+            sys.stderr if args.timings else None,
+            session=bool(args.session),
+            attachments=len(args.file or []),
+        )
 
-    config_raw = read_config()
+
+def _run(parser: "argparse.ArgumentParser", args: "argparse.Namespace") -> None:
+    """Executa a ação pedida em ``args`` (corpo de ``main``)."""
+    settings = get_settings()
+    if args.print_config:
+        if args.format == 'json':
+            print(json.dumps(settings.as_dict(), indent=2))
+        else:
+            sys.stdout.write(settings.as_env())
+        sys.exit(0)
+    if args.clear_session:
+        # Como no caminho rápido: apagar a sessão local não depende do backend.
+        clear_session(args.clear_session)
+        sys.exit(0)
+    config_raw = {} if settings.malformed else settings.raw
     config = load_env_config(config_raw)
     if args.model or args.temp is not None:
         config = Config(
             model=args.model or config.model,
             temperature=args.temp if args.temp is not None else config.temperature,
         )
+    request_timeout: float = settings.request_timeout
+    chunk_size: Optional[int] = settings.stream_chunk_size or None
+    flush_interval = settings.output_flush_ms / 1000
+    flush_bytes = settings.output_flush_bytes
+    sink = select_sink(
+        final_only=args.no_stream_output,
+        interval=flush_interval,
+        max_bytes=flush_bytes,
+    )
+    context_budget = settings.context_budget
+    summary_budget = settings.context_summary_tokens
+    if args.context_budget is not None:
+        context_budget = args.context_budget
+    if not (args.timings or settings.metrics_log):
+        TELEMETRY.disable()
+    window = ContextWindow(budget=context_budget, summary_budget=summary_budget)
+    response_cache_cfg = ResponseCache(
+        RESPONSE_CACHE_FILE,
+        max_bytes=settings.response_cache_max_bytes,
+        ttl=settings.response_cache_ttl,
+    )
+    replay_delay = settings.response_cache_replay_ms / 1000
+    cache_on = args.cache or settings.response_cache
+    response_cache: Optional[ResponseCache] = (
+        response_cache_cfg if cache_on and not args.no_cache else None
+    )
+    transport_config = settings.transport
+    if args.batch:
+        # Uma conexão por *worker* evita disputa pelo *pool* compartilhado.
+        transport_config = replace(
+            transport_config,
+            pool_size=max(transport_config.pool_size, args.concurrency),
+        )
+    configure_transport(transport_config)
     try:
-        request_timeout: float = float(
-            config_raw.get('REQUEST_TIMEOUT', DEFAULT_REQUEST_TIMEOUT)
+        backend = resolve_backend(
+            os.environ.get("OPENAI_BASE_URL") or settings.api_base, settings.api_backend
         )
-    except ValueError:
-        request_timeout = DEFAULT_REQUEST_TIMEOUT
+    except BackendError as e:
+        sys.stderr.write(f"Erro: {e}.\n")
+        sys.exit(1)
+    set_api_base(backend.base_url)
     prompt = args.prompt
 
-    if args.clear-session:
-        name = args.clear-session
-        session_file = SESSIONS_DIR / f'{name}.json'
-        if session_file.exists():
-            try:
-                os.remove(session_file)
-                print(f"Sessão '{name}' removida.")
-            except Exception as e:
-                print(f"Falha ao remover sessão: {e}")
+    get_history(STATE_DIR).max_bytes = settings.history_max_bytes
+
+    if args.history:
+        action, terms = args.history[0], " ".join(args.history[1:])
+        if action == 'search':
+            search_history(terms, args.session, args.since, args.limit)
+        elif action == 'rotate':
+            segment = get_history(STATE_DIR).rotate()
+            print(f"Histórico arquivado em {segment}." if segment else "Histórico vazio.")
+        elif action == 'reindex':
+            print(f"{get_history(STATE_DIR).rebuild()} interação(ões) indexada(s).")
         else:
-            print(f"Sessão '{name}' não encontrada.")
+            sys.stderr.write(f"Ação desconhecida para --history: {action}\n")
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.timings_report:
+        print(format_summary(aggregate(read_metrics(METRICS_FILE))), end="")
+        sys.exit(0)
+
+    if args.lock_key:
+        from .key_agent import forget, socket_path
+
+        locked = forget(socket_path(STATE_DIR))
+        print("Chave bloqueada." if locked else "Nenhum agente de chave em execução.")
+        sys.exit(0)
+
+    if args.check_update:
+        from .update_check import ConfigError, check_for_update
+
+        try:
+            result = check_for_update(CONFIG_PATH, STATE_DIR)
+        except ConfigError as e:
+            sys.stderr.write(f"{e}\n")
+            sys.exit(1)
+        print("\n".join(result.human_lines()))
+        sys.exit(0)
+
+    if args.cache_stats:
+        try:
+            print(response_cache_cfg.stats().report())
+        except Exception as e:
+            sys.stderr.write(f"Falha ao ler o cache de respostas: {e}\n")
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.delete_file_ids:
+        # Processo filho de ``--defer-delete``: recebe --profile e
+        # OPENAI_BASE_URL de quem enviou os arquivos. Sem terminal, uma chave
+        # cifrada só vem do agente; na falta dela, sai com erro e os ids
+        # continuam no *ledger* para o ``--gc-files``.
+        from .profiles import ProfileError
+
+        owner = FileOwner(args.profile[0] if args.profile else None, backend.base_url)
+        try:
+            owner_key = owner_api_key(owner)
+        except (ProfileError, KeyStoreError) as e:
+            sys.stderr.write(f"Erro: {e}.\n")
+            sys.exit(1)
+        known = FileLedger(UPLOAD_LEDGER_FILE).owners()
+        ours = [
+            fid
+            for fid in args.delete_file_ids
+            if fid in known
+            and known[fid].profile == owner.profile
+            and (known[fid].base_url or backend.base_url) == owner.base_url
+        ]
+        others = [fid for fid in args.delete_file_ids if fid not in ours]
+        # ``404`` só prova a remoção quando a chave é a que enviou o arquivo.
+        delete_uploaded_files(ours, owner_key, request_timeout, owner.base_url)
+        delete_uploaded_files(others, owner_key, request_timeout, owner.base_url, missing_ok=False)
+        sys.exit(0)
+
+    if args.gc_files:
+        from .profiles import ProfileError
+
+        ledger = FileLedger(UPLOAD_LEDGER_FILE)
+        groups = ledger.live_by_owner()
+        deleted: List[str] = []
+        errors: List[str] = []
+        # Cada grupo é removido com a chave e a URL base usadas no envio.
+        for owner, ids in groups.items():
+            try:
+                owner_key = owner_api_key(owner)
+            except (ProfileError, KeyStoreError) as e:
+                errors.append(f"Erro: {e}; {len(ids)} arquivo(s) mantido(s) no registro de envios.")
+                continue
+            done, failed = delete_files(
+                ids, owner_key, request_timeout, ledger=ledger, base_url=owner.base_url
+            )
+            deleted += done
+            errors += failed
+        UploadCache(UPLOAD_CACHE_FILE).discard(deleted)
+        ledger.compact()
+        for err in errors:
+            sys.stderr.write(err + "\n")
+        print(f"{len(deleted)} de {sum(map(len, groups.values()))} arquivo(s) removido(s).")
+        sys.exit(1 if errors else 0)
+
+    if args.daemon or args.daemon_stop:
+        from . import daemon
+
+        if args.daemon_stop:
+            reply = daemon.request(DAEMON_SOCKET, "shutdown")
+            print("Daemon encerrado." if reply else "Nenhum daemon em execução.")
+            sys.exit(0)
+        idle_timeout = settings.daemon_idle_timeout
+        get_api_key()  # falha cedo, antes de aceitar clientes
+        TELEMETRY.disable()  # processo longo: não acumula spans
+        server = daemon.Daemon(
+            DAEMON_SOCKET,
+            idle_timeout=idle_timeout,
+            response_cache=response_cache_cfg,
+        )
+        try:
+            server.bind()
+        except daemon.DaemonError as e:
+            sys.stderr.write(f"{e}\n")
+            sys.exit(1)
+        import signal
+
+        signal.signal(signal.SIGTERM, lambda *_: server.stop())
+        if sys.stderr.isatty():
+            sys.stderr.write(f"Daemon escutando em {DAEMON_SOCKET}.\n")
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            server.stop()
+        sys.exit(0)
+
+    profile: Optional["Profile"] = None
+    profile_key: Optional[str] = None
+    if args.profile and not args.batch:
+        if len(args.profile) > 1:
+            sys.stderr.write("Mais de um --profile só é aceito no modo batch.\n")
+            sys.exit(1)
+        profile, profile_key = load_profile_keys(args.profile)[0]
+        if profile.model and not args.model and not os.environ.get("OPENAI_MODEL"):
+            config = replace(config, model=profile.model)
+        if profile.base_url:
+            try:
+                backend = resolve_backend(profile.base_url, settings.api_backend)
+            except BackendError as e:
+                sys.stderr.write(f"Erro: {e}.\n")
+                sys.exit(1)
+            set_api_base(backend.base_url)
+
+    if args.batch:
+        from .batch import run_batch
+        from .ratelimit import KeyBudget, KeyScheduler
+
+        # Sem --profile, o batch reparte a carga entre todos os perfis.
+        keys = load_profile_keys(args.profile or []) if args.profile or PROFILES_PATH.exists() else []
+        budgets = [p.budget(k) for p, k in keys] or [KeyBudget("default", backend_api_key(backend))]
+        stats = run_batch(
+            args.batch,
+            args.batch_output,
+            config,
+            KeyScheduler(budgets),
+            request_timeout,
+            args.concurrency,
+            window,
+        )
+        sys.exit(1 if stats.failed else 0)
+
+    if args.repl:
+        if args.file:
+            sys.stderr.write("--repl não aceita anexos.\n")
+            sys.exit(1)
+        from .repl import Repl
+
+        if not args.timings:
+            TELEMETRY.disable()
+        Repl(
+            api_key=profile_key or backend_api_key(backend),
+            config=config,
+            window=window,
+            timeout=request_timeout,
+            chunk_size=chunk_size,
+            make_sink=lambda: select_sink(
+                final_only=args.no_stream_output,
+                interval=flush_interval,
+                max_bytes=flush_bytes,
+            ),
+            session=args.session,
+        ).run(prompt)
         sys.exit(0)
 
     if not prompt and not args.file:
         parser.print_help()
         sys.exit(1)
 
-    api_key = get_api_key()
+    if args.file and not backend.files:
+        # Servidores compatíveis não têm /files nem /responses.
+        try:
+            prompt = inline_attachments(prompt or "", [Path(p) for p in args.file])
+        except (OSError, BackendError) as e:
+            sys.stderr.write(f"Erro: {e}.\n")
+            sys.exit(1)
+        args.file = None
+
+    TELEMETRY.labels["model"] = config.model
+    if settings.metrics_log:
+        # Só chamadas à API entram no metrics.jsonl, não comandos locais.
+        TELEMETRY.log_path = METRICS_FILE
+
+    if not args.file and not args.no_daemon and profile_key is None and DAEMON_SOCKET.exists():
+        from . import daemon
+
+        request: Dict[str, Any] = {
+            "op": "chat",
+            "prompt": prompt,
+            "session": args.session,
+            "config": {"model": config.model, "temperature": config.temperature},
+            "context": {"budget": context_budget, "summary_budget": summary_budget},
+            "cache": response_cache is not None,
+            "timeout": request_timeout,
+            "chunk_size": chunk_size,
+            "base_url": backend.base_url,
+        }
+        if os.environ.get("OPENAI_API_KEY"):
+            request["api_key"] = os.environ["OPENAI_API_KEY"]
+        try:
+            with span("daemon_forward"):
+                forwarded = daemon.forward(DAEMON_SOCKET, request, sink)
+        except daemon.DaemonError as e:
+            sys.stderr.write(f"{e}\n")
+            sys.exit(1)
+        except KeyboardInterrupt:
+            print("\nInterrompido.")
+            sys.exit(1)
+        if forwarded is not None:
+            # Sessão e histórico são gravados pelo próprio daemon.
+            sys.exit(0)
+
+    api_key = profile_key or backend_api_key(backend)
 
     session_messages = []
+    session_tokens: List[Optional[int]] = []
     if args.session:
         session_messages = load_session(args.session)
+        session_tokens = load_session_tokens(args.session)
 
     attachments = args.file or []
     uploaded_ids: Dict[str, str] = {}
     uploaded_file_ids_list: List[str] = []
+    upload_cache: Optional[UploadCache] = None
+    cache_slot: Optional[str] = None
+    cached_text: Optional[str] = None
     if attachments:
+        selected: List[Tuple[str, Path]] = []
         for path in attachments:
             p = Path(path)
             if not p.exists():
                 print(f"Arquivo não encontrado: {path}", file=sys.stderr)
                 sys.exit(1)
-            ext = p.suffix.lower()
-            if ext in ['.png','.jpg','.jpeg','.gif','.bmp','.webp']:
-                key = 'input_image'
-            elif ext in ['.mp3','.wav','.ogg','.flac','.m4a']:
-                key = 'input_audio'
-            else:
-                key = 'input_file'
-            if key in uploaded_ids:
+            key = attachment_key(p)
+            if any(key == k for k, _ in selected):
                 print(f"Aviso: mais de um arquivo para {key}. Apenas o primeiro será usado.", file=sys.stderr)
                 continue
-            try:
-                with open(p, 'rb') as f:
-                    files = {'file': (p.name, f)}
-                    data = {'purpose': 'assistants'}
-                    resp = requests.post(
-                        'https://api.openai.com/v1/files',
-                        headers={'Authorization': 'Bearer ' + api_key},
-                        data=data,
-                        files=files,
-                        timeout=request_timeout,
-                    )
-            except RequestException as e:
-                print(f"Erro de conexão ao enviar {path}: {e}", file=sys.stderr)
-                sys.exit(1)
-            except Exception as e:
-                print(f"Erro ao fazer upload de {path}: {e}", file=sys.stderr)
-                sys.exit(1)
-            if resp.status_code not in (200, 201):
-                print(f"Falha ao enviar {path}: {resp.text}", file=sys.stderr)
-                sys.exit(1)
-            file_id = resp.json().get('id')
-            if not file_id:
-                print(f"Resposta inesperada ao enviar {path}", file=sys.stderr)
-                sys.exit(1)
-            uploaded_ids[key] = file_id
-            uploaded_file_ids_list.append(file_id)
+            selected.append((key, p))
+        if response_cache is not None:
+            # Acerto dispensa até o envio dos anexos.
+            cache_slot = cache_key(
+                "responses",
+                config,
+                [{"role": "user", "content": prompt}],
+                [(k, sha256_file(p)) for k, p in selected],
+                cache_scope(backend.base_url, api_key),
+            )
+            cached_text = _cache_get(response_cache, cache_slot)
+    if attachments and cached_text is None:
+        upload_cache = UploadCache(
+            UPLOAD_CACHE_FILE, settings.upload_cache_ttl, cache_scope(backend.base_url, api_key)
+        )
+
+        def report(result: UploadResult) -> None:
+            if sys.stderr.isatty():
+                origem = "reutilizado do cache" if result.cached else "enviado"
+                sys.stderr.write(f"Anexo {result.path.name}: {origem}\n")
+
+        try:
+            results = upload_attachments(
+                selected, api_key, request_timeout, upload_cache, on_done=report
+            )
+        except UploadError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(1)
+        for result in results:
+            uploaded_ids[result.key] = result.file_id
+            uploaded_file_ids_list.append(result.file_id)
+        FileLedger(UPLOAD_LEDGER_FILE).add(
+            (r.file_id for r in results if not r.cached),
+            FileOwner(profile.name if profile else None, backend.base_url),
+        )
 
     response_text = ""
+    context: Optional[ContextResult] = None
     try:
         if not attachments:
             messages = list(session_messages) if session_messages else []
             messages.append({"role": "user", "content": prompt})
-            response_text = stream_chat_completion(
-                api_key, messages, config, request_timeout
-            )
+            context = window.fit(messages, session_tokens)
+            if context.trimmed:
+                record_context_trim(args.session, context)
+            if response_cache is not None:
+                cache_slot = cache_key(
+                    "chat/completions",
+                    config,
+                    context.messages,
+                    scope=cache_scope(backend.base_url, api_key),
+                )
+                cached_text = _cache_get(response_cache, cache_slot)
+            if cached_text is not None:
+                with span("cache_replay"):
+                    response_text = replay(cached_text, sink, delay=replay_delay)
+            else:
+                response_text = stream_chat_completion(
+                    api_key, context.messages, config, request_timeout, chunk_size, sink
+                )
+        elif cached_text is not None:
+            with span("cache_replay"):
+                response_text = replay(cached_text, sink, delay=replay_delay)
         else:
             input_obj = {"input_text": prompt}
             input_obj.update(uploaded_ids)
@@ -356,17 +1052,18 @@ def main() -> None:
                 "temperature": config.temperature,
             }
             headers = {
-                "Authorization": "Bearer " + api_key,
+                **auth_headers(api_key),
                 "Content-Type": "application/json",
             }
             try:
-                resp = requests.post(
-                    "https://api.openai.com/v1/responses",
-                    headers=headers,
-                    data=json.dumps(payload),
-                    timeout=request_timeout,
-                )
-            except RequestException as e:
+                with span("responses"):
+                    resp = get_session().post(
+                        api_url("responses"),
+                        headers=headers,
+                        data=json.dumps(payload),
+                        timeout=request_timeout,
+                    )
+            except request_errors() as e:
                 print(f"Erro de conexão: {e}", file=sys.stderr)
                 sys.exit(1)
             if resp.status_code not in (200, 201):
@@ -375,19 +1072,42 @@ def main() -> None:
             data = resp.json()
             if isinstance(data, dict):
                 response_text = extract_text_from_data(data)
-            print(response_text)
+            sink.write(response_text)
+            sink.close()
     except KeyboardInterrupt:
         print("\nInterrompido.")
         sys.exit(1)
+    if response_cache is not None and cache_slot and cached_text is None and response_text:
+        try:
+            response_cache.put(cache_slot, response_text)
+        except Exception as e:
+            sys.stderr.write(f"Não foi possível gravar no cache de respostas: {e}\n")
 
     if args.session:
         session_messages.append({"role":"user","content": prompt})
         session_messages.append({"role":"assistant","content": response_text})
-        save_session(args.session, session_messages)
+        tokens: Optional[List[Optional[int]]] = None
+        if context is not None:
+            tokens = list(context.counts)
+            tokens.append(message_tokens(session_messages[-1]))
+        save_session(args.session, session_messages, tokens)
     append_history(args.session, prompt, response_text)
 
-    if attachments and args.delete_files:
-        delete_uploaded_files(uploaded_file_ids_list, api_key, request_timeout)
+    if uploaded_file_ids_list and (args.delete_files or args.defer_delete):
+        if upload_cache is not None:
+            upload_cache.discard(uploaded_file_ids_list)
+        if args.defer_delete and deferred_delete_ready(profile):
+            spawn_background_delete(
+                uploaded_file_ids_list,
+                FileOwner(profile.name if profile else None, backend.base_url),
+            )
+        else:
+            if args.defer_delete:
+                sys.stderr.write(
+                    "Aviso: a chave cifrada não está no agente (KEY_AGENT_TTL=0?); "
+                    "os anexos serão removidos agora.\n"
+                )
+            delete_uploaded_files(uploaded_file_ids_list, api_key, request_timeout)
 
 if __name__ == '__main__':
     main()
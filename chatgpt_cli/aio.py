@@ -0,0 +1,239 @@
+"""Motor de streaming assíncrono para *chat completions*.
+
+Implementa um cliente HTTP/1.1 mínimo sobre ``asyncio`` (apenas biblioteca
+padrão), de modo que várias conversas possam transmitir tokens ao mesmo tempo
+em um único *event loop*, sem uma *thread* por requisição. Os eventos são
+interpretados pelo mesmo parser de ``chatgpt_cli.sse`` usado pelo caminho
+síncrono. Uma alternativa mais completa seria depender de ``aiohttp`` ou
+``httpx``, ao custo de uma dependência extra para um único *endpoint*.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import Config, DEFAULT_REQUEST_TIMEOUT
+from .sse import aiter_deltas
+from . import transport
+
+_Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _Body:
+    """Leitor incremental do corpo de uma resposta HTTP/1.1.
+
+    Suporta ``Transfer-Encoding: chunked``, ``Content-Length`` e corpo
+    delimitado pelo fechamento da conexão, mantendo estado entre chamadas para
+    que o restante possa ser drenado após ``[DONE]``.
+    """
+
+    def __init__(
+        self, reader: asyncio.StreamReader, headers: Dict[str, str], timeout: float
+    ) -> None:
+        self._reader = reader
+        self._timeout = timeout
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        self._remaining: Optional[int] = int(length) if length is not None else None
+        self.finished = False
+        self.reusable = (self._chunked or self._remaining is not None) and (
+            headers.get("connection", "").lower() != "close"
+        )
+
+    async def _read(self, coro: Any) -> bytes:
+        return await asyncio.wait_for(coro, self._timeout)
+
+    async def next_chunk(self) -> Optional[bytes]:
+        """Retorna o próximo bloco de bytes ou ``None`` ao fim do corpo."""
+        if self.finished:
+            return None
+        reader = self._reader
+        if self._chunked:
+            size_line = await self._read(reader.readuntil(b"\r\n"))
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                while (await self._read(reader.readuntil(b"\r\n"))) != b"\r\n":
+                    pass  # descarta *trailers*
+                self.finished = True
+                return None
+            data = await self._read(reader.readexactly(size))
+            await self._read(reader.readexactly(2))
+            return data
+        if self._remaining is not None:
+            if self._remaining == 0:
+                self.finished = True
+                return None
+            data = await self._read(reader.read(min(self._remaining, 65536)))
+            if not data:
+                raise ConnectionError("Conexão encerrada antes do fim do corpo")
+            self._remaining -= len(data)
+            return data
+        data = await self._read(reader.read(65536))
+        if not data:
+            self.finished = True
+            return None
+        return data
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            data = await self.next_chunk()
+            if data is None:
+                return
+            yield data
+
+    async def read_all(self) -> bytes:
+        return b"".join([c async for c in self.chunks()])
+
+
+class AsyncChatClient:
+    """Cliente assíncrono com *pool* de conexões keep-alive.
+
+    Conexões cujo corpo foi consumido por completo voltam ao *pool* e são
+    reutilizadas pelo próximo *stream*; as demais são fechadas. Use como
+    *async context manager* para garantir o fechamento do *pool*::
+
+        async with AsyncChatClient(api_key) as client:
+            async for delta in client.stream_chat(messages, config):
+                ...
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: Optional[str] = None,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        max_idle: int = 4,
+    ) -> None:
+        parts = urlsplit(base_url or transport.API_BASE)
+        self.api_key = api_key
+        self.timeout = timeout
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname or ""
+        self._port = parts.port or (443 if self._https else 80)
+        self._prefix = parts.path.rstrip("/")
+        self._max_idle = max_idle
+        self._idle: List[_Conn] = []
+        self._ssl: Optional[ssl.SSLContext] = (
+            ssl.create_default_context() if self._https else None
+        )
+
+    async def __aenter__(self) -> "AsyncChatClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Fecha todas as conexões ociosas do *pool*."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _connect(self) -> _Conn:
+        return await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port, ssl=self._ssl),
+            self.timeout,
+        )
+
+    def _release(self, conn: _Conn, reusable: bool) -> None:
+        if reusable and len(self._idle) < self._max_idle:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def _send(
+        self, conn: _Conn, path: str, body: bytes
+    ) -> Tuple[int, Dict[str, str]]:
+        reader, writer = conn
+        host = self._host if self._port in (80, 443) else f"{self._host}:{self._port}"
+        head = (
+            f"POST {self._prefix}/{path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            + (f"Authorization: Bearer {self.api_key}\r\n" if self.api_key else "")
+            + "Content-Type: application/json\r\n"
+            "Accept: text/event-stream\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout)
+        status_line, *header_lines = raw.decode("latin-1").split("\r\n")
+        status = int(status_line.split(" ", 2)[1])
+        headers: Dict[str, str] = {}
+        for line in header_lines:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _request(
+        self, path: str, payload: Dict[str, Any]
+    ) -> Tuple[_Conn, int, Dict[str, str]]:
+        body = json.dumps(payload).encode("utf-8")
+        if self._idle:
+            conn = self._idle.pop()
+            try:
+                status, headers = await self._send(conn, path, body)
+                return conn, status, headers
+            except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                # Conexão ociosa fechada pelo servidor: tenta uma nova.
+                conn[1].close()
+        conn = await self._connect()
+        try:
+            status, headers = await self._send(conn, path, body)
+        except BaseException:
+            conn[1].close()
+            raise
+        return conn, status, headers
+
+    async def stream_chat(
+        self, messages: List[Dict[str, Any]], config: Config
+    ) -> AsyncIterator[str]:
+        """Gera os *deltas* de texto de um *chat completion* em streaming.
+
+        Levanta ``RuntimeError`` para respostas diferentes de ``200``, com a
+        mesma mensagem exibida por ``stream_chat_completion``.
+        """
+        payload: Dict[str, Any] = {
+            "model": config.model,
+            "messages": messages,
+            "temperature": config.temperature,
+            "stream": True,
+        }
+        conn, status, headers = await self._request("chat/completions", payload)
+        body = _Body(conn[0], headers, self.timeout)
+        completed = False
+        try:
+            if status != 200:
+                text = (await body.read_all()).decode("utf-8", "replace")
+                completed = True
+                raise RuntimeError(f"Erro {status}: {text}")
+            async for delta in aiter_deltas(body.chunks()):
+                yield delta
+            await body.read_all()  # drena após ``[DONE]`` para reutilizar
+            completed = True
+        finally:
+            self._release(conn, completed and body.finished and body.reusable)
+
+
+async def astream_chat_completion(
+    api_key: str,
+    messages: List[Dict[str, Any]],
+    config: Config,
+    timeout: float = DEFAULT_REQUEST_TIMEOUT,
+) -> AsyncIterator[str]:
+    """Atalho assíncrono equivalente a ``stream_chat_completion``.
+
+    Em vez de imprimir, apenas produz os *deltas*; a aplicação decide como
+    consumi-los. Para várias conversas, prefira compartilhar um
+    ``AsyncChatClient``.
+    """
+    async with AsyncChatClient(api_key, timeout=timeout) as client:
+        async for delta in client.stream_chat(messages, config):
+            yield delta
@@ -0,0 +1,100 @@
+"""Servidor de destino das chamadas: a OpenAI ou um servidor compatível.
+
+A URL base vem, em ordem de precedência, do perfil (``--profile``), da
+variável ``OPENAI_BASE_URL`` ou da chave ``API_BASE`` do arquivo de
+configuração. Ela pode apontar para um servidor de inferência local
+compatível com a OpenAI (llama.cpp, vLLM, Ollama...) ou para um *proxy* de
+cache na mesma máquina, o que elimina a latência da WAN. O mesmo recurso
+permite testar a CLI inteira sem rede, contra ``benchmarks/mock_openai.py``.
+
+Servidores compatíveis costumam implementar só ``/chat/completions``.
+Nesse tipo de *backend*, anexos de texto são incluídos no próprio prompt
+em vez de enviados a ``/files`` e ``/responses``, e a chave da API passa a
+ser opcional.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+OPENAI_HOST: str = "api.openai.com"
+BACKEND_KINDS: Tuple[str, ...] = ("auto", "openai", "compat")
+MAX_INLINE_BYTES: int = 1 << 20
+
+
+class BackendError(ValueError):
+    """``API_BACKEND`` desconhecido ou anexo que o *backend* não aceita."""
+
+
+@dataclass(frozen=True)
+class Backend:
+    """Destino resolvido e o que ele suporta.
+
+    Segue o padrão *Strategy* de forma declarativa: em vez de uma classe
+    por servidor, as diferenças que importam à CLI viram atributos
+    (``files`` e ``key_required``). Uma alternativa mais flexível seria uma
+    hierarquia com métodos por *endpoint*, mas todos os servidores falam o
+    mesmo protocolo e só variam no conjunto de rotas.
+    """
+
+    kind: str
+    base_url: str
+    files: bool
+    key_required: bool
+
+
+def resolve_backend(base_url: str, kind: str = "auto") -> Backend:
+    """Monta o ``Backend`` para ``base_url``.
+
+    No modo ``auto``, o tipo é ``openai`` apenas quando o *host* é
+    ``api.openai.com``. Qualquer outro destino é tratado como ``compat``.
+    """
+    kind = (kind or "auto").strip().lower()
+    if kind not in BACKEND_KINDS:
+        raise BackendError(f"API_BACKEND inválido: {kind} (use {', '.join(BACKEND_KINDS)})")
+    base_url = base_url.rstrip("/")
+    if kind == "auto":
+        kind = "openai" if urlsplit(base_url).hostname == OPENAI_HOST else "compat"
+    official = kind == "openai"
+    return Backend(kind=kind, base_url=base_url, files=official, key_required=official)
+
+
+def auth_headers(api_key: Optional[str]) -> Dict[str, str]:
+    """Cabeçalho ``Authorization``; vazio quando não há chave (*backend* local)."""
+    return {"Authorization": "Bearer " + api_key} if api_key else {}
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Identificador estável da chave para *caches* locais; ``""`` sem chave.
+
+    São 16 dígitos hexadecimais do SHA-256: distinguem contas sem gravar
+    em disco nada que permita recuperar a chave.
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else ""
+
+
+def cache_scope(base_url: str, api_key: Optional[str]) -> str:
+    """Destino e conta de uma chamada, para separar entradas de *caches* locais."""
+    return f"{base_url.rstrip('/')}#{key_fingerprint(api_key)}"
+
+
+def inline_attachments(prompt: str, paths: Sequence[Path]) -> str:
+    """Anexa o conteúdo de arquivos de texto ao prompt.
+
+    É usado com *backends* sem ``/files``. Arquivos binários, que não são
+    UTF-8, ou maiores que ``MAX_INLINE_BYTES`` levantam ``BackendError``.
+    """
+    parts = [prompt] if prompt else []
+    for path in paths:
+        if path.stat().st_size > MAX_INLINE_BYTES:
+            raise BackendError(f"Anexo grande demais para incluir no prompt: {path}")
+        try:
+            text = path.read_text(encoding="utf-8")
+        except UnicodeDecodeError as e:
+            raise BackendError(f"Este backend só aceita anexos de texto: {path}") from e
+        parts.append(f"--- {path.name} ---\n{text}")
+    return "\n\n".join(parts)
@@ -0,0 +1,300 @@
+"""Modo *batch*: executa muitos prompts de um arquivo JSONL concorrentemente.
+
+Cada linha de entrada é um objeto JSON com ``prompt`` e, opcionalmente,
+``model``, ``temperature`` e ``session`` (uma *string* JSON simples também é
+aceita como prompt). As linhas são lidas de forma incremental e despachadas
+para um *pool* de *threads* limitado; os resultados são gravados no JSONL de
+saída na ordem de conclusão, preservando o índice da linha de entrada.
+
+Cada requisição pede uma chave ao ``ratelimit.KeyScheduler``. Com vários
+perfis, ele escolhe a chave menos carregada. Quando todas esgotam o
+orçamento, o *worker* espera o *reset* em vez de acumular ``429``.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+
+from . import (
+    Config,
+    append_history,
+    chat_completion,
+    extract_text_from_data,
+    load_session,
+    load_session_tokens,
+    record_context_trim,
+    save_session,
+)
+from .context import ContextWindow, message_tokens
+from .ratelimit import KeyBudget, KeyScheduler
+from .transport import request_errors
+
+DEFAULT_CONCURRENCY: int = 4
+RATE_LIMIT_ATTEMPTS: int = 3
+
+
+@dataclass
+class BatchItem:
+    """Linha de entrada já validada."""
+
+    index: int
+    prompt: str
+    config: Config
+    session: Optional[str] = None
+
+
+@dataclass
+class BatchStats:
+    """Acumula contadores para o relatório de *throughput*."""
+
+    ok: int = 0
+    failed: int = 0
+    tokens: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        total = self.ok + self.failed
+        return (
+            f"{total} requisições ({self.failed} com erro) em {elapsed:.2f}s: "
+            f"{total / elapsed:.2f} req/s, {self.tokens / elapsed:.1f} tokens/s"
+        )
+
+
+class _SessionTurns:
+    """Serializa, na ordem de entrada, as linhas que compartilham sessão.
+
+    Cada linha recebe um *ticket* no momento do despacho e só lê/grava a
+    sessão quando todas as anteriores da mesma sessão terminaram. Como o
+    executor consome tarefas em ordem FIFO, a predecessora de uma linha em
+    espera já está em execução, o que descarta *deadlocks*.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._issued: Dict[str, int] = {}
+        self._served: Dict[str, int] = {}
+
+    def ticket(self, session: str) -> int:
+        with self._cond:
+            number = self._issued.get(session, 0)
+            self._issued[session] = number + 1
+            return number
+
+    def wait(self, session: str, number: int) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._served.get(session, 0) == number)
+
+    def done(self, session: str) -> None:
+        with self._cond:
+            self._served[session] = self._served.get(session, 0) + 1
+            self._cond.notify_all()
+
+
+def parse_line(index: int, line: str, base: Config) -> BatchItem:
+    """Converte uma linha JSONL em ``BatchItem`` aplicando *overrides*."""
+    raw: Any = json.loads(line)
+    if isinstance(raw, str):
+        raw = {"prompt": raw}
+    if not isinstance(raw, dict) or not isinstance(raw.get("prompt"), str):
+        raise ValueError("linha sem campo 'prompt'")
+    config = base
+    if raw.get("model") or raw.get("temperature") is not None:
+        temperature = float(raw.get("temperature", base.temperature))
+        if not 0.0 <= temperature <= 2.0:
+            raise ValueError("Temperatura deve estar entre 0 e 2")
+        config = replace(
+            base, model=raw.get("model") or base.model, temperature=temperature
+        )
+    session = raw.get("session")
+    return BatchItem(
+        index=index,
+        prompt=raw["prompt"],
+        config=config,
+        session=str(session) if session else None,
+    )
+
+
+def iter_items(
+    lines: Iterable[str], base: Config
+) -> Iterator[Tuple[int, Optional[BatchItem], Optional[str]]]:
+    """Gera ``(índice, item, erro)`` sem carregar o arquivo inteiro.
+
+    Linhas vazias são ignoradas, mas ainda consomem índice, para que ele
+    corresponda ao número da linha (base 0) no arquivo de entrada.
+    """
+    for index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            yield index, parse_line(index, line, base), None
+        except (ValueError, TypeError) as exc:
+            yield index, None, str(exc)
+
+
+class BatchRunner:
+    """Despacha ``BatchItem`` para um *pool* limitado e grava os resultados."""
+
+    def __init__(
+        self,
+        keys: Union[str, KeyScheduler],
+        timeout: float,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        window: Optional[ContextWindow] = None,
+    ) -> None:
+        self.window = window if window is not None else ContextWindow()
+        self.scheduler = (
+            keys if isinstance(keys, KeyScheduler) else KeyScheduler([KeyBudget("default", keys)])
+        )
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.stats = BatchStats()
+        self._turns = _SessionTurns()
+        self._history_lock = threading.Lock()
+
+    def _complete(self, messages: List[Dict[str, Any]], config: Config) -> Tuple[Dict[str, Any], str]:
+        """Chama a API com a chave escolhida pelo escalonador.
+
+        Um ``429`` bloqueia a chave pelo ``Retry-After`` e a requisição volta
+        à fila, possivelmente para outra chave, até ``RATE_LIMIT_ATTEMPTS``.
+        """
+        estimate = sum(message_tokens(m) for m in messages)
+        attempt = 1
+        while True:
+            lease = self.scheduler.acquire(estimate)
+            data: Optional[Dict[str, Any]] = None
+            try:
+                data = chat_completion(
+                    lease.api_key,
+                    messages,
+                    config,
+                    self.timeout,
+                    base_url=lease.base_url,
+                    on_response=lease.observe,
+                    # O ``429`` volta direto para cá, sem prender a chave
+                    # durante os *retries* do transporte.
+                    status_retries=False,
+                )
+            except RuntimeError:
+                if lease.status != 429 or attempt >= RATE_LIMIT_ATTEMPTS:
+                    raise
+            finally:
+                self.scheduler.release(lease, _total_tokens(data) if data else None)
+            if data is not None:
+                return data, lease.budget.name
+            attempt += 1
+
+    def _execute(self, item: BatchItem, ticket: Optional[int]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        if item.session is not None and ticket is not None:
+            self._turns.wait(item.session, ticket)
+        try:
+            history: List[Dict[str, Any]] = (
+                load_session(item.session) if item.session else []
+            )
+            counts = load_session_tokens(item.session) if item.session else []
+            messages = history + [{"role": "user", "content": item.prompt}]
+            # Mesma janela de contexto do modo interativo.
+            context = self.window.fit(messages, counts)
+            if context.trimmed:
+                record_context_trim(item.session, context)
+            data, key_name = self._complete(context.messages, item.config)
+            text = extract_text_from_data(data)
+            if item.session:
+                messages.append({"role": "assistant", "content": text})
+                tokens = list(context.counts) + [message_tokens(messages[-1])]
+                save_session(item.session, messages, tokens)
+        finally:
+            if item.session is not None and ticket is not None:
+                self._turns.done(item.session)
+        with self._history_lock:
+            append_history(item.session, item.prompt, text)
+        usage = data.get("usage") if isinstance(data.get("usage"), dict) else {}
+        return {
+            "index": item.index,
+            "model": item.config.model,
+            "profile": key_name,
+            "session": item.session,
+            "response": text,
+            "usage": usage,
+            "elapsed": round(time.perf_counter() - started, 4),
+        }
+
+    def _record(self, future: "Future[Dict[str, Any]]", index: int) -> Dict[str, Any]:
+        try:
+            result = future.result()
+        except (*request_errors(), RuntimeError, ValueError) as exc:
+            self.stats.failed += 1
+            return {"index": index, "error": str(exc)}
+        self.stats.ok += 1
+        self.stats.tokens += _total_tokens(result)
+        return result
+
+    def run(self, lines: Iterable[str], base: Config, out: TextIO) -> BatchStats:
+        """Processa ``lines`` escrevendo um JSON por linha em ``out``.
+
+        No máximo ``2 * concurrency`` itens ficam em voo, o que mantém o uso
+        de memória constante para arquivos arbitrariamente grandes.
+        """
+        pending: Dict["Future[Dict[str, Any]]", int] = {}
+
+        def drain(block_until: int) -> None:
+            while len(pending) > block_until:
+                done: Set[Future[Dict[str, Any]]]
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    record = self._record(fut, pending.pop(fut))
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for index, item, error in iter_items(lines, base):
+                if item is None:
+                    self.stats.failed += 1
+                    out.write(json.dumps({"index": index, "error": error}) + "\n")
+                    continue
+                ticket = self._turns.ticket(item.session) if item.session else None
+                pending[pool.submit(self._execute, item, ticket)] = index
+                drain(2 * self.concurrency - 1)
+            drain(0)
+        return self.stats
+
+
+def _total_tokens(data: Dict[str, Any]) -> int:
+    usage = data.get("usage")
+    return int(usage.get("total_tokens", 0) or 0) if isinstance(usage, dict) else 0
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    base: Config,
+    keys: Union[str, KeyScheduler],
+    timeout: float,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    window: Optional[ContextWindow] = None,
+) -> BatchStats:
+    """Executa o modo *batch* para a CLI; ``-`` indica stdin/stdout.
+
+    ``keys`` é uma única chave ou um ``KeyScheduler`` montado dos perfis.
+    """
+    runner = BatchRunner(keys, timeout, concurrency, window)
+    src: TextIO = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    dst: TextIO = (
+        sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    )
+    try:
+        stats = runner.run(src, base, dst)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    sys.stderr.write(stats.report() + "\n")
+    return stats
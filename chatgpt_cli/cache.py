@@ -0,0 +1,255 @@
+"""*Cache* local de respostas para *prompts* repetidos.
+
+Opcional (``RESPONSE_CACHE=1`` ou ``--cache``): antes de chamar a API, a CLI
+calcula uma chave canônica a partir de ``Config``, da lista de mensagens
+enviada e do SHA-256 de cada anexo; um acerto é reproduzido pelo mesmo
+``OutputSink`` da resposta real, em pedaços, simulando o *streaming*.
+
+As entradas ficam em ``response_cache.db`` (SQLite), comprimidas com
+``zlib``, e são removidas por TTL e, acima de ``max_bytes``, pela ordem do
+acesso mais antigo (LRU). Acertos e falhas são contados para
+``gpt --cache-stats``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, field, is_dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    import sqlite3
+
+from .output import OutputSink
+from .settings import DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_TTL
+
+CACHE_VERSION: int = 1
+DEFAULT_REPLAY_CHUNK: int = 24
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def cache_key(
+    endpoint: str,
+    config: Any,
+    messages: Sequence[Dict[str, Any]],
+    attachments: Sequence[Tuple[str, str]] = (),
+    scope: str = "",
+) -> str:
+    """Hash canônico de tudo que determina a resposta.
+
+    ``attachments`` são pares ``(campo, sha256)``: o conteúdo, não o caminho
+    nem o ``file_id``, identifica o anexo. ``scope`` é o destino e a conta da
+    chamada (``backend.cache_scope``), para que servidores e perfis
+    diferentes não compartilhem respostas. O JSON é serializado com chaves
+    ordenadas e sem espaços, de modo que dicionários equivalentes coincidam.
+    """
+    payload = {
+        "v": CACHE_VERSION,
+        "endpoint": endpoint,
+        "scope": scope,
+        "config": asdict(config) if is_dataclass(config) else config,
+        "messages": list(messages),
+        "attachments": [list(a) for a in attachments],
+    }
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Contadores e ocupação do *cache*."""
+
+    entries: int
+    size: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self) -> str:
+        return (
+            f"{self.entries} resposta(s) em cache ({self.size / 1024:.1f} KiB); "
+            f"{self.hits} acerto(s), {self.misses} falha(s) "
+            f"({self.hit_rate:.0%} de acerto)"
+        )
+
+
+@dataclass
+class ResponseCache:
+    """Repositório de respostas com despejo LRU limitado por tamanho e TTL.
+
+    Aplica o padrão *Cache-Aside*: quem chama consulta ``get`` e, na falha,
+    faz a requisição e grava com ``put``. Uma alternativa mais leve seria um
+    arquivo por chave no disco, mas o LRU exigiria listar e ordenar o
+    diretório a cada gravação, algo que o índice em ``accessed`` resolve.
+    """
+
+    path: Path
+    max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ttl: float = DEFAULT_CACHE_TTL
+    _conn: Optional[sqlite3.Connection] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=10, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _bump(self, db: sqlite3.Connection, name: str) -> None:
+        db.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta guardada em ``key`` ou ``None`` (conta a falha)."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.ttl > 0 and now - row[1] > self.ttl:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is None:
+                    self._bump(db, "misses")
+                else:
+                    db.execute(
+                        "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                    )
+                    self._bump(db, "hits")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, key: str, text: str) -> None:
+        """Guarda ``text`` e aplica o despejo por TTL e por tamanho."""
+        value = zlib.compress(text.encode("utf-8"))
+        if self.max_bytes > 0 and len(value) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                self._evict(db, now)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        if self.ttl > 0:
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_bytes <= 0:
+            return
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims: List[str] = []
+        for key, size in db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ):
+            victims.append(key)
+            total -= size
+            if total <= self.max_bytes:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in victims])
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            db = self._db()
+            entries, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            counters = dict(db.execute("SELECT name, value FROM stats").fetchall())
+        return CacheStats(
+            entries=entries,
+            size=size,
+            hits=counters.get("hits", 0),
+            misses=counters.get("misses", 0),
+        )
+
+    def clear(self) -> int:
+        """Remove todas as respostas (mantém os contadores)."""
+        with self._lock:
+            cur = self._db().execute("DELETE FROM responses")
+            return cur.rowcount
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+def replay(
+    text: str,
+    sink: OutputSink,
+    chunk: int = DEFAULT_REPLAY_CHUNK,
+    delay: float = 0.0,
+) -> str:
+    """Reproduz ``text`` no ``sink`` em pedaços, como um *stream* da API.
+
+    ``delay`` (segundos entre pedaços) permite imitar o ritmo do modelo; por
+    padrão os pedaços saem sem pausa e o próprio ``sink`` decide o
+    agrupamento, exatamente como com deltas reais.
+    """
+    try:
+        for piece in _chunks(text, max(1, chunk)):
+            sink.write(piece)
+            if delay:
+                time.sleep(delay)
+    finally:
+        sink.close()
+    return text
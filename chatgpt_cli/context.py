@@ -0,0 +1,197 @@
+"""Janela de contexto com orçamento de *tokens* para sessões longas.
+
+Fica entre ``load_session`` e ``stream_chat_completion``: em vez de enviar a
+sessão inteira a cada turno, mantém apenas as mensagens mais recentes que
+cabem em ``budget`` *tokens* (janela deslizante), preserva sempre as
+mensagens ``system`` e, opcionalmente, troca os turnos descartados por um
+resumo extrativo local. A contagem de *tokens* é uma aproximação sem
+dependências do tokenizador da API; os valores por mensagem são memoizados
+no *log* da sessão (campo ``"t"``, ver ``chatgpt_cli.sessions``).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from .settings import DEFAULT_CONTEXT_BUDGET
+
+Message = Dict[str, Any]
+
+DEFAULT_SUMMARY_BUDGET: int = 256
+MESSAGE_OVERHEAD: int = 4
+"""*Tokens* de enquadramento que a API soma a cada mensagem do chat."""
+
+# Palavras longas são fatiadas em pedaços de até 4 caracteres e cada
+# pontuação conta como um *token*, aproximando o BPE dos modelos GPT.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa local do número de *tokens* de ``text``.
+
+    Uma alternativa mais precisa seria o ``tiktoken``, porém com dependência
+    nativa e custo de inicialização desproporcional para a CLI.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+def _content_text(message: Message) -> str:
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False)
+
+
+def message_tokens(message: Message) -> int:
+    """*Tokens* estimados de uma mensagem, incluindo papel e enquadramento."""
+    return (
+        MESSAGE_OVERHEAD
+        + estimate_tokens(str(message.get("role", "")))
+        + estimate_tokens(_content_text(message))
+    )
+
+
+def summarize(messages: Sequence[Message], budget: int) -> str:
+    """Resumo extrativo: a primeira frase de cada turno, até ``budget``.
+
+    Adota o padrão *Template Method* simplificado: cada turno contribui com
+    uma linha ``papel: frase``, na ordem original, enquanto houver orçamento.
+    Um resumo gerado pelo próprio modelo seria mais fiel, mas custaria uma
+    requisição extra justamente quando o contexto já é grande.
+    """
+    lines: List[str] = ["Resumo de turnos anteriores omitidos:"]
+    used = estimate_tokens(lines[0])
+    for m in messages:
+        text = " ".join(_content_text(m).split())
+        if not text:
+            continue
+        first = _SENTENCE_RE.split(text, 1)[0]
+        line = f"- {m.get('role', '?')}: {first}"
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+
+@dataclass
+class ContextResult:
+    """Resultado de ``ContextWindow.fit``.
+
+    ``counts`` acompanha a lista de entrada (não a enviada), pronto para ser
+    memoizado no *log* da sessão; ``dropped`` e ``dropped_tokens`` descrevem
+    o que ficou de fora e ``summary`` o texto que o substituiu, se houver.
+    """
+
+    messages: List[Message]
+    counts: List[int]
+    tokens: int
+    dropped: int = 0
+    dropped_tokens: int = 0
+    summary: Optional[str] = None
+
+    @property
+    def trimmed(self) -> bool:
+        return self.dropped > 0
+
+    def record(self) -> Dict[str, Any]:
+        """Registro do corte para auditoria (gravado na sessão)."""
+        return {
+            "dropped": self.dropped,
+            "dropped_tokens": self.dropped_tokens,
+            "sent_tokens": self.tokens,
+            "summary": self.summary is not None,
+        }
+
+
+@dataclass
+class ContextWindow:
+    """Janela deslizante sobre a sessão, limitada por ``budget`` *tokens*.
+
+    Implementa o padrão *Strategy* para a seleção de contexto: mensagens
+    ``system`` são fixas, a última (o novo *prompt*) sempre é enviada e os
+    turnos anteriores entram do mais recente para o mais antigo enquanto
+    couberem. Uma alternativa mais barata seria limitar pelo número de
+    mensagens, mas uma única resposta longa bastaria para estourar o limite
+    do modelo. ``budget <= 0`` desativa o corte.
+    """
+
+    budget: int = DEFAULT_CONTEXT_BUDGET
+    summary_budget: int = 0
+
+    def counts(
+        self, messages: Sequence[Message], cached: Sequence[Optional[int]] = ()
+    ) -> List[int]:
+        """Contagem por mensagem, reaproveitando ``cached`` quando presente."""
+        result: List[int] = []
+        for i, m in enumerate(messages):
+            known = cached[i] if i < len(cached) else None
+            result.append(known if known is not None else message_tokens(m))
+        return result
+
+    def fit(
+        self, messages: Sequence[Message], cached: Sequence[Optional[int]] = ()
+    ) -> ContextResult:
+        counts = self.counts(messages, cached)
+        total = sum(counts)
+        if self.budget <= 0 or total <= self.budget or not messages:
+            return ContextResult(list(messages), counts, total)
+        summary: Optional[str] = None
+        if self.summary_budget > 0:
+            reserved = self.budget - self.summary_budget
+            keep = self._select(messages, counts, reserved)
+            evicted = [m for i, m in enumerate(messages) if i not in keep]
+            framing = message_tokens({"role": "system", "content": ""})
+            summary = summarize(evicted, self.summary_budget - framing) or None
+        if summary is None:
+            keep = self._select(messages, counts, self.budget)
+        sent: List[Message] = []
+        summary_msg: Optional[Message] = (
+            {"role": "system", "content": summary} if summary else None
+        )
+        for i, m in enumerate(messages):
+            if i not in keep:
+                continue
+            if summary_msg is not None and m.get("role") != "system":
+                sent.append(summary_msg)
+                summary_msg = None
+            sent.append(m)
+        dropped = [i for i in range(len(messages)) if i not in keep]
+        sent_tokens = sum(counts[i] for i in keep) + (
+            message_tokens({"role": "system", "content": summary}) if summary else 0
+        )
+        return ContextResult(
+            messages=sent,
+            counts=counts,
+            tokens=sent_tokens,
+            dropped=len(dropped),
+            dropped_tokens=sum(counts[i] for i in dropped),
+            summary=summary,
+        )
+
+    @staticmethod
+    def _select(
+        messages: Sequence[Message], counts: Sequence[int], budget: int
+    ) -> Set[int]:
+        last = len(messages) - 1
+        keep = {i for i, m in enumerate(messages) if m.get("role") == "system"}
+        keep.add(last)
+        used = sum(counts[i] for i in keep)
+        earliest = last
+        for i in range(last - 1, -1, -1):
+            if i in keep:
+                continue
+            if used + counts[i] > budget:
+                break
+            keep.add(i)
+            used += counts[i]
+            earliest = i
+        # Não inicia a janela com uma resposta órfã de sua pergunta.
+        if earliest < last and messages[earliest].get("role") == "assistant":
+            keep.discard(earliest)
+        return keep
@@ -0,0 +1,400 @@
+"""*Daemon* local que mantém conexões e estado aquecidos entre chamadas.
+
+``gpt --daemon`` escuta em ``~/.local/state/chatgpt-cli/daemon.sock`` (Unix,
+permissão ``0600``). Enquanto ele estiver ativo, a CLI encaminha perguntas
+simples (sem anexos) pelo *socket* em vez de abrir sua própria conexão: o
+*pool* HTTP, a chave da API, o *cache* de respostas e as sessões ficam na
+memória do *daemon*, e os tokens voltam ao cliente à medida que chegam.
+
+Protocolo: uma linha JSON de requisição e, em resposta, linhas JSON
+``{"delta": texto}`` seguidas de ``{"done": true}`` ou ``{"error": msg}``.
+Um ``chat`` cuja ``base_url`` difere da do *daemon* recebe só
+``{"declined": "base_url"}`` e é atendido pela própria CLI.
+As sessões são gravadas em segundo plano (*write-behind*) pelas mesmas
+funções ``save_session``/``append_history`` da CLI, e o processo encerra
+sozinho após ``idle_timeout`` segundos sem clientes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from . import (
+    ApiError,
+    Config,
+    ContextWindow,
+    append_history,
+    _cache_get,
+    get_api_key,
+    iter_chat_deltas,
+    load_session,
+    load_session_tokens,
+    message_tokens,
+    record_context_trim,
+    save_session,
+)
+from . import transport
+from .backend import cache_scope
+from .cache import ResponseCache, cache_key
+from .output import OutputSink
+from .sessions import WriteBehind, get_store
+from .transport import request_errors
+
+SOCKET_NAME: str = "daemon.sock"
+DEFAULT_IDLE_TIMEOUT: float = 900.0
+ACCEPT_POLL: float = 0.5
+
+
+class DaemonError(RuntimeError):
+    """Erro reportado pelo *daemon* ao processar uma requisição."""
+
+
+def socket_path(state_dir: Path) -> Path:
+    return state_dir / SOCKET_NAME
+
+
+class _SocketSink(OutputSink):
+    """Encaminha cada *delta* ao cliente como uma linha JSON."""
+
+    def __init__(self, wfile: BinaryIO) -> None:
+        super().__init__()
+        self._wfile = wfile
+
+    def write(self, text: str) -> None:
+        self._wfile.write(_frame({"delta": text}))
+        self._wfile.flush()
+
+    def close(self) -> None:
+        self._wfile.flush()
+
+
+def _frame(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@dataclass
+class _SessionState:
+    """Cópia em memória de uma sessão e o ``stat`` do arquivo que a espelha."""
+
+    messages: List[Dict[str, Any]]
+    tokens: List[Optional[int]]
+    stat: Optional[Tuple[int, int]]
+    pending: int = 0
+
+
+def _file_stat(name: str) -> Optional[Tuple[int, int]]:
+    from . import SESSIONS_DIR
+
+    try:
+        st = get_store(SESSIONS_DIR).path(name).stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Daemon:
+    """Servidor de perguntas sobre *socket* Unix com estado em memória.
+
+    Aplica o padrão *Proxy*: para o usuário, ``gpt`` continua igual; quando
+    o *daemon* existe, ele é quem fala com a API. Uma alternativa mais leve
+    seria reaproveitar apenas a conexão TLS (ex.: um *proxy* HTTP local),
+    mas chave, sessões e *cache* continuariam sendo relidos a cada chamada.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.response_cache = response_cache
+        self._sessions: Dict[str, _SessionState] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._sessions_lock = threading.Lock()
+        self._writer = WriteBehind()
+        self._active = 0
+        self._last_activity = time.monotonic()
+        self._state_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock: Optional[socket.socket] = None
+
+    # -- ciclo de vida -----------------------------------------------------
+
+    def bind(self) -> None:
+        """Cria o *socket*; falha se outro *daemon* já estiver atendendo."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            if _connect(self.path) is not None:
+                raise DaemonError(f"Daemon já em execução em {self.path}")
+            self.path.unlink()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        sock.listen(16)
+        sock.settimeout(ACCEPT_POLL)
+        self._sock = sock
+
+    def serve(self) -> None:
+        """Atende até ``stop`` ou até ``idle_timeout`` sem clientes."""
+        if self._sock is None:
+            self.bind()
+        assert self._sock is not None
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    if self._idle():
+                        break
+                    continue
+                with self._state_lock:
+                    self._active += 1
+                    self._last_activity = time.monotonic()
+                threading.Thread(
+                    target=self._handle, args=(conn,), daemon=True
+                ).start()
+        finally:
+            self.close()
+
+    def _idle(self) -> bool:
+        with self._state_lock:
+            return (
+                self.idle_timeout > 0
+                and self._active == 0
+                and time.monotonic() - self._last_activity >= self.idle_timeout
+            )
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+        self._writer.flush()
+        self._writer.stop()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def flush(self) -> None:
+        """Espera as gravações pendentes (útil em testes e no desligamento)."""
+        self._writer.flush()
+
+    # -- atendimento -------------------------------------------------------
+
+    def _handle(self, conn: socket.socket) -> None:
+        try:
+            with conn, conn.makefile("rb") as rfile, conn.makefile("wb") as wfile:
+                try:
+                    self._dispatch(rfile.readline(), wfile)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # cliente cancelou (Ctrl-C); o turno não é salvo
+                except Exception as e:
+                    wfile.write(_frame({"error": f"Falha no daemon: {e}"}))
+        except OSError:
+            pass
+        finally:
+            with self._state_lock:
+                self._active -= 1
+                self._last_activity = time.monotonic()
+
+    def _dispatch(self, line: bytes, wfile: BinaryIO) -> None:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            wfile.write(_frame({"error": "Requisição inválida"}))
+            return
+        op = request.get("op")
+        if op == "chat":
+            self._chat(request, wfile)
+        elif op == "ping":
+            wfile.write(_frame({"done": True, "pid": os.getpid()}))
+        elif op == "shutdown":
+            self.stop()
+            wfile.write(_frame({"done": True}))
+        else:
+            wfile.write(_frame({"error": f"Operação desconhecida: {op}"}))
+
+    def _lock(self, name: Optional[str]) -> threading.Lock:
+        """Serializa turnos da mesma sessão; sessões distintas seguem em paralelo."""
+        if not name:
+            return threading.Lock()
+        with self._sessions_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _session(self, name: str) -> _SessionState:
+        """Estado da sessão, relido do disco se outro processo o alterou."""
+        with self._sessions_lock:
+            state = self._sessions.get(name)
+            if state is not None and (state.pending or state.stat == _file_stat(name)):
+                return state
+        state = _SessionState(
+            messages=load_session(name),
+            tokens=load_session_tokens(name),
+            stat=_file_stat(name),
+        )
+        with self._sessions_lock:
+            self._sessions[name] = state
+        return state
+
+    def _persist(
+        self,
+        name: str,
+        state: _SessionState,
+        messages: List[Dict[str, Any]],
+        tokens: List[Optional[int]],
+    ) -> None:
+        save_session(name, messages, tokens)
+        with self._sessions_lock:
+            state.pending -= 1
+            state.stat = _file_stat(name)
+
+    def _chat(self, request: Dict[str, Any], wfile: BinaryIO) -> None:
+        base_url = request.get("base_url")
+        if base_url and base_url.rstrip("/") != transport.API_BASE:
+            # O daemon fala com um único destino; o cliente segue direto.
+            wfile.write(_frame({"declined": "base_url"}))
+            return
+        prompt: str = request["prompt"]
+        session: Optional[str] = request.get("session")
+        config = Config(**request["config"])
+        window = ContextWindow(**request.get("context", {}))
+        timeout = float(request.get("timeout", 30.0))
+        chunk_size = request.get("chunk_size")
+        api_key = request.get("api_key") or get_api_key()
+        sink = _SocketSink(wfile)
+        with self._lock(session):
+            state = self._session(session) if session else None
+            messages = (list(state.messages) if state is not None else []) + [
+                {"role": "user", "content": prompt}
+            ]
+            context = window.fit(messages, state.tokens if state is not None else [])
+            if context.trimmed:
+                self._writer.submit(lambda: record_context_trim(session, context))
+            cache = self.response_cache if request.get("cache") else None
+            slot = (
+                cache_key(
+                    "chat/completions",
+                    config,
+                    context.messages,
+                    scope=cache_scope(transport.API_BASE, api_key),
+                )
+                if cache
+                else None
+            )
+            text = _cache_get(cache, slot) if cache is not None and slot else None
+            cached = text is not None
+            if text is None:
+                parts: List[str] = []
+                deltas = iter_chat_deltas(
+                    api_key, context.messages, config, timeout, chunk_size
+                )
+                try:
+                    for delta in deltas:
+                        sink.write(delta)
+                        parts.append(delta)
+                except ApiError as e:
+                    wfile.write(_frame({"error": str(e)}))
+                    return
+                except request_errors() as e:
+                    wfile.write(_frame({"error": f"Erro de conexão: {e}"}))
+                    return
+                finally:
+                    deltas.close()
+                text = "".join(parts)
+                if cache is not None and slot and text:
+                    answer = text
+                    self._writer.submit(lambda: cache.put(slot, answer))
+            else:
+                sink.write(text)
+            # Enfileira as gravações antes de liberar o cliente: quem chega
+            # depois (ou ``flush``) já as encontra na fila.
+            if state is not None and session:
+                messages.append({"role": "assistant", "content": text})
+                tokens = list(context.counts) + [message_tokens(messages[-1])]
+                with self._sessions_lock:
+                    state.messages = messages
+                    state.tokens = tokens
+                    state.pending += 1
+                self._writer.submit(
+                    lambda: self._persist(session, state, messages, tokens)
+                )
+            response = text
+            self._writer.submit(lambda: append_history(session, prompt, response))
+            wfile.write(_frame({"done": True, "cached": cached}))
+            wfile.flush()
+
+
+def _connect(path: Path) -> Optional[socket.socket]:
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def forward(path: Path, request: Dict[str, Any], sink: OutputSink) -> Optional[str]:
+    """Envia ``request`` ao *daemon* e escreve os deltas em ``sink``.
+
+    Retorna o texto completo, ou ``None`` se não houver *daemon* atendendo
+    ou se ele recusar o pedido por usar outra URL base (o chamador segue
+    pelo caminho direto, com ``sink`` intacto). Erros reportados pelo
+    *daemon* viram ``DaemonError``.
+    """
+    sock = _connect(path)
+    if sock is None:
+        return None
+    parts: List[str] = []
+    declined = False
+    with sock, sock.makefile("rb") as rfile:
+        sock.sendall(_frame(request))
+        try:
+            for line in rfile:
+                message = json.loads(line)
+                if "delta" in message:
+                    sink.write(message["delta"])
+                    parts.append(message["delta"])
+                elif "error" in message:
+                    raise DaemonError(message["error"])
+                elif message.get("declined"):
+                    declined = True
+                    break
+                elif message.get("done"):
+                    break
+            else:
+                raise DaemonError("Conexão com o daemon encerrada inesperadamente")
+        finally:
+            if not declined:
+                sink.close()
+    return None if declined else "".join(parts)
+
+
+def request(path: Path, op: str) -> Optional[Dict[str, Any]]:
+    """Envia uma operação simples (``ping``, ``shutdown``) ao *daemon*."""
+    sock = _connect(path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rb") as rfile:
+        sock.sendall(_frame({"op": op}))
+        line = rfile.readline()
+    return json.loads(line) if line else None
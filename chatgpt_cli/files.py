@@ -0,0 +1,571 @@
+"""Envio e remoção de anexos em ``/v1/files``.
+
+Os anexos são enviados simultaneamente em um *pool* limitado, com o corpo
+*multipart* lido do disco em blocos (sem montar o arquivo inteiro em
+memória), e um *cache* local mapeia o SHA-256 do conteúdo para o ``file_id``
+já devolvido pela API, de modo que perguntas repetidas sobre o mesmo
+documento não reenviam o arquivo.
+
+A remoção também é concorrente, com espera guiada por ``429``/``Retry-After``
+em vez de uma pausa fixa, e todo ``file_id`` enviado é anotado em um
+``FileLedger``, junto com o perfil e a URL base do envio, para que
+``gpt --gc-files`` possa limpar tudo de uma vez com a chave certa.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ``concurrent.futures``, ``subprocess``, ``uuid`` e ``random`` são importados
+# dentro das funções que os usam: a CLI importa este módulo em toda execução,
+# mas só precisa deles quando há anexos a enviar ou remover.
+
+from .backend import auth_headers
+from .sessions import locked_file
+from .settings import DEFAULT_UPLOAD_CACHE_TTL
+from .telemetry import span
+from .transport import api_url, get_session, request_errors
+
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"})
+AUDIO_EXTENSIONS = frozenset({".mp3", ".wav", ".ogg", ".flac", ".m4a"})
+HASH_BLOCK_SIZE: int = 1 << 20
+UPLOAD_PURPOSE: str = "assistants"
+DEFAULT_UPLOAD_CONCURRENCY: int = 4
+DEFAULT_DELETE_CONCURRENCY: int = 4
+DELETE_MAX_ATTEMPTS: int = 5
+DELETE_BACKOFF_BASE: float = 0.5
+DELETE_BACKOFF_MAX: float = 30.0
+DELETED_STATUS = frozenset({200, 202, 204, 404})
+
+
+class UploadError(RuntimeError):
+    """Falha ao enviar um anexo; a mensagem já vem pronta para o usuário."""
+
+
+@dataclass(frozen=True)
+class FileOwner:
+    """Quem enviou um arquivo: o perfil (``None`` = chave padrão) e a URL base.
+
+    Um ``file_id`` só existe para a conta da chave que o enviou; removê-lo
+    com outra chave devolve ``404`` sem apagar nada. ``base_url`` ``None``
+    vale para registros anteriores a este campo e significa a URL atual.
+    """
+
+    profile: Optional[str] = None
+    base_url: Optional[str] = None
+
+
+def attachment_key(path: Path) -> str:
+    """Classifica o anexo no campo de entrada de ``/v1/responses``."""
+    ext = path.suffix.lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "input_image"
+    if ext in AUDIO_EXTENSIONS:
+        return "input_audio"
+    return "input_file"
+
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def sha256_file(path: Path) -> str:
+    """Calcula o SHA-256 lendo o arquivo em blocos de tamanho fixo.
+
+    O resultado é memoizado no processo por caminho, tamanho e ``mtime``, já
+    que o mesmo anexo é consultado pelo *cache* de respostas e pelo de envio.
+    """
+    st = os.stat(path)
+    memo_key = (os.fspath(path), st.st_size, st.st_mtime_ns)
+    digest = _digests.get(memo_key)
+    if digest is not None:
+        return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    digest = _digests[memo_key] = h.hexdigest()
+    return digest
+
+
+class MultipartFileStream:
+    """Corpo ``multipart/form-data`` lido sob demanda.
+
+    Expõe ``read``/``__len__``/``tell``/``seek`` para que o ``requests`` envie
+    o corpo em blocos com ``Content-Length`` conhecido e o ``urllib3`` consiga
+    rebobiná-lo em novas tentativas. A alternativa ``files=`` do ``requests``
+    monta o corpo inteiro em memória antes do envio.
+    """
+
+    def __init__(self, path: Path, fields: Dict[str, str]) -> None:
+        import uuid
+
+        self.boundary = uuid.uuid4().hex
+        head = b"".join(
+            (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+            for name, value in fields.items()
+        )
+        filename = path.name.replace('"', "%22")
+        head += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        self._head = head
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self._file = open(path, "rb")
+        self._file_size = os.fstat(self._file.fileno()).st_size
+        self._pos = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: len(self)}[whence]
+        self._pos = max(0, min(len(self), base + offset))
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        total = len(self)
+        if size is None or size < 0:
+            size = total - self._pos
+        out: List[bytes] = []
+        head_len = len(self._head)
+        file_end = head_len + self._file_size
+        while size > 0 and self._pos < total:
+            if self._pos < head_len:
+                piece = self._head[self._pos : self._pos + size]
+            elif self._pos < file_end:
+                self._file.seek(self._pos - head_len)
+                piece = self._file.read(min(size, file_end - self._pos))
+                if not piece:
+                    raise OSError("Arquivo encolheu durante o envio")
+            else:
+                offset = self._pos - file_end
+                piece = self._tail[offset : offset + size]
+            out.append(piece)
+            self._pos += len(piece)
+            size -= len(piece)
+        return b"".join(out)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "MultipartFileStream":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+@dataclass
+class UploadCache:
+    """*Cache* ``sha256 -> file_id`` persistido em JSON com TTL.
+
+    As leituras/escritas ocorrem sob *lock* e a gravação é atômica
+    (arquivo temporário + ``os.replace``), evitando um JSON corrompido se
+    duas execuções terminarem ao mesmo tempo. ``ttl <= 0`` desativa o cache.
+    ``scope`` (URL base e impressão da chave, ver ``backend.cache_scope``)
+    prefixa cada entrada: um ``file_id`` só existe no servidor e na conta
+    que o enviaram.
+    """
+
+    path: Path
+    ttl: float = DEFAULT_UPLOAD_CACHE_TTL
+    scope: str = ""
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, object]]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        if self._entries is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._entries = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        entries = self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entries), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _slot(self, digest: str) -> str:
+        return f"{self.scope}/{digest}" if self.scope else digest
+
+    def get(self, digest: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._load().get(self._slot(digest))
+        if not entry:
+            return None
+        if time.time() - float(entry.get("uploaded", 0)) > self.ttl:  # type: ignore[arg-type]
+            return None
+        file_id = entry.get("id")
+        return file_id if isinstance(file_id, str) else None
+
+    def put(self, digest: str, file_id: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            for key in [k for k, v in entries.items() if now - float(v.get("uploaded", 0)) > self.ttl]:  # type: ignore[arg-type]
+                del entries[key]
+            entries[self._slot(digest)] = {"id": file_id, "uploaded": now}
+            self._save()
+
+    def discard(self, file_ids: Sequence[str]) -> None:
+        """Remove entradas que apontam para ``file_ids`` (ex.: após exclusão)."""
+        if not file_ids or not self.enabled:
+            return
+        targets = set(file_ids)
+        with self._lock:
+            entries = self._load()
+            stale = [k for k, v in entries.items() if v.get("id") in targets]
+            for key in stale:
+                del entries[key]
+            if stale:
+                self._save()
+
+
+def upload_file(path: Path, api_key: str, timeout: float) -> str:
+    """Envia ``path`` para ``/v1/files`` em streaming e retorna o ``file_id``."""
+    try:
+        with MultipartFileStream(path, {"purpose": UPLOAD_PURPOSE}) as body:
+            resp = get_session().post(
+                api_url("files"),
+                headers={**auth_headers(api_key), "Content-Type": body.content_type},
+                data=body,
+                timeout=timeout,
+            )
+    except request_errors() as e:
+        raise UploadError(f"Erro de conexão ao enviar {path}: {e}") from e
+    except OSError as e:
+        raise UploadError(f"Erro ao fazer upload de {path}: {e}") from e
+    if resp.status_code not in (200, 201):
+        raise UploadError(f"Falha ao enviar {path}: {resp.text}")
+    file_id = resp.json().get("id")
+    if not file_id:
+        raise UploadError(f"Resposta inesperada ao enviar {path}")
+    return file_id
+
+
+@dataclass
+class UploadResult:
+    """Resultado do envio de um anexo."""
+
+    key: str
+    path: Path
+    file_id: str
+    cached: bool
+
+
+def _upload_one(
+    key: str, path: Path, api_key: str, timeout: float, cache: Optional[UploadCache]
+) -> UploadResult:
+    with span("upload", file=path.name) as timing:
+        digest: Optional[str] = None
+        if cache is not None and cache.enabled:
+            digest = sha256_file(path)
+            cached_id = cache.get(digest)
+            if cached_id:
+                timing.set(cached=True)
+                return UploadResult(key, path, cached_id, cached=True)
+        file_id = upload_file(path, api_key, timeout)
+        timing.set(cached=False, bytes=path.stat().st_size)
+        if cache is not None and digest is not None:
+            cache.put(digest, file_id)
+        return UploadResult(key, path, file_id, cached=False)
+
+
+def upload_attachments(
+    attachments: Sequence[Tuple[str, Path]],
+    api_key: str,
+    timeout: float,
+    cache: Optional[UploadCache] = None,
+    concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+    on_done: Optional[Callable[[UploadResult], None]] = None,
+) -> List[UploadResult]:
+    """Envia ``(chave, caminho)`` em paralelo, preservando a ordem de entrada.
+
+    ``on_done`` é chamado (na *thread* do envio) a cada anexo concluído, o que
+    permite exibir progresso. A primeira falha é propagada como
+    ``UploadError`` depois que os envios em andamento terminam.
+    """
+    if not attachments:
+        return []
+
+    def task(key: str, path: Path) -> UploadResult:
+        result = _upload_one(key, path, api_key, timeout, cache)
+        if on_done is not None:
+            on_done(result)
+        return result
+
+    workers = max(1, min(concurrency, len(attachments)))
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(task, key, path) for key, path in attachments]
+        return [f.result() for f in futures]
+
+
+class FileLedger:
+    """Registro *append-only* dos ``file_id`` enviados por esta ferramenta.
+
+    Cada linha é ``{"op": "add"|"del", "id": ...}``; as de ``add`` levam
+    também ``profile`` e ``base`` (ver ``FileOwner``). *Appends* e ``compact``
+    usam o mesmo ``flock`` de ``sessions.locked_file``, de modo que processos
+    concorrentes (por exemplo, a remoção em segundo plano e uma nova
+    execução) não perdem atualizações. ``compact`` reescreve o arquivo apenas
+    com os ids vivos.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _append(self, records: Iterable[Dict[str, object]]) -> None:
+        lines = "".join(json.dumps(r) + "\n" for r in records)
+        if not lines:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with locked_file(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND) as fd:
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b"\n":
+                    lines = "\n" + lines  # isola um registro truncado
+                os.write(fd, lines.encode("utf-8"))
+
+    def add(self, file_ids: Iterable[str], owner: FileOwner = FileOwner()) -> None:
+        now = time.time()
+        self._append(
+            {"op": "add", "id": fid, "ts": now, "profile": owner.profile, "base": owner.base_url}
+            for fid in file_ids
+        )
+
+    def remove(self, file_ids: Iterable[str]) -> None:
+        now = time.time()
+        self._append({"op": "del", "id": fid, "ts": now} for fid in file_ids)
+
+    @staticmethod
+    def _alive(lines: Iterable[str]) -> Dict[str, FileOwner]:
+        alive: Dict[str, FileOwner] = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # registro truncado por uma queda
+            fid = record.get("id")
+            if record.get("op") == "add":
+                alive[fid] = FileOwner(record.get("profile"), record.get("base"))
+            elif record.get("op") == "del":
+                alive.pop(fid, None)
+        return alive
+
+    def owners(self) -> Dict[str, FileOwner]:
+        """Ids enviados e ainda não removidos, na ordem de envio, com o dono."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return self._alive(f)
+        except OSError:
+            return {}
+
+    def live(self) -> List[str]:
+        """Ids enviados e ainda não removidos, na ordem de envio."""
+        return list(self.owners())
+
+    def live_by_owner(self) -> Dict[FileOwner, List[str]]:
+        """``live`` agrupado por ``FileOwner``, para remover cada grupo com a sua chave."""
+        groups: Dict[FileOwner, List[str]] = {}
+        for fid, owner in self.owners().items():
+            groups.setdefault(owner, []).append(fid)
+        return groups
+
+    def compact(self) -> None:
+        """Reescreve o *ledger* atômicamente mantendo só os ids vivos.
+
+        A leitura e o ``os.replace`` acontecem sob o ``flock`` dos *appends*.
+        """
+        with self._lock:
+            try:
+                with locked_file(self.path, os.O_RDWR) as fd:
+                    size = os.fstat(fd).st_size
+                    text = os.pread(fd, size, 0).decode("utf-8", "replace") if size else ""
+                    alive = self._alive(text.splitlines())
+                    tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+                    tmp.write_text(
+                        "".join(
+                            json.dumps({"op": "add", "id": fid, "profile": o.profile, "base": o.base_url})
+                            + "\n"
+                            for fid, o in alive.items()
+                        ),
+                        encoding="utf-8",
+                    )
+                    os.replace(tmp, self.path)
+            except FileNotFoundError:
+                return
+
+
+class _RateGate:
+    """Pausa compartilhada entre os *workers* após um ``429``.
+
+    Quando um *worker* recebe ``429``, todos aguardam até o instante indicado
+    por ``Retry-After`` (ou pelo *backoff* exponencial), evitando que os
+    demais continuem martelando a API durante a janela de limitação.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            delay = self._until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+
+def _retry_after(value: Optional[str], attempt: int) -> float:
+    try:
+        if value is not None:
+            return min(max(float(value), 0.0), DELETE_BACKOFF_MAX)
+    except ValueError:
+        pass
+    backoff = DELETE_BACKOFF_BASE * (2 ** attempt)
+    import random
+
+    return min(backoff + random.uniform(0, backoff / 2), DELETE_BACKOFF_MAX)
+
+
+def delete_file(
+    file_id: str,
+    api_key: str,
+    timeout: float,
+    gate: Optional[_RateGate] = None,
+    base_url: Optional[str] = None,
+    missing_ok: bool = True,
+) -> Optional[str]:
+    """Remove ``file_id``; retorna ``None`` em sucesso ou a mensagem de erro.
+
+    Com ``missing_ok``, ``404`` conta como sucesso (o arquivo já não
+    existe). Só é seguro quando ``api_key`` é a chave que enviou o arquivo:
+    para outra conta, todo id é ``404``. Respostas ``429`` são repetidas até
+    ``DELETE_MAX_ATTEMPTS`` vezes, respeitando ``Retry-After``.
+    """
+    gate = gate or _RateGate()
+    # Sem *retry* de status no transporte: este laço é o único a repetir um
+    # ``429``, e a pausa passa pelo ``_RateGate`` de todos os *workers*.
+    session = get_session(status_retries=False)
+    for attempt in range(DELETE_MAX_ATTEMPTS):
+        gate.wait()
+        try:
+            resp = session.delete(
+                api_url(f"files/{file_id}", base_url),
+                headers=auth_headers(api_key),
+                timeout=timeout,
+            )
+        except request_errors() as e:
+            return f"Erro ao remover arquivo {file_id}: {e}"
+        if resp.status_code == 404 and not missing_ok:
+            return f"Arquivo {file_id} não encontrado com esta chave; mantido no registro de envios"
+        if resp.status_code in DELETED_STATUS:
+            return None
+        if resp.status_code != 429:
+            return f"Erro ao remover arquivo {file_id}: {resp.status_code} {resp.text}"
+        gate.pause(_retry_after(resp.headers.get("Retry-After"), attempt))
+    return f"Erro ao remover arquivo {file_id}: 429 limite de requisições excedido"
+
+
+def delete_files(
+    file_ids: Sequence[str],
+    api_key: str,
+    timeout: float,
+    concurrency: int = DEFAULT_DELETE_CONCURRENCY,
+    ledger: Optional[FileLedger] = None,
+    base_url: Optional[str] = None,
+    missing_ok: bool = True,
+) -> Tuple[List[str], List[str]]:
+    """Remove ``file_ids`` em paralelo; retorna ``(removidos, erros)``.
+
+    Ids removidos com sucesso são baixados do ``ledger``, se informado.
+    ``base_url`` e ``missing_ok`` seguem ``delete_file``.
+    """
+    unique = list(dict.fromkeys(file_ids))
+    if not unique:
+        return [], []
+    gate = _RateGate()
+    workers = max(1, min(concurrency, len(unique)))
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(
+            pool.map(
+                lambda fid: delete_file(fid, api_key, timeout, gate, base_url, missing_ok),
+                unique,
+            )
+        )
+    deleted = [fid for fid, err in zip(unique, outcomes) if err is None]
+    errors = [err for err in outcomes if err is not None]
+    if ledger is not None:
+        ledger.remove(deleted)
+    return deleted, errors
+
+
+def spawn_background_delete(file_ids: Sequence[str], owner: FileOwner = FileOwner()) -> None:
+    """Delega a remoção a um processo desacoplado e retorna imediatamente.
+
+    O filho executa ``python -m chatgpt_cli --delete-file-ids ...`` em nova
+    sessão, herdando o ambiente (inclusive ``OPENAI_API_KEY``, se definido),
+    com ``--profile`` e ``OPENAI_BASE_URL`` do dono dos arquivos. Ele não tem
+    terminal: uma chave cifrada só é obtida do agente, e cabe a quem chama
+    conferir isso antes (ver ``secure_storage.key_unattended``).
+    """
+    import subprocess
+
+    env = os.environ.copy()
+    if owner.base_url:
+        env["OPENAI_BASE_URL"] = owner.base_url
+    profile = ["--profile", owner.profile] if owner.profile else []
+    package_root = str(Path(__file__).resolve().parent.parent)
+    pythonpath = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = f"{package_root}{os.pathsep}{pythonpath}" if pythonpath else package_root
+    subprocess.Popen(
+        [sys.executable, "-m", "chatgpt_cli", *profile, "--delete-file-ids", *file_ids],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        env=env,
+    )
@@ -0,0 +1,387 @@
+"""Histórico de interações com índice de texto completo e rotação.
+
+``history.jsonl`` continua sendo o *log* primário (uma linha JSON por
+interação); ao lado dele, ``history.db`` mantém um índice SQLite FTS5
+atualizado incrementalmente a cada ``append``: apenas os bytes novos do
+*log* são lidos, a partir do *offset* já indexado. Quando o *log* passa de
+``max_bytes``, ele é comprimido em ``history-<timestamp>-<n>.jsonl.gz`` e
+recomeçado; o índice continua cobrindo os segmentos arquivados, e
+``rebuild`` os reindexa caso o banco seja perdido.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    import sqlite3
+
+# ``sqlite3`` e ``gzip`` são importados sob demanda: ``import chatgpt_cli``
+# não deve pagar por eles em comandos que não tocam o histórico.
+
+from .settings import DEFAULT_HISTORY_MAX_BYTES
+
+DEFAULT_SEARCH_LIMIT: int = 20
+CURRENT_SEGMENT: str = ""
+"""Nome de segmento dos registros ainda em ``history.jsonl``."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    session TEXT,
+    segment TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS entries_session ON entries (session, ts);
+CREATE INDEX IF NOT EXISTS entries_segment ON entries (segment);
+"""
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entries_text USING fts5("
+    "prompt, response, tokenize = 'unicode61 remove_diacritics 2')"
+)
+# SQLite sem FTS5: mesma interface, busca por ``LIKE`` (mais lenta).
+_PLAIN_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries_text ("
+    "id INTEGER PRIMARY KEY, prompt TEXT, response TEXT)"
+)
+
+
+@dataclass
+class HistoryHit:
+    """Resultado de busca: metadados e trechos com os termos destacados."""
+
+    timestamp: str
+    session: Optional[str]
+    segment: str
+    prompt: str
+    response: str
+
+
+def _fts_query(terms: str) -> str:
+    """Converte termos livres em uma consulta FTS5 segura (E lógico)."""
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms.split())
+
+
+@dataclass
+class HistoryStore:
+    """Fachada do histórico: *log* JSONL + índice SQLite sincronizado.
+
+    Segue o padrão *Facade*: ``append`` grava e indexa, ``search`` consulta
+    e ``rotate`` arquiva, escondendo o banco do restante da CLI. Uma
+    alternativa mais simples seria um índice invertido próprio em JSON,
+    porém sem ranqueamento BM25 e com reescrita integral a cada atualização.
+    """
+
+    base_dir: Path
+    max_bytes: int = DEFAULT_HISTORY_MAX_BYTES
+    _conn: Optional[sqlite3.Connection] = field(default=None, init=False, repr=False)
+    _fts: bool = field(default=True, init=False, repr=False)
+    _lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False
+    )
+
+    @property
+    def log_path(self) -> Path:
+        return self.base_dir / "history.jsonl"
+
+    @property
+    def db_path(self) -> Path:
+        return self.base_dir / "history.db"
+
+    def segments(self) -> List[Path]:
+        """Segmentos arquivados, do mais antigo para o mais recente."""
+        return sorted(self.base_dir.glob("history-*.jsonl.gz"))
+
+    # -- banco -------------------------------------------------------------
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        import sqlite3
+
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        fresh = not self.db_path.exists()
+        # Transações explícitas (``_write``) serializam processos concorrentes.
+        conn = sqlite3.connect(
+            self.db_path, timeout=10, check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        try:
+            conn.execute(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            self._fts = False
+            conn.execute(_PLAIN_SCHEMA)
+        self._conn = conn
+        if fresh:
+            with self._write() as db:
+                # Outro processo pode ter criado e populado o banco antes.
+                if db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0:
+                    self._index_segments()
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Transação ``IMMEDIATE``: lê o *offset* e indexa sem corrida."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _index_segments(self) -> None:
+        import gzip
+
+        for segment in self.segments():
+            with gzip.open(segment, "rb") as f:
+                self._index_lines(f, segment.name)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _offset(self) -> int:
+        row = self._db().execute(
+            "SELECT value FROM meta WHERE key = 'offset'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _set_offset(self, offset: int) -> None:
+        self._db().execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('offset', ?)",
+            (str(offset),),
+        )
+
+    def _index_lines(self, lines: Iterable[bytes], segment: str) -> int:
+        """Indexa registros completos; retorna os bytes consumidos."""
+        db = self._db()
+        consumed = 0
+        for line in lines:
+            if not line.endswith(b"\n"):
+                break  # registro ainda sendo escrito (ou truncado)
+            consumed += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            cur = db.execute(
+                "INSERT INTO entries (ts, session, segment) VALUES (?, ?, ?)",
+                (str(record.get("timestamp", "")), record.get("session"), segment),
+            )
+            db.execute(
+                "INSERT INTO entries_text (rowid, prompt, response) VALUES (?, ?, ?)",
+                (cur.lastrowid, record.get("prompt") or "", record.get("response") or ""),
+            )
+        return consumed
+
+    def catch_up(self) -> None:
+        """Indexa o que foi acrescentado a ``history.jsonl`` desde a última vez."""
+        with self._write():
+            self._catch_up()
+
+    def _catch_up(self) -> None:
+        offset = self._offset()
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size < offset:
+            # O *log* foi substituído por fora: reindexa o segmento atual.
+            self._drop_segment(CURRENT_SEGMENT)
+            offset = 0
+        if size > offset:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                offset += self._index_lines(f, CURRENT_SEGMENT)
+        self._set_offset(offset)
+
+    def _drop_segment(self, segment: str) -> None:
+        db = self._db()
+        db.execute(
+            "DELETE FROM entries_text WHERE rowid IN "
+            "(SELECT id FROM entries WHERE segment = ?)",
+            (segment,),
+        )
+        db.execute("DELETE FROM entries WHERE segment = ?", (segment,))
+
+    # -- escrita -----------------------------------------------------------
+
+    def append(self, session: Optional[str], prompt: str, response: str) -> None:
+        """Acrescenta uma interação ao *log*, indexa e rotaciona se preciso."""
+        record = {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "session": session,
+            "prompt": prompt,
+            "response": response,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        import sqlite3
+
+        written = False
+        try:
+            with self._write():
+                self._write_line(line)
+                written = True
+                self._catch_up()
+                if 0 < self.max_bytes <= self._offset():
+                    self._rotate()
+        except sqlite3.Error:
+            # Índice indisponível (banco travado ou corrompido): o *log* é a
+            # fonte da verdade e a linha será indexada no próximo ``catch_up``.
+            if not written:
+                self._write_line(line)
+
+    def _write_line(self, line: str) -> None:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def rotate(self) -> Optional[Path]:
+        """Comprime o *log* atual em um segmento ``.jsonl.gz`` pesquisável."""
+        with self._write():
+            return self._rotate()
+
+    def _rotate(self) -> Optional[Path]:
+        self._catch_up()
+        if self._offset() == 0:
+            return None
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        n = 0
+        # O sufixo sequencial mantém a ordem lexicográfica = cronológica.
+        while (target := self.base_dir / f"history-{stamp}-{n:03d}.jsonl.gz").exists():
+            n += 1
+        import gzip
+        import shutil
+
+        tmp = target.with_name(target.name + ".tmp")
+        with open(self.log_path, "rb") as src, gzip.open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, target)
+        # Escritores de ``append`` esperam a transação; o truncamento é seguro.
+        os.truncate(self.log_path, 0)
+        self._db().execute(
+            "UPDATE entries SET segment = ? WHERE segment = ?",
+            (target.name, CURRENT_SEGMENT),
+        )
+        self._set_offset(0)
+        return target
+
+    def rebuild(self) -> int:
+        """Descarta e refaz o índice a partir de todos os segmentos."""
+        with self._write() as db:
+            db.execute("DELETE FROM entries_text")
+            db.execute("DELETE FROM entries")
+            self._set_offset(0)
+            self._index_segments()
+            self._catch_up()
+            return int(db.execute("SELECT COUNT(*) FROM entries").fetchone()[0])
+
+    # -- leitura -----------------------------------------------------------
+
+    def search(
+        self,
+        terms: str,
+        session: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+    ) -> List[HistoryHit]:
+        """Busca interações que contêm todos os ``terms``, por relevância.
+
+        ``since`` é um carimbo ISO (``AAAA-MM-DD`` ou com hora) comparado
+        lexicograficamente ao ``timestamp`` gravado. Sem termos, retorna as
+        interações mais recentes que atendem aos filtros.
+        """
+        self.catch_up()
+        where: List[str] = []
+        params: List[Any] = []
+        columns = "entries_text.prompt, entries_text.response"
+        order = "e.ts DESC, e.id DESC"
+        if self._fts:
+            query = _fts_query(terms)
+            if query:
+                where.append("entries_text MATCH ?")
+                params.append(query)
+                columns = (
+                    "snippet(entries_text, 0, '[', ']', '…', 12), "
+                    "snippet(entries_text, 1, '[', ']', '…', 24)"
+                )
+                order = "rank"
+        else:
+            for term in terms.split():
+                where.append("(entries_text.prompt LIKE ? OR entries_text.response LIKE ?)")
+                params.extend([f"%{term}%"] * 2)
+        if session is not None:
+            where.append("e.session = ?")
+            params.append(session)
+        if since:
+            where.append("e.ts >= ?")
+            params.append(since)
+        sql = (
+            f"SELECT e.ts, e.session, e.segment, {columns} FROM entries_text "
+            "JOIN entries AS e ON e.id = entries_text.rowid "
+        )
+        if where:
+            sql += "WHERE " + " AND ".join(where) + " "
+        sql += f"ORDER BY {order} LIMIT ?"
+        params.append(max(1, limit))
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        return [
+            HistoryHit(
+                timestamp=ts,
+                session=sess,
+                segment=seg or self.log_path.name,
+                prompt=prompt,
+                response=response,
+            )
+            for ts, sess, seg, prompt, response in rows
+        ]
+
+
+_stores: Dict[Path, HistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_history(base_dir: Path) -> HistoryStore:
+    """Retorna o ``HistoryStore`` único do processo para ``base_dir``."""
+    with _stores_lock:
+        store = _stores.get(base_dir)
+        if store is None:
+            store = _stores[base_dir] = HistoryStore(base_dir)
+        return store
+
+
+def format_hit(hit: HistoryHit) -> str:
+    """Formata um resultado em três linhas para o terminal."""
+    prompt = " ".join(hit.prompt.split())
+    response = " ".join(hit.response.split())
+    return (
+        f"{hit.timestamp}  [{hit.session or '-'}]\n"
+        f"  > {prompt}\n"
+        f"  < {response}\n"
+    )
+
+
+def parse_since(value: str) -> str:
+    """Valida ``--since`` e o normaliza para o formato dos carimbos gravados."""
+    from datetime import datetime
+
+    return datetime.fromisoformat(value).strftime('%Y-%m-%dT%H:%M:%S')
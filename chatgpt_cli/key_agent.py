@@ -0,0 +1,266 @@
+"""Agente em memória que guarda a chave derivada da senha por tempo limitado.
+
+Com ``secret.txt`` criptografado, derivar a chave (``scrypt``) custa
+centenas de milissegundos. O primeiro ``gpt`` da sessão paga esse custo e
+inicia este agente, que mantém a chave derivada em memória por ``ttl``
+segundos; as chamadas seguintes a pedem pelo *socket* Unix e só decifram.
+
+* O *socket* fica em ``$XDG_RUNTIME_DIR/chatgpt-cli/agent.sock`` (apagado no
+  *logout*) ou, sem essa variável, em ``~/.local/state/chatgpt-cli``; o
+  diretório tem permissão ``0700`` e o *socket* ``0600``.
+* Conexões de outro usuário são recusadas (``SO_PEERCRED``, no Linux).
+* O processo desativa *core dumps* e, no Linux, ``PR_SET_DUMPABLE`` (o que
+  também impede ``ptrace`` por processos comuns do mesmo usuário).
+* Ao expirar, a chave é sobrescrita com zeros; sem chaves válidas, o agente
+  encerra sozinho. ``gpt --lock-key`` descarta tudo na hora.
+
+Protocolo: uma linha JSON por conexão — ``{"op": "get", "fingerprint"}``,
+``{"op": "put", "fingerprint", "key", "ttl"}``, ``{"op": "forget"}`` ou
+``{"op": "ping"}`` — e uma linha JSON de resposta.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import socket
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .settings import DEFAULT_AGENT_TTL
+
+SOCKET_NAME: str = "agent.sock"
+ACCEPT_POLL: float = 0.5
+CLIENT_TIMEOUT: float = 2.0
+SPAWN_WAIT: float = 2.0
+
+
+def socket_path(state_dir: Path) -> Path:
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    base = Path(runtime) / "chatgpt-cli" if runtime else state_dir
+    return base / SOCKET_NAME
+
+
+def _harden() -> None:
+    """Reduz as formas de a chave sair da memória do processo (melhor esforço)."""
+    try:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    except (ImportError, ValueError, OSError):
+        pass
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+
+            ctypes.CDLL(None).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE = 0
+        except (OSError, AttributeError):
+            pass
+
+
+def _peer_uid(conn: socket.socket) -> Optional[int]:
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def _frame(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+class KeyAgent:
+    """Servidor de chaves derivadas com expiração absoluta.
+
+    Aplica o padrão *Monitor* de forma simples: um único *thread* atende
+    uma conexão por vez, já que cada pedido é uma linha curta. Uma
+    alternativa mais escalável seria um *thread* por cliente, como no
+    ``daemon``, mas aqui só haveria mais código tocando a chave.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: Dict[str, Tuple[bytearray, float]] = {}
+        self._sock: Optional[socket.socket] = None
+        self._stopped = False
+
+    def put(self, fingerprint: str, key: bytes, ttl: float) -> None:
+        self._discard(fingerprint)
+        self._entries[fingerprint] = (bytearray(key), time.monotonic() + ttl)
+
+    def _discard(self, fingerprint: str) -> None:
+        entry = self._entries.pop(fingerprint, None)
+        if entry is not None:
+            entry[0][:] = bytes(len(entry[0]))
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for fingerprint in [f for f, (_, exp) in self._entries.items() if exp <= now]:
+            self._discard(fingerprint)
+
+    def bind(self) -> None:
+        """Cria o *socket*; ``RuntimeError`` se outro agente já atende."""
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(self.path.parent, 0o700)
+        if self.path.exists():
+            if _call(self.path, {"op": "ping"}) is not None:
+                raise RuntimeError(f"Agente já em execução em {self.path}")
+            self.path.unlink()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        sock.listen(8)
+        sock.settimeout(ACCEPT_POLL)
+        self._sock = sock
+
+    def serve(self) -> None:
+        """Atende até não restar chave válida ou até ``forget``."""
+        if self._sock is None:
+            self.bind()
+        assert self._sock is not None
+        try:
+            while not self._stopped:
+                self._purge()
+                if not self._entries:
+                    break
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                with conn:
+                    self._handle(conn)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for fingerprint in list(self._entries):
+            self._discard(fingerprint)
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _handle(self, conn: socket.socket) -> None:
+        try:
+            conn.settimeout(CLIENT_TIMEOUT)
+            uid = _peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                return
+            with conn.makefile("rb") as rfile:
+                line = rfile.readline()
+            conn.sendall(_frame(self._dispatch(json.loads(line))))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "get":
+            self._purge()
+            entry = self._entries.get(str(request.get("fingerprint")))
+            return {"key": base64.b64encode(entry[0]).decode("ascii") if entry else None}
+        if op == "put":
+            ttl = float(request["ttl"])
+            self.put(str(request["fingerprint"]), base64.b64decode(request["key"]), ttl)
+            return {"ok": True}
+        if op == "forget":
+            for fingerprint in list(self._entries):
+                self._discard(fingerprint)
+            self._stopped = True
+            return {"ok": True}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "keys": len(self._entries)}
+        return {"error": f"Operação desconhecida: {op}"}
+
+
+def _call(path: Path, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Envia ``message`` ao agente; ``None`` se não houver agente atendendo."""
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT)
+    try:
+        with sock:
+            sock.connect(str(path))
+            sock.sendall(_frame(message))
+            with sock.makefile("rb") as rfile:
+                line = rfile.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+def fetch(path: Path, fingerprint: str) -> Optional[bytes]:
+    reply = _call(path, {"op": "get", "fingerprint": fingerprint})
+    key = reply.get("key") if reply else None
+    return base64.b64decode(key) if key else None
+
+
+def forget(path: Path) -> bool:
+    """Descarta as chaves e encerra o agente; ``False`` se não havia agente."""
+    return _call(path, {"op": "forget"}) is not None
+
+
+def store(path: Path, fingerprint: str, key: bytes, ttl: float) -> None:
+    """Entrega ``key`` ao agente, iniciando-o se preciso.
+
+    O agente novo recebe a primeira chave pela entrada padrão, antes de
+    criar o *socket*: ela nunca aparece em argumentos nem no ambiente.
+    """
+    message = {"fingerprint": fingerprint, "key": base64.b64encode(key).decode("ascii"), "ttl": ttl}
+    if _call(path, {"op": "put", **message}) is not None:
+        return
+    import subprocess
+
+    env = os.environ.copy()
+    package_root = str(Path(__file__).resolve().parent.parent)
+    pythonpath = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = f"{package_root}{os.pathsep}{pythonpath}" if pythonpath else package_root
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "chatgpt_cli.key_agent", str(path)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        env=env,
+    )
+    assert proc.stdin is not None
+    with proc.stdin:
+        proc.stdin.write(json.dumps(message).encode("utf-8"))
+    # Espera o agente responder (não só o *socket* existir: entre ``bind`` e
+    # ``listen`` uma conexão seria recusada) para que a próxima chamada já
+    # o encontre.
+    deadline = time.monotonic() + SPAWN_WAIT
+    while time.monotonic() < deadline and proc.poll() is None:
+        if _call(path, {"op": "ping"}) is not None:
+            break
+        time.sleep(0.01)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """``python -m chatgpt_cli.key_agent SOCKET``; a primeira chave vem do stdin."""
+    args = sys.argv[1:] if argv is None else argv
+    _harden()
+    first = json.loads(sys.stdin.read())
+    agent = KeyAgent(Path(args[0]))
+    agent.put(first["fingerprint"], base64.b64decode(first["key"]), float(first["ttl"]))
+    del first
+    try:
+        agent.bind()
+    except (RuntimeError, OSError):
+        agent.close()
+        sys.exit(1)
+    agent.serve()
+
+
+if __name__ == "__main__":
+    main()
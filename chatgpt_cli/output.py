@@ -0,0 +1,168 @@
+"""Destinos de saída (*sinks*) para o texto recebido em streaming.
+
+Todo texto de resposta exibido pela CLI passa por um ``OutputSink``, o que
+permite trocar a política de escrita sem tocar no laço de streaming e medir
+cada política isoladamente (ver ``benchmarks/bench_output.py``):
+
+* ``CoalescingSink``: para terminais; agrupa *deltas* e escreve a cada
+  ``interval`` segundos ou ``max_bytes`` caracteres, mas escreve na hora
+  quando os tokens chegam mais devagar que o intervalo;
+* ``BufferedSink``: para *pipes*/arquivos; deixa o *buffer* do próprio
+  ``TextIO`` agir e só força ``flush`` ao final;
+* ``FinalOnlySink``: ``--no-stream-output``; emite apenas o texto final.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, TextIO
+
+from .settings import DEFAULT_FLUSH_BYTES, DEFAULT_FLUSH_INTERVAL
+
+
+class OutputSink(ABC):
+    """Interface dos destinos de saída, no padrão *Strategy*."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        # ``sys.stdout`` é resolvido na criação para respeitar
+        # ``contextlib.redirect_stdout``.
+        self.stream: TextIO = stream if stream is not None else sys.stdout
+
+    @abstractmethod
+    def write(self, text: str) -> None:
+        """Recebe um *delta* de texto."""
+
+    def close(self) -> None:
+        """Finaliza a resposta com quebra de linha e descarrega o *buffer*."""
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class BufferedSink(OutputSink):
+    """Escreve sem ``flush`` por *delta*; adequado quando stdout não é TTY."""
+
+    def write(self, text: str) -> None:
+        self.stream.write(text)
+
+
+class FinalOnlySink(OutputSink):
+    """Acumula todos os *deltas* e escreve o texto completo no fechamento."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        super().__init__(stream)
+        self._parts: List[str] = []
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+
+    def close(self) -> None:
+        self.stream.write("".join(self._parts))
+        self._parts = []
+        super().close()
+
+
+class CoalescingSink(OutputSink):
+    """Agrupa *deltas* por tempo e tamanho para exibição em terminal.
+
+    Um *delta* que chega após um intervalo ocioso maior que ``interval`` é
+    escrito imediatamente (o *stream* está lento, não há o que agrupar). Em
+    rajadas, os *deltas* são acumulados e uma *thread* auxiliar garante que
+    nenhum fique retido por mais de ``interval`` segundos, mesmo que o
+    próximo token demore.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_bytes: int = DEFAULT_FLUSH_BYTES,
+    ) -> None:
+        super().__init__(stream)
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self._parts: List[str] = []
+        self._size = 0
+        self._last_flush = 0.0
+        self._deadline = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, text: str) -> None:
+        now = time.monotonic()
+        with self._cond:
+            if not self._parts and now - self._last_flush >= self.interval:
+                self._emit(text, now)
+                return
+            if not self._parts:
+                self._deadline = now + self.interval
+                self._ensure_thread()
+                self._cond.notify()
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= self.max_bytes:
+                self._flush_locked(now)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._flush_locked(time.monotonic())
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        super().close()
+
+    def _emit(self, text: str, now: float) -> None:
+        self.stream.write(text)
+        self.stream.flush()
+        self._last_flush = now
+
+    def _flush_locked(self, now: float) -> None:
+        if self._parts:
+            text = "".join(self._parts)
+            self._parts = []
+            self._size = 0
+            self._emit(text, now)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        with self._cond:
+            while not self._closed:
+                if not self._parts:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._flush_locked(time.monotonic())
+
+
+def select_sink(
+    stream: Optional[TextIO] = None,
+    *,
+    final_only: bool = False,
+    interval: float = DEFAULT_FLUSH_INTERVAL,
+    max_bytes: int = DEFAULT_FLUSH_BYTES,
+) -> OutputSink:
+    """Escolhe o *sink* adequado ao destino, no padrão *Factory Method*."""
+    stream = stream if stream is not None else sys.stdout
+    if final_only:
+        return FinalOnlySink(stream)
+    isatty = getattr(stream, "isatty", None)
+    if isatty is not None and isatty():
+        return CoalescingSink(stream, interval, max_bytes)
+    return BufferedSink(stream)
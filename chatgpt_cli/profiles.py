@@ -0,0 +1,126 @@
+"""Perfis nomeados: chave, modelo padrão, URL base e limites por perfil.
+
+Ficam em ``~/.config/chatgpt-cli/profiles.ini``, separados do arquivo
+``config`` (que continua com uma chave ``CHAVE=valor`` por linha). Cada
+seção é um perfil::
+
+    [trabalho]
+    key_file = ~/.local/share/chatgpt-cli/trabalho.txt
+    model = gpt-4o
+    rpm = 500
+    tpm = 200000
+
+    [pessoal]
+    key_env = OPENAI_API_KEY_PESSOAL
+    base_url = https://api.openai.com/v1
+
+``key_file`` aceita o mesmo formato de ``secret.txt``, inclusive
+criptografado. A chave em si nunca é escrita no ``.ini``.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .ratelimit import KeyBudget
+from .secure_storage import KeyLocation, load_api_key
+
+PROFILES_PATH = Path.home() / ".config/chatgpt-cli/profiles.ini"
+
+
+class ProfileError(ValueError):
+    """``profiles.ini`` inválido, perfil inexistente ou chave indisponível."""
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Um perfil de ``profiles.ini``; ``rpm``/``tpm`` em ``0`` = sem limite local."""
+
+    name: str
+    key_env: Optional[str] = None
+    key_file: Optional[Path] = None
+    model: Optional[str] = None
+    base_url: Optional[str] = None
+    rpm: int = 0
+    tpm: int = 0
+
+    @property
+    def key_location(self) -> Optional[KeyLocation]:
+        """Arquivo de chave do perfil; ``None`` quando a chave vem de ``key_env``."""
+        if self.key_env or self.key_file is None:
+            return None
+        return KeyLocation(base_dir=self.key_file.parent, file_name=self.key_file.name)
+
+    def api_key(
+        self,
+        passphrase: Optional[Callable[[], Optional[str]]] = None,
+        agent: Optional[Path] = None,
+        agent_ttl: float = 0.0,
+    ) -> str:
+        """Lê a chave do perfil: variável de ambiente ou arquivo de chave."""
+        if self.key_env:
+            value = os.environ.get(self.key_env)
+            if not value:
+                raise ProfileError(f"Perfil {self.name}: variável {self.key_env} não definida")
+            return value
+        loc = self.key_location
+        assert loc is not None
+        try:
+            return load_api_key(loc=loc, passphrase=passphrase, agent=agent, agent_ttl=agent_ttl)
+        except OSError as e:
+            raise ProfileError(f"Perfil {self.name}: não foi possível ler {self.key_file}: {e}") from e
+
+    def budget(self, api_key: str) -> KeyBudget:
+        return KeyBudget(self.name, api_key, base_url=self.base_url, rpm=self.rpm, tpm=self.tpm)
+
+
+def load_profiles(path: Optional[Path] = None) -> Dict[str, Profile]:
+    """Perfis de ``path`` (padrão ``PROFILES_PATH``) na ordem do arquivo.
+
+    Arquivo ausente resulta em ``{}``. Seções sem ``key_env`` nem
+    ``key_file`` e limites não numéricos levantam ``ProfileError``.
+    """
+    from configparser import ConfigParser, Error
+
+    path = PROFILES_PATH if path is None else path
+    parser = ConfigParser(interpolation=None)
+    try:
+        if not parser.read(path, encoding="utf-8"):
+            return {}
+    except Error as e:
+        raise ProfileError(f"{path}: {e}") from e
+    profiles: Dict[str, Profile] = {}
+    for name in parser.sections():
+        section = parser[name]
+        key_env = section.get("key_env") or None
+        key_file = section.get("key_file") or None
+        if not key_env and not key_file:
+            raise ProfileError(f"Perfil {name}: defina key_env ou key_file")
+        try:
+            rpm = max(0, section.getint("rpm", 0))
+            tpm = max(0, section.getint("tpm", 0))
+        except ValueError as e:
+            raise ProfileError(f"Perfil {name}: limite inválido ({e})") from e
+        profiles[name] = Profile(
+            name=name,
+            key_env=key_env,
+            key_file=Path(key_file).expanduser() if key_file else None,
+            model=section.get("model") or None,
+            base_url=(section.get("base_url") or "").rstrip("/") or None,
+            rpm=rpm,
+            tpm=tpm,
+        )
+    return profiles
+
+
+def select_profiles(profiles: Dict[str, Profile], names: Sequence[str]) -> List[Profile]:
+    """Perfis em ``names`` (todos, se vazio); nome desconhecido é erro."""
+    if not names:
+        return list(profiles.values())
+    missing = [n for n in names if n not in profiles]
+    if missing:
+        raise ProfileError(f"Perfil não encontrado: {', '.join(missing)}")
+    return [profiles[n] for n in names]
@@ -0,0 +1,210 @@
+"""Escalonador de requisições entre várias chaves com orçamento por chave.
+
+Cada chave (ver ``profiles``) tem um ``KeyBudget`` com as requisições e os
+*tokens* que ainda restam na janela atual. Os valores vêm dos cabeçalhos
+``x-ratelimit-*`` de cada resposta e, antes da primeira resposta, dos
+limites ``rpm``/``tpm`` declarados no perfil. ``KeyScheduler.acquire``
+entrega a chave menos carregada que ainda tem orçamento. Quando todas estão
+esgotadas, a chamada espera o próximo *reset* em vez de falhar com ``429``.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover
+    from requests import Response
+
+WINDOW: float = 60.0
+DEFAULT_COOLDOWN: float = 1.0
+MAX_WAIT_STEP: float = 5.0
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS: Dict[str, float] = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(text: Optional[str]) -> Optional[float]:
+    """Converte ``"6m0s"``, ``"20ms"`` ou ``"1.5"`` em segundos.
+
+    Valores sem unidade são lidos como segundos. Devolve ``None`` para o
+    que não reconhece.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    parts = _DURATION.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        return None
+    return sum(float(n) * _UNITS[u] for n, u in parts)
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+@dataclass
+class KeyBudget:
+    """Estado de uma chave: orçamento restante, *resets* e carga atual.
+
+    ``rpm``/``tpm`` (``0`` = sem limite local) abrem uma janela de 60 s
+    contada no cliente. Os cabeçalhos da API só podem reduzir o que essa
+    janela permite. Os instantes usam ``time.monotonic``.
+    """
+
+    name: str
+    api_key: str = field(repr=False)
+    base_url: Optional[str] = None
+    rpm: int = 0
+    tpm: int = 0
+    remaining_requests: Optional[int] = None
+    remaining_tokens: Optional[int] = None
+    requests_reset: float = 0.0
+    tokens_reset: float = 0.0
+    blocked_until: float = 0.0
+    in_flight: int = 0
+    reserved_tokens: int = 0
+
+    def refresh(self, now: float) -> None:
+        """Reabre as janelas cujo *reset* já passou."""
+        if self.requests_reset <= now:
+            self.remaining_requests = self.rpm or None
+            self.requests_reset = now + WINDOW if self.rpm else float("inf")
+        if self.tokens_reset <= now:
+            self.remaining_tokens = self.tpm or None
+            self.tokens_reset = now + WINDOW if self.tpm else float("inf")
+
+    def can_take(self, now: float, tokens: int) -> bool:
+        if self.blocked_until > now:
+            return False
+        if self.remaining_requests is not None and self.remaining_requests - self.in_flight <= 0:
+            return False
+        if self.remaining_tokens is None:
+            return True
+        free = self.remaining_tokens - self.reserved_tokens
+        # Um pedido maior que a janela inteira ainda passa quando a chave
+        # está ociosa; caso contrário, esperaria para sempre.
+        return free >= tokens or (self.in_flight == 0 and free > 0)
+
+    def next_change(self, now: float) -> Optional[float]:
+        """Próximo instante em que ``can_take`` pode mudar sem um ``release``."""
+        times = [t for t in (self.blocked_until, self.requests_reset, self.tokens_reset) if t > now]
+        finite = [t for t in times if t != float("inf")]
+        return min(finite) if finite else None
+
+    def observe(self, now: float, status: int, headers: Mapping[str, str], tokens: int) -> None:
+        """Desconta a requisição concluída e aplica os cabeçalhos recebidos."""
+        if self.remaining_requests is not None:
+            self.remaining_requests = max(0, self.remaining_requests - 1)
+        if self.remaining_tokens is not None:
+            self.remaining_tokens = max(0, self.remaining_tokens - tokens)
+        for kind in ("requests", "tokens"):
+            remaining = _int_header(headers, f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            current = getattr(self, f"remaining_{kind}")
+            setattr(self, f"remaining_{kind}", remaining if current is None else min(current, remaining))
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            due = now + (reset if reset is not None else WINDOW)
+            current_reset = getattr(self, f"{kind}_reset")
+            if current_reset != float("inf"):
+                due = max(due, current_reset)  # a janela local também vale
+            setattr(self, f"{kind}_reset", due)
+        if status == 429:
+            wait = parse_duration(headers.get("retry-after"))
+            if wait is None:
+                wait = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            self.blocked_until = now + (wait if wait is not None else DEFAULT_COOLDOWN)
+
+
+@dataclass
+class Lease:
+    """Reserva de uma chave para uma requisição; devolvida com ``release``."""
+
+    budget: KeyBudget
+    tokens: int
+    status: int = 0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def api_key(self) -> str:
+        return self.budget.api_key
+
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.budget.base_url
+
+    def observe(self, response: "Response") -> None:
+        """Callback ``on_response``: guarda o *status* e os cabeçalhos de limite."""
+        self.status = response.status_code
+        self.headers = {
+            k.lower(): v
+            for k, v in response.headers.items()
+            if k.lower().startswith("x-ratelimit-") or k.lower() == "retry-after"
+        }
+
+
+class KeyScheduler:
+    """Distribui requisições entre chaves segundo o orçamento de cada uma.
+
+    Segue o padrão *Monitor*: um único ``Condition`` protege todos os
+    ``KeyBudget``, e quem não encontra chave livre dorme até um ``release``
+    ou até o próximo *reset*. Uma alternativa mais simples seria o
+    *round-robin*, mas ele continua mandando requisições para uma chave
+    esgotada enquanto outras estão ociosas.
+    """
+
+    def __init__(self, budgets: Sequence[KeyBudget]) -> None:
+        if not budgets:
+            raise ValueError("Nenhuma chave para o escalonador")
+        self.budgets: List[KeyBudget] = list(budgets)
+        self._cond = threading.Condition()
+
+    def _pick(self, now: float, tokens: int) -> Optional[KeyBudget]:
+        best: Optional[KeyBudget] = None
+        for budget in self.budgets:
+            budget.refresh(now)
+            if not budget.can_take(now, tokens):
+                continue
+            # Menos requisições em voo; no empate, mais tokens sobrando.
+            if best is None or (budget.in_flight, -(budget.remaining_tokens or 1 << 62)) < (
+                best.in_flight,
+                -(best.remaining_tokens or 1 << 62),
+            ):
+                best = budget
+        return best
+
+    def acquire(self, tokens: int = 0) -> Lease:
+        """Reserva a chave menos carregada, esperando se todas estiverem esgotadas."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                budget = self._pick(now, tokens)
+                if budget is not None:
+                    budget.in_flight += 1
+                    budget.reserved_tokens += tokens
+                    return Lease(budget, tokens)
+                changes = [t for t in (b.next_change(now) for b in self.budgets) if t is not None]
+                wait = min(changes) - now if changes else MAX_WAIT_STEP
+                self._cond.wait(min(max(wait, 0.001), MAX_WAIT_STEP))
+
+    def release(self, lease: Lease, tokens_used: Optional[int] = None) -> None:
+        """Devolve ``lease`` e aplica o que a resposta informou sobre os limites."""
+        with self._cond:
+            budget = lease.budget
+            budget.in_flight -= 1
+            budget.reserved_tokens -= lease.tokens
+            if lease.status:
+                used = lease.tokens if tokens_used is None else tokens_used
+                budget.observe(time.monotonic(), lease.status, lease.headers, used)
+            self._cond.notify_all()
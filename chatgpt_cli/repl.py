@@ -0,0 +1,165 @@
+"""Modo interativo (``gpt --repl``) com a conversa mantida em memória.
+
+Em vez de uma execução da CLI por turno — relendo e regravando a sessão a
+cada pergunta —, o REPL carrega a sessão uma vez, reutiliza a conexão HTTP
+do processo (``transport.get_session``) e envia cada turno concluído a uma
+fila de gravação (``sessions.WriteBehind``): a próxima pergunta já pode ser
+feita enquanto sessão e histórico são gravados. Como o ``SessionStore`` só
+acrescenta os turnos novos ao *log*, cada gravação escreve apenas o delta.
+
+``Ctrl-C`` durante uma resposta cancela apenas aquele *stream*: o turno
+interrompido é descartado e a sessão continua intacta. ``Ctrl-D`` ou
+``/sair`` encerram depois de concluir as gravações pendentes.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from . import (
+    ApiError,
+    Config,
+    ContextWindow,
+    OutputSink,
+    append_history,
+    iter_chat_deltas,
+    load_session,
+    load_session_tokens,
+    message_tokens,
+    record_context_trim,
+    save_session,
+)
+from .sessions import WriteBehind
+from .transport import request_errors
+
+PROMPT: str = "você> "
+EXIT_COMMANDS = frozenset({"/sair", "/exit", "/quit"})
+CLEAR_COMMAND: str = "/limpar"
+
+
+@dataclass
+class Repl:
+    """Laço leitura-resposta sobre uma conversa em memória.
+
+    Segue o padrão *Unit of Work*: ``messages``/``tokens`` são a fonte da
+    verdade durante a execução e cada turno aceito vira uma gravação
+    enfileirada. Uma alternativa mais enxuta seria gravar tudo apenas na
+    saída, mas uma queda do terminal perderia a conversa inteira.
+    """
+
+    api_key: str
+    config: Config
+    window: ContextWindow
+    timeout: float
+    chunk_size: Optional[int]
+    make_sink: Callable[[], OutputSink]
+    session: Optional[str] = None
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: List[Optional[int]] = field(default_factory=list)
+    writer: WriteBehind = field(default_factory=WriteBehind)
+
+    def __post_init__(self) -> None:
+        if self.session and not self.messages:
+            self.messages = load_session(self.session)
+            self.tokens = load_session_tokens(self.session)
+
+    def ask(self, prompt: str) -> Optional[str]:
+        """Envia ``prompt`` com o contexto atual; ``None`` se não concluiu.
+
+        Em caso de erro ou ``Ctrl-C``, nada é acrescentado à conversa.
+        """
+        messages = self.messages + [{"role": "user", "content": prompt}]
+        context = self.window.fit(messages, self.tokens)
+        if context.trimmed:
+            self.writer.submit(lambda: record_context_trim(self.session, context))
+        sink = self.make_sink()
+        parts: List[str] = []
+        deltas = iter_chat_deltas(
+            self.api_key, context.messages, self.config, self.timeout, self.chunk_size
+        )
+        try:
+            for delta in deltas:
+                sink.write(delta)
+                parts.append(delta)
+        except KeyboardInterrupt:
+            sink.close()
+            sys.stderr.write("[resposta interrompida]\n")
+            return None
+        except ApiError as e:
+            sink.close()
+            sys.stderr.write(f"{e}\n")
+            return None
+        except request_errors() as e:
+            sink.close()
+            sys.stderr.write(f"Erro de conexão: {e}\n")
+            return None
+        finally:
+            deltas.close()
+        sink.close()
+        text = "".join(parts)
+        messages.append({"role": "assistant", "content": text})
+        self.messages = messages
+        self.tokens = list(context.counts) + [message_tokens(messages[-1])]
+        self._persist(prompt, text)
+        return text
+
+    def _persist(self, prompt: str, text: str) -> None:
+        session = self.session
+        if session:
+            messages, tokens = list(self.messages), list(self.tokens)
+            self.writer.submit(lambda: save_session(session, messages, tokens))
+        self.writer.submit(lambda: append_history(session, prompt, text))
+
+    def clear(self) -> None:
+        """Esquece a conversa em memória (a sessão em disco é truncada)."""
+        self.messages, self.tokens = [], []
+        if self.session:
+            session = self.session
+            self.writer.submit(lambda: save_session(session, [], []))
+
+    def close(self) -> None:
+        """Conclui as gravações pendentes e encerra a fila."""
+        self.writer.flush()
+        self.writer.stop()
+
+    def run(
+        self,
+        first_prompt: Optional[str] = None,
+        read: Callable[[str], str] = input,
+    ) -> None:
+        """Lê perguntas até ``Ctrl-D`` ou ``/sair``."""
+        _enable_line_editing()
+        try:
+            if first_prompt:
+                self.ask(first_prompt)
+            while True:
+                try:
+                    line = read(PROMPT).strip()
+                except KeyboardInterrupt:
+                    sys.stderr.write("\n")
+                    continue
+                except EOFError:
+                    sys.stderr.write("\n")
+                    break
+                if not line:
+                    continue
+                if line in EXIT_COMMANDS:
+                    break
+                if line == CLEAR_COMMAND:
+                    self.clear()
+                    continue
+                self.ask(line)
+        finally:
+            self.close()
+
+
+def _enable_line_editing() -> None:
+    """Ativa histórico e edição de linha quando ``readline`` existe."""
+    if not sys.stdin.isatty():
+        return
+    try:
+        import readline  # noqa: F401
+    except ImportError:  # pragma: no cover - plataformas sem readline
+        pass
@@ -1,15 +1,169 @@
-"""Armazena a chave da API em texto puro.
+"""Armazena a chave da API em texto puro ou, opcionalmente, criptografada.
 
-Uma alternativa **mais segura**, porém menos performática, seria empregar
-AES-GCM com derivação PBKDF2 para criptografar a chave antes de persistir no
-disco.
+O formato padrão continua sendo o texto puro em ``secret.txt``. Com uma
+senha (``gpt_secure_setup.py --encrypt``), o mesmo arquivo passa a conter um
+JSON ``chatgpt-cli-key/1``: a senha é derivada com ``scrypt`` (custo
+ajustável por ``n``/``r``/``p``; ``pbkdf2-sha256`` também é aceito) e a
+chave é cifrada com HMAC-SHA256 em modo contador e autenticada com um
+segundo HMAC (*encrypt-then-MAC*). Só a biblioteca padrão é usada; AES-GCM
+exigiria uma dependência nativa como ``cryptography``.
+
+A derivação é propositalmente cara. Para pagá-la uma vez por sessão de
+login, ``load_api_key`` guarda a chave derivada no agente de
+``key_agent`` e as chamadas seguintes só decifram (microssegundos).
 """
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
+import json
 import os
-from dataclasses import dataclass
+import secrets
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+ENCRYPTED_FORMAT: str = "chatgpt-cli-key/1"
+CIPHER: str = "hmac-sha256-ctr"
+DEFAULT_SCRYPT_N: int = 1 << 16
+DEFAULT_SCRYPT_R: int = 8
+DEFAULT_SCRYPT_P: int = 1
+DEFAULT_PBKDF2_ITERATIONS: int = 600_000
+DERIVED_KEY_SIZE: int = 64  # 32 bytes para cifrar + 32 para autenticar
+
+
+class KeyStoreError(ValueError):
+    """Senha incorreta ou arquivo de chave corrompido."""
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text.encode("ascii"), validate=True)
+
+
+@dataclass(frozen=True)
+class KdfParams:
+    """Parâmetros da derivação de chave, gravados junto ao texto cifrado.
+
+    Segue o padrão *Parameter Object*: trocar o custo (``n`` do ``scrypt``
+    ou ``iterations`` do PBKDF2) não muda o formato do arquivo. Uma
+    alternativa mais rápida seria um custo fixo embutido no código, mas
+    chaves antigas ficariam ilegíveis ao ajustá-lo.
+    """
+
+    name: str = "scrypt"
+    salt: bytes = field(default_factory=lambda: secrets.token_bytes(16))
+    n: int = DEFAULT_SCRYPT_N
+    r: int = DEFAULT_SCRYPT_R
+    p: int = DEFAULT_SCRYPT_P
+    iterations: int = DEFAULT_PBKDF2_ITERATIONS
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.name == "scrypt":
+            return {"name": self.name, "n": self.n, "r": self.r, "p": self.p, "salt": _b64(self.salt)}
+        return {"name": self.name, "iterations": self.iterations, "salt": _b64(self.salt)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KdfParams":
+        name = data.get("name")
+        if name == "scrypt":
+            return cls(name, _unb64(data["salt"]), n=int(data["n"]), r=int(data["r"]), p=int(data["p"]))
+        if name == "pbkdf2-sha256":
+            return cls(name, _unb64(data["salt"]), iterations=int(data["iterations"]))
+        raise KeyStoreError(f"KDF desconhecida: {name}")
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifica a chave derivada no agente sem revelar nada sobre ela."""
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def derive(self, passphrase: str) -> bytes:
+        secret = passphrase.encode("utf-8")
+        if self.name == "scrypt":
+            return hashlib.scrypt(
+                secret,
+                salt=self.salt,
+                n=self.n,
+                r=self.r,
+                p=self.p,
+                maxmem=256 * self.r * self.n * self.p + (1 << 20),
+                dklen=DERIVED_KEY_SIZE,
+            )
+        return hashlib.pbkdf2_hmac("sha256", secret, self.salt, self.iterations, DERIVED_KEY_SIZE)
+
+
+def _keystream_xor(key: bytes, nonce: bytes, data: bytes) -> bytes:
+    blocks = bytearray()
+    for counter in range((len(data) + 31) // 32):
+        blocks += hmac.new(key, nonce + counter.to_bytes(8, "big"), hashlib.sha256).digest()
+    return bytes(a ^ b for a, b in zip(data, blocks))
+
+
+@dataclass(frozen=True)
+class EncryptedKey:
+    """Conteúdo de um ``secret.txt`` criptografado."""
+
+    kdf: KdfParams
+    nonce: bytes
+    ciphertext: bytes
+    tag: bytes
+
+    def _mac(self, mac_key: bytes) -> bytes:
+        header = json.dumps([ENCRYPTED_FORMAT, CIPHER, self.kdf.to_dict()], sort_keys=True)
+        return hmac.new(mac_key, header.encode("utf-8") + self.nonce + self.ciphertext, hashlib.sha256).digest()
+
+    @classmethod
+    def seal(cls, api_key: str, derived: bytes, kdf: KdfParams) -> "EncryptedKey":
+        nonce = secrets.token_bytes(16)
+        ciphertext = _keystream_xor(derived[:32], nonce, api_key.encode("utf-8"))
+        unsigned = cls(kdf, nonce, ciphertext, b"")
+        return cls(kdf, nonce, ciphertext, unsigned._mac(derived[32:]))
+
+    def open(self, derived: bytes) -> str:
+        """Decifra com a chave derivada; ``KeyStoreError`` se ela não confere."""
+        if not hmac.compare_digest(self._mac(derived[32:]), self.tag):
+            raise KeyStoreError("Senha incorreta ou arquivo de chave corrompido")
+        return _keystream_xor(derived[:32], self.nonce, self.ciphertext).decode("utf-8")
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "format": ENCRYPTED_FORMAT,
+                "cipher": CIPHER,
+                "kdf": self.kdf.to_dict(),
+                "nonce": _b64(self.nonce),
+                "ciphertext": _b64(self.ciphertext),
+                "tag": _b64(self.tag),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> "EncryptedKey":
+        try:
+            data = json.loads(text)
+            if data.get("format") != ENCRYPTED_FORMAT or data.get("cipher") != CIPHER:
+                raise KeyStoreError("Formato de chave não suportado")
+            return cls(
+                KdfParams.from_dict(data["kdf"]),
+                _unb64(data["nonce"]),
+                _unb64(data["ciphertext"]),
+                _unb64(data["tag"]),
+            )
+        except (ValueError, KeyError, TypeError) as exc:
+            if isinstance(exc, KeyStoreError):
+                raise
+            raise KeyStoreError("Arquivo de chave corrompido") from exc
+
+
+def is_encrypted(content: str) -> bool:
+    """Chaves da OpenAI nunca começam com ``{``; o formato cifrado sempre."""
+    return content.lstrip().startswith("{")
 
 
 @dataclass(frozen=True)
@@ -29,20 +183,30 @@ class KeyLocation:
         return self.base_dir / self.file_name
 
 
-def save_api_key(api_key: str, *, loc: KeyLocation = KeyLocation()) -> None:
-    """Salva a chave API em texto puro.
+def save_api_key(
+    api_key: str,
+    *,
+    loc: KeyLocation = KeyLocation(),
+    passphrase: Optional[str] = None,
+    kdf: Optional[KdfParams] = None,
+) -> None:
+    """Salva a chave API em texto puro ou, com ``passphrase``, criptografada.
 
     Utiliza ``os.open`` para controlar permissões ``0o600`` ao criar o arquivo.
     Uma alternativa mais performática seria usar ``Path.write_text``, mas isso
     reduziria o controle explícito sobre as permissões.
     """
 
+    content = api_key
+    if passphrase is not None:
+        kdf = kdf or KdfParams()
+        content = EncryptedKey.seal(api_key, kdf.derive(passphrase), kdf).to_json()
     loc.ensure_dir()
     fd: int | None = None
     try:
         fd = os.open(loc.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
         with os.fdopen(fd, "w", encoding="utf-8") as f:
-            f.write(api_key)
+            f.write(content)
         os.chmod(loc.path, 0o600)
     except Exception:
         if fd is not None:
@@ -58,8 +222,73 @@ def save_api_key(api_key: str, *, loc: KeyLocation = KeyLocation()) -> None:
         raise
 
 
-def load_api_key(*, loc: KeyLocation = KeyLocation()) -> str:
-    """Carrega a chave API em texto puro."""
+def read_key_file(*, loc: KeyLocation = KeyLocation()) -> Union[str, EncryptedKey]:
+    """Conteúdo de ``secret.txt``: a chave em texto puro ou um ``EncryptedKey``."""
+    content = loc.path.read_text(encoding="utf-8")
+    return EncryptedKey.from_json(content) if is_encrypted(content) else content
+
 
-    return loc.path.read_text(encoding="utf-8")
+def key_unattended(*, loc: KeyLocation = KeyLocation(), agent: Optional[Path] = None) -> bool:
+    """Se ``load_api_key`` obtém a chave de ``loc`` sem pedir a senha.
 
+    Vale para o arquivo em texto puro e para o cifrado cuja chave derivada
+    está no agente em ``agent``. Processos sem terminal (a remoção em
+    segundo plano de ``--defer-delete``) só podem contar com esses casos.
+    """
+    try:
+        stored = read_key_file(loc=loc)
+    except (OSError, KeyStoreError):
+        return False
+    if isinstance(stored, str):
+        return True
+    if agent is None:
+        return False
+    from . import key_agent
+
+    cached = key_agent.fetch(agent, stored.kdf.fingerprint)
+    if cached is None:
+        return False
+    try:
+        stored.open(cached)
+    except KeyStoreError:
+        return False
+    return True
+
+
+def load_api_key(
+    *,
+    loc: KeyLocation = KeyLocation(),
+    passphrase: Optional[Callable[[], Optional[str]]] = None,
+    agent: Optional[Path] = None,
+    agent_ttl: float = 0.0,
+) -> str:
+    """Carrega a chave API, decifrando-a se necessário.
+
+    Para o arquivo cifrado, tenta primeiro a chave derivada guardada no
+    agente em ``agent`` (*Cache-Aside*); na falta dela, pede a senha a
+    ``passphrase``, paga a derivação e, se ``agent_ttl > 0``, entrega o
+    resultado ao agente por esse tempo. Sem ``passphrase`` disponível,
+    levanta ``KeyStoreError``.
+    """
+
+    stored = read_key_file(loc=loc)
+    if isinstance(stored, str):
+        return stored
+    from . import key_agent
+
+    fingerprint = stored.kdf.fingerprint
+    if agent is not None:
+        cached = key_agent.fetch(agent, fingerprint)
+        if cached is not None:
+            try:
+                return stored.open(cached)
+            except KeyStoreError:
+                pass  # agente com chave de outro arquivo; deriva de novo
+    secret = passphrase() if passphrase is not None else None
+    if secret is None:
+        raise KeyStoreError("Chave criptografada: senha necessária")
+    derived = stored.kdf.derive(secret)
+    api_key = stored.open(derived)
+    if agent is not None and agent_ttl > 0:
+        key_agent.store(agent, fingerprint, derived, agent_ttl)
+    return api_key
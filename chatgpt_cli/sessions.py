@@ -0,0 +1,429 @@
+"""Armazenamento de sessões em *log* de registros (JSONL) *append-only*.
+
+Cada turno é gravado como um registro ``{"m": mensagem}`` acrescentado ao
+fim de ``sessions/<nome>.jsonl``, em vez de reescrever o arquivo inteiro a
+cada turno. Quando a lista salva não estende a persistida (por exemplo, após
+edição ou corte do histórico), um registro ``{"truncate": k}`` descarta as
+mensagens a partir da posição ``k`` e as novas são acrescentadas; a
+compactação periódica reescreve o arquivo só com as mensagens vivas.
+
+Registros de mensagem podem trazer ``"t"``, a contagem estimada de *tokens*
+memoizada por ``chatgpt_cli.context``, e registros ``{"trim": {...}}``
+documentam o último corte da janela de contexto (o mais recente sobrevive à
+compactação).
+
+Garantias:
+
+* *appends* usam ``O_APPEND`` + ``flock`` + ``fsync``;
+* reescritas são atômicas (arquivo temporário + ``os.replace``) e feitas
+  sob o mesmo ``flock`` dos *appends* (ver ``locked_file``);
+* um último registro truncado por uma queda é descartado e o arquivo é
+  reparado na próxima leitura;
+* sessões antigas em ``<nome>.json`` são migradas de forma transparente.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+Message = Dict[str, Any]
+
+DEFAULT_COMPACT_MIN_DEAD: int = 32
+
+
+class SessionStore:
+    """Motor de persistência de sessões sobre arquivos JSONL.
+
+    Mantém em memória a lista persistida de cada sessão já lida ou gravada no
+    processo, de modo que ``save`` descubra o *delta* a acrescentar sem reler
+    o disco. Uma alternativa mais compacta seria um formato binário
+    enquadrado por tamanho, porém menos inspecionável com ferramentas comuns.
+    """
+
+    def __init__(
+        self, base_dir: Path, compact_min_dead: int = DEFAULT_COMPACT_MIN_DEAD
+    ) -> None:
+        self.base_dir = base_dir
+        self.compact_min_dead = compact_min_dead
+        self._persisted: Dict[str, List[Message]] = {}
+        self._records: Dict[str, int] = {}
+        self._tokens: Dict[str, List[Optional[int]]] = {}
+        self._trims: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def path(self, name: str) -> Path:
+        return self.base_dir / f"{name}.jsonl"
+
+    def legacy_path(self, name: str) -> Path:
+        return self.base_dir / f"{name}.json"
+
+    # -- leitura -----------------------------------------------------------
+
+    def load(self, name: str) -> List[Message]:
+        """Retorna as mensagens da sessão (lista nova, segura para alterar)."""
+        with self._lock:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            self._migrate(name)
+            messages, tokens, records, trim = self._replay(self.path(name))
+            self._persisted[name] = messages
+            self._tokens[name] = tokens
+            self._records[name] = records
+            if trim is not None:
+                self._trims[name] = trim
+            else:
+                self._trims.pop(name, None)
+            return list(messages)
+
+    def token_counts(self, name: str) -> List[Optional[int]]:
+        """Contagens de *tokens* memoizadas, alinhadas às mensagens salvas."""
+        with self._lock:
+            if name not in self._tokens:
+                self.load(name)
+            return list(self._tokens[name])
+
+    def last_trim(self, name: str) -> Optional[Dict[str, Any]]:
+        """Último corte de contexto registrado para a sessão, se houver."""
+        with self._lock:
+            if name not in self._persisted:
+                self.load(name)
+            return self._trims.get(name)
+
+    def _replay(
+        self, path: Path
+    ) -> Tuple[List[Message], List[Optional[int]], int, Optional[Dict[str, Any]]]:
+        """Reaplica o *log*, reparando um último registro truncado.
+
+        A leitura comum dispensa trava. Se o fim do arquivo parecer
+        incompleto, o arquivo é relido sob ``flock`` antes do reparo: o
+        registro pode ser de outro processo que acabou de completá-lo.
+        """
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return [], [], 0, None
+        parsed, torn, unterminated = self._parse(raw)
+        if torn is None and not unterminated:
+            return parsed
+        try:
+            with locked_file(path, os.O_RDWR) as fd:
+                raw = _read_fd(fd)
+                parsed, torn, unterminated = self._parse(raw)
+                if torn is not None:
+                    # Último registro incompleto: queda durante o *append*.
+                    os.ftruncate(fd, torn)
+                    os.fsync(fd)
+                elif unterminated:
+                    # Registro válido sem terminador: completa a linha.
+                    os.pwrite(fd, b"\n", len(raw))
+        except FileNotFoundError:
+            return [], [], 0, None
+        return parsed
+
+    @staticmethod
+    def _parse(
+        raw: bytes,
+    ) -> Tuple[
+        Tuple[List[Message], List[Optional[int]], int, Optional[Dict[str, Any]]],
+        Optional[int],
+        bool,
+    ]:
+        """Interpreta ``raw``; devolve o estado, o *offset* de um registro
+        final truncado (ou ``None``) e se falta a quebra de linha final."""
+        messages: List[Message] = []
+        tokens: List[Optional[int]] = []
+        trim: Optional[Dict[str, Any]] = None
+        records = 0
+        offset = 0
+        size = len(raw)
+        torn: Optional[int] = None
+        unterminated = False
+        while offset < size:
+            nl = raw.find(b"\n", offset)
+            end = size if nl < 0 else nl
+            line = raw[offset:end]
+            try:
+                record = json.loads(line) if line.strip() else None
+            except ValueError:
+                record = None
+                if nl < 0 or end + 1 >= size:
+                    torn = offset
+                    break
+            if isinstance(record, dict):
+                records += 1
+                if "m" in record:
+                    messages.append(record["m"])
+                    t = record.get("t")
+                    tokens.append(t if isinstance(t, int) else None)
+                elif "truncate" in record:
+                    del messages[int(record["truncate"]) :]
+                    del tokens[int(record["truncate"]) :]
+                elif isinstance(record.get("trim"), dict):
+                    trim = record["trim"]
+            if nl < 0:
+                unterminated = True
+                break
+            offset = nl + 1
+        return (messages, tokens, records, trim), torn, unterminated
+
+    # -- escrita -----------------------------------------------------------
+
+    def save(
+        self,
+        name: str,
+        messages: List[Message],
+        tokens: Optional[Sequence[Optional[int]]] = None,
+    ) -> None:
+        """Persiste ``messages`` gravando apenas o que mudou desde a última vez.
+
+        ``tokens``, quando informado, traz a contagem de cada mensagem; os
+        valores das mensagens novas são gravados junto delas e os das antigas
+        passam a valer em memória (e no disco na próxima compactação).
+        """
+        with self._lock:
+            persisted = self._persisted.get(name)
+            if persisted is None:
+                self.load(name)
+                persisted = self._persisted[name]
+            counts = self._merge_tokens(name, len(messages), tokens)
+            n = len(persisted)
+            if len(messages) >= n and messages[:n] == persisted:
+                start = n
+                records: List[Dict[str, Any]] = []
+            else:
+                start = 0
+                for old, new in zip(persisted, messages):
+                    if old != new:
+                        break
+                    start += 1
+                records = [{"truncate": start}]
+            records.extend(
+                self._message_record(m, counts[i])
+                for i, m in enumerate(messages[start:], start)
+            )
+            self._tokens[name] = counts
+            if not records:
+                return
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            self._append(self.path(name), records)
+            self._persisted[name] = list(messages)
+            self._records[name] = self._records.get(name, 0) + len(records)
+            dead = self._records[name] - len(messages)
+            if dead >= max(self.compact_min_dead, len(messages)):
+                self.compact(name)
+
+    def _merge_tokens(
+        self, name: str, size: int, tokens: Optional[Sequence[Optional[int]]]
+    ) -> List[Optional[int]]:
+        known = self._tokens.get(name, [])
+        merged: List[Optional[int]] = []
+        for i in range(size):
+            t = tokens[i] if tokens is not None and i < len(tokens) else None
+            if t is None and i < len(known):
+                t = known[i]
+            merged.append(t)
+        return merged
+
+    @staticmethod
+    def _message_record(message: Message, tokens: Optional[int]) -> Dict[str, Any]:
+        if tokens is None:
+            return {"m": message}
+        return {"m": message, "t": tokens}
+
+    def record_trim(self, name: str, info: Dict[str, Any]) -> None:
+        """Acrescenta ao *log* o registro de um corte da janela de contexto."""
+        with self._lock:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            self._append(self.path(name), [{"trim": info}])
+            self._trims[name] = info
+            self._records[name] = self._records.get(name, 0) + 1
+
+    @staticmethod
+    def _append(path: Path, records: List[Dict[str, Any]]) -> None:
+        data = "".join(
+            json.dumps(r, ensure_ascii=False) + "\n" for r in records
+        ).encode("utf-8")
+        with locked_file(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND) as fd:
+            os.write(fd, data)
+            os.fsync(fd)
+
+    def _rewrite(self, name: str, messages: List[Message]) -> None:
+        path = self.path(name)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tokens = self._tokens.get(name, [])
+        trim = self._trims.get(name)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for i, m in enumerate(messages):
+                    t = tokens[i] if i < len(tokens) else None
+                    record = self._message_record(m, t)
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if trim is not None:
+                    f.write(json.dumps({"trim": trim}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            try:
+                tmp.unlink()
+            except FileNotFoundError:
+                pass
+            raise
+        os.replace(tmp, path)
+        dir_fd = os.open(self.base_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._persisted[name] = list(messages)
+        self._records[name] = len(messages) + (trim is not None)
+
+    def compact(self, name: str) -> None:
+        """Reescreve a sessão apenas com as mensagens vivas.
+
+        O arquivo é relido sob o mesmo ``flock`` dos *appends*, mantido até
+        o ``os.replace``: registros de outros processos entram na versão
+        compactada em vez de irem para o arquivo substituído.
+        """
+        with self._lock:
+            path = self.path(name)
+            if not path.exists():
+                self._rewrite(name, self._persisted.get(name) or [])
+                return
+            with locked_file(path, os.O_RDWR) as fd:
+                (messages, tokens, _, trim), _, _ = self._parse(_read_fd(fd))
+                known = self._persisted.get(name, [])
+                if messages[: len(known)] == known:
+                    # Contagens só conhecidas em memória continuam valendo.
+                    memo = self._tokens.get(name, [])
+                    tokens = [
+                        t if t is not None or i >= len(memo) else memo[i]
+                        for i, t in enumerate(tokens)
+                    ]
+                self._tokens[name] = tokens
+                if trim is not None:
+                    self._trims[name] = trim
+                self._rewrite(name, messages)
+
+    def _migrate(self, name: str) -> None:
+        """Converte ``<nome>.json`` (formato antigo) para JSONL uma única vez."""
+        legacy = self.legacy_path(name)
+        if not legacy.exists() or self.path(name).exists():
+            return
+        try:
+            messages = json.loads(legacy.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(messages, list):
+            return
+        self._rewrite(name, messages)
+        legacy.unlink()
+
+    # -- remoção -----------------------------------------------------------
+
+    def delete(self, name: str) -> bool:
+        """Remove a sessão (formato novo e antigo); ``False`` se não existia."""
+        with self._lock:
+            removed = False
+            for path in (self.path(name), self.legacy_path(name)):
+                try:
+                    path.unlink()
+                    removed = True
+                except FileNotFoundError:
+                    pass
+            self._persisted.pop(name, None)
+            self._records.pop(name, None)
+            self._tokens.pop(name, None)
+            self._trims.pop(name, None)
+            return removed
+
+    def exists(self, name: str) -> bool:
+        return self.path(name).exists() or self.legacy_path(name).exists()
+
+
+@contextmanager
+def locked_file(path: Path, flags: int) -> Iterator[int]:
+    """Descritor de ``path`` com ``flock`` exclusivo sobre o arquivo atual.
+
+    Uma compactação troca o arquivo (``os.replace``) enquanto segura a
+    trava; quem esperava por ela no arquivo antigo percebe a troca pelo
+    *inode* e tenta de novo no novo arquivo.
+    """
+    while True:
+        fd = os.open(path, flags, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            held = os.fstat(fd)
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                current = None
+            if current is not None and (current.st_ino, current.st_dev) == (held.st_ino, held.st_dev):
+                yield fd
+                return
+        finally:
+            os.close(fd)
+
+
+def _read_fd(fd: int) -> bytes:
+    size = os.fstat(fd).st_size
+    return os.pread(fd, size, 0) if size else b""
+
+
+_stores: Dict[Path, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(base_dir: Path) -> SessionStore:
+    """Retorna o ``SessionStore`` único do processo para ``base_dir``."""
+    with _stores_lock:
+        store: Optional[SessionStore] = _stores.get(base_dir)
+        if store is None:
+            store = _stores[base_dir] = SessionStore(base_dir)
+        return store
+
+
+class WriteBehind:
+    """Fila única de gravações executadas fora do caminho da resposta.
+
+    Segue o padrão *Producer-Consumer*: quem atende o usuário enfileira a
+    gravação da sessão e do histórico e já segue para o próximo pedido; uma
+    *thread* as executa na ordem de chegada. Usada pelo *daemon* e pelo
+    ``--repl``. Agrupar várias gravações por sessão reduziria *fsyncs*, mas
+    atrasaria a durabilidade de cada turno além do necessário.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[Callable[[], None]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable[[], None]) -> None:
+        self._queue.put(job)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                job()
+            except Exception as e:  # pragma: no cover - apenas registro
+                sys.stderr.write(f"Falha na gravação em segundo plano: {e}\n")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Bloqueia até que todas as gravações enfileiradas terminem."""
+        self._queue.join()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
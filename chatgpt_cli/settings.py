@@ -0,0 +1,260 @@
+"""Configuração do usuário lida uma vez por alteração, em um *snapshot* tipado.
+
+``~/.config/chatgpt-cli/config`` tem linhas ``CHAVE=valor`` (ou
+``CHAVE = valor``/``CHAVE: valor``) e comentários com ``#`` ou ``;``. Em vez
+de montar um ``ConfigParser`` a cada execução e converter cada chave no
+ponto de uso, ``load_settings`` devolve um ``Settings`` imutável com todos
+os valores já convertidos e validados (valores inválidos recaem no padrão,
+como antes).
+
+O resultado do *parse* é guardado em ``config.cache.json`` no diretório de
+estado, indexado por caminho, ``mtime`` e tamanho do arquivo: enquanto ele
+não muda, as execuções seguintes só fazem um ``stat`` e leem o JSON. Dentro
+do mesmo processo, o *snapshot* também fica em memória.
+
+``gpt --print-config --format=env`` expõe o mesmo *snapshot* aos *scripts*
+em *shell* (valores já escapados para ``eval``), que deixam de interpretar o
+arquivo por conta própria.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shlex
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .transport import TransportConfig
+
+# Os padrões ficam aqui, e não nos módulos que os usam: ler a configuração
+# (inclusive em ``update_check``) não deve importar ``socket``, o transporte
+# HTTP ou o histórico só para obter constantes. Os módulos consumidores
+# reexportam os nomes que sempre tiveram.
+
+SNAPSHOT_VERSION: int = 1
+CACHE_NAME: str = "config.cache.json"
+API_BASE: str = "https://api.openai.com/v1"
+DEFAULT_MODEL: str = "gpt-4o-mini"
+DEFAULT_TEMPERATURE: float = 0.7
+DEFAULT_REQUEST_TIMEOUT: float = 30.0
+DEFAULT_STREAM_CHUNK_SIZE: int = 1024
+DEFAULT_POOL_SIZE: int = 4
+DEFAULT_MAX_RETRIES: int = 2
+DEFAULT_RETRY_BACKOFF: float = 0.5
+DEFAULT_FLUSH_INTERVAL: float = 0.033
+DEFAULT_FLUSH_BYTES: int = 256
+DEFAULT_UPLOAD_CACHE_TTL: float = 24 * 3600.0
+DEFAULT_CONTEXT_BUDGET: int = 12000
+DEFAULT_HISTORY_MAX_BYTES: int = 16 * 1024 * 1024
+DEFAULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+DEFAULT_CACHE_TTL: float = 7 * 24 * 3600.0
+DEFAULT_DAEMON_IDLE_TIMEOUT: float = 900.0
+DEFAULT_AGENT_TTL: float = 900.0
+DEFAULT_UPDATE_CHECK_TTL: float = 3600.0
+
+_LINE = re.compile(r"^([A-Za-z_][A-Za-z0-9_.-]*)\s*[=:]\s*(.*)$")
+
+
+def parse_config_text(text: str) -> Tuple[Dict[str, str], List[str]]:
+    """Separa ``text`` em pares ``CHAVE -> valor`` e linhas malformadas.
+
+    Aspas ao redor do valor são removidas; a última ocorrência de uma
+    chave prevalece.
+    """
+    values: Dict[str, str] = {}
+    malformed: List[str] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        match = _LINE.match(line)
+        if match is None:
+            malformed.append(line)
+            continue
+        values[match.group(1)] = match.group(2).strip().strip('"')
+    return values, malformed
+
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _at_least(minimum: int) -> Callable[[str], int]:
+    return lambda value: max(minimum, int(value))
+
+
+def _non_negative(value: str) -> float:
+    return max(0.0, float(value))
+
+
+# atributo -> (chave no arquivo, conversão, padrão)
+_FIELDS: Dict[str, Tuple[str, Callable[[str], Any], Any]] = {
+    "model": ("MODEL", str, DEFAULT_MODEL),
+    "temperature": ("TEMP", float, DEFAULT_TEMPERATURE),
+    "request_timeout": ("REQUEST_TIMEOUT", float, DEFAULT_REQUEST_TIMEOUT),
+    "pool_size": ("POOL_SIZE", _at_least(1), DEFAULT_POOL_SIZE),
+    "max_retries": ("MAX_RETRIES", _at_least(0), DEFAULT_MAX_RETRIES),
+    "retry_backoff": ("RETRY_BACKOFF", _non_negative, DEFAULT_RETRY_BACKOFF),
+    "stream_chunk_size": ("STREAM_CHUNK_SIZE", int, DEFAULT_STREAM_CHUNK_SIZE),
+    "output_flush_ms": ("OUTPUT_FLUSH_MS", float, DEFAULT_FLUSH_INTERVAL * 1000),
+    "output_flush_bytes": ("OUTPUT_FLUSH_BYTES", int, DEFAULT_FLUSH_BYTES),
+    "upload_cache_ttl": ("UPLOAD_CACHE_TTL", float, DEFAULT_UPLOAD_CACHE_TTL),
+    "context_budget": ("CONTEXT_BUDGET", int, DEFAULT_CONTEXT_BUDGET),
+    "context_summary_tokens": ("CONTEXT_SUMMARY_TOKENS", int, 0),
+    "history_max_bytes": ("HISTORY_MAX_BYTES", int, DEFAULT_HISTORY_MAX_BYTES),
+    "response_cache": ("RESPONSE_CACHE", _flag, False),
+    "response_cache_max_bytes": ("RESPONSE_CACHE_MAX_BYTES", int, DEFAULT_CACHE_MAX_BYTES),
+    "response_cache_ttl": ("RESPONSE_CACHE_TTL", float, DEFAULT_CACHE_TTL),
+    "response_cache_replay_ms": ("RESPONSE_CACHE_REPLAY_MS", float, 0.0),
+    "daemon_idle_timeout": ("DAEMON_IDLE_TIMEOUT", float, DEFAULT_DAEMON_IDLE_TIMEOUT),
+    "key_agent_ttl": ("KEY_AGENT_TTL", float, DEFAULT_AGENT_TTL),
+    "metrics_log": ("METRICS_LOG", _flag, False),
+    "api_base": ("API_BASE", str, API_BASE),
+    "api_backend": ("API_BACKEND", str, "auto"),
+    "gh_repo": ("GH_REPO", str, ""),
+    "update_url": ("UPDATE_URL", str, ""),
+    "update_check_ttl": ("UPDATE_CHECK_TTL", float, DEFAULT_UPDATE_CHECK_TTL),
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """*Snapshot* imutável e tipado do arquivo de configuração.
+
+    Funciona como um *Value Object*: é construído uma vez (``from_raw``) e
+    repassado, em vez de cada trecho da CLI reler e converter a mesma
+    chave. Uma alternativa mais enxuta seria guardar só o ``dict`` de
+    *strings*, mas as conversões e seus *fallbacks* voltariam a se espalhar
+    pelo código. ``raw`` preserva as chaves como escritas, inclusive as que
+    este módulo não conhece; ``malformed`` lista as linhas rejeitadas.
+    """
+
+    model: str = DEFAULT_MODEL
+    temperature: float = DEFAULT_TEMPERATURE
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT
+    pool_size: int = DEFAULT_POOL_SIZE
+    max_retries: int = DEFAULT_MAX_RETRIES
+    retry_backoff: float = DEFAULT_RETRY_BACKOFF
+    stream_chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE
+    output_flush_ms: float = DEFAULT_FLUSH_INTERVAL * 1000
+    output_flush_bytes: int = DEFAULT_FLUSH_BYTES
+    upload_cache_ttl: float = DEFAULT_UPLOAD_CACHE_TTL
+    context_budget: int = DEFAULT_CONTEXT_BUDGET
+    context_summary_tokens: int = 0
+    history_max_bytes: int = DEFAULT_HISTORY_MAX_BYTES
+    response_cache: bool = False
+    response_cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    response_cache_ttl: float = DEFAULT_CACHE_TTL
+    response_cache_replay_ms: float = 0.0
+    daemon_idle_timeout: float = DEFAULT_DAEMON_IDLE_TIMEOUT
+    key_agent_ttl: float = DEFAULT_AGENT_TTL
+    metrics_log: bool = False
+    api_base: str = API_BASE
+    api_backend: str = "auto"
+    gh_repo: str = ""
+    update_url: str = ""
+    update_check_ttl: float = DEFAULT_UPDATE_CHECK_TTL
+    raw: Dict[str, str] = field(default_factory=dict, compare=False)
+    malformed: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, str], malformed: Tuple[str, ...] = ()) -> "Settings":
+        """Converte ``raw``; cada valor inválido recai no padrão do campo."""
+        values: Dict[str, Any] = {}
+        for name, (key, convert, default) in _FIELDS.items():
+            try:
+                values[name] = convert(raw[key]) if key in raw else default
+            except ValueError:
+                values[name] = default
+        return cls(**values, raw=dict(raw), malformed=tuple(malformed))
+
+    @property
+    def transport(self) -> "TransportConfig":
+        from .transport import TransportConfig
+
+        return TransportConfig(self.pool_size, self.max_retries, self.retry_backoff)
+
+    def as_env(self) -> str:
+        """Linhas ``CHAVE='valor'`` seguras para ``eval`` em *shell*."""
+        lines = []
+        for f in fields(self):
+            if f.name not in _FIELDS:
+                continue
+            value = getattr(self, f.name)
+            text = str(int(value)) if isinstance(value, bool) else str(value)
+            lines.append(f"{_FIELDS[f.name][0]}={shlex.quote(text)}")
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {_FIELDS[f.name][0]: getattr(self, f.name) for f in fields(self) if f.name in _FIELDS}
+
+
+_memo: Dict[str, Tuple[Tuple[int, int], Settings]] = {}
+
+
+def _read_cache(cache_path: Path, path: Path, key: Tuple[int, int]) -> Optional[Settings]:
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(data, dict)
+        or data.get("version") != SNAPSHOT_VERSION
+        or data.get("path") != str(path)
+        or data.get("stat") != list(key)
+    ):
+        return None
+    return Settings.from_raw(data.get("raw") or {}, tuple(data.get("malformed") or ()))
+
+
+def _write_cache(cache_path: Path, path: Path, key: Tuple[int, int], settings: Settings) -> None:
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "path": str(path),
+        "stat": list(key),
+        "raw": settings.raw,
+        "malformed": list(settings.malformed),
+    }
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # o cache é só um atalho; sem ele, o arquivo é relido
+
+
+def load_settings(path: Path, state_dir: Optional[Path] = None) -> Settings:
+    """``Settings`` de ``path``, relendo o arquivo só quando ele muda.
+
+    A chave de validade é ``(st_mtime_ns, st_size)``. Arquivo ausente ou
+    ilegível resulta nos padrões. Com ``state_dir``, o *parse* é
+    compartilhado entre processos por meio de ``config.cache.json``.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return Settings()
+    key = (st.st_mtime_ns, st.st_size)
+    memo = _memo.get(str(path))
+    if memo is not None and memo[0] == key:
+        return memo[1]
+    cache_path = state_dir / CACHE_NAME if state_dir is not None else None
+    settings = _read_cache(cache_path, path, key) if cache_path is not None else None
+    if settings is None:
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return Settings()
+        raw, malformed = parse_config_text(text)
+        settings = Settings.from_raw(raw, tuple(malformed))
+        if cache_path is not None:
+            _write_cache(cache_path, path, key, settings)
+    _memo[str(path)] = (key, settings)
+    return settings
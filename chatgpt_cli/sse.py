@@ -0,0 +1,179 @@
+"""Parser incremental de *Server-Sent Events* para *chat completions*.
+
+``SSEParser`` consome blocos de bytes crus, exatamente como chegam da rede, e
+faz o enquadramento em nível de byte: linhas terminadas em ``\\n`` ou
+``\\r\\n``, eventos com várias linhas ``data:``, campos ``event:``/``id:``/
+``retry:`` e comentários. A decodificação UTF-8 ocorre uma única vez, sobre o
+evento já completo, de modo que sequências multibyte partidas entre blocos
+não exigem tratamento especial.
+
+O caminho síncrono (``stream_chat_completion``) e o assíncrono
+(``chatgpt_cli.aio``) usam ``iter_deltas``/``aiter_deltas`` e, portanto,
+produzem exatamente os mesmos *deltas*.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+DONE_MARKER: bytes = b"[DONE]"
+
+# ``JSONDecoder.decode`` direto evita a checagem de argumentos e a detecção de
+# codificação feitas por ``json.loads`` a cada evento.
+_decode_json = json.JSONDecoder().decode
+
+_Frame = Tuple[bytes, Optional[str], Optional[str]]
+
+
+class StreamDone(Exception):
+    """Sinaliza o evento ``[DONE]`` que encerra o *stream*."""
+
+
+class SSEEvent(NamedTuple):
+    """Evento SSE despachado; ``data`` permanece em bytes até o uso."""
+
+    data: bytes
+    event: str = "message"
+    id: Optional[str] = None
+
+
+class SSEParser:
+    """Enquadrador SSE incremental orientado a bytes.
+
+    Cada bloco é dividido em linhas por ``bytes.split`` (em C) e apenas o
+    resto não terminado é guardado para o bloco seguinte. Uma alternativa mais
+    simples seria ``Response.iter_lines`` seguido de ``decode`` por linha, que
+    custa uma decodificação a cada linha e perde eventos com ``data:`` em
+    várias linhas.
+    """
+
+    __slots__ = ("_pending", "_data", "_event", "last_event_id", "retry")
+
+    def __init__(self) -> None:
+        self._pending: bytes = b""
+        self._data: List[bytes] = []
+        self._event: Optional[str] = None
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Processa ``chunk`` e retorna os eventos completados por ele."""
+        return [
+            SSEEvent(data, event or "message", eid) for data, event, eid in self._frames(chunk)
+        ]
+
+    def close(self) -> List[SSEEvent]:
+        """Finaliza o *stream*, processando a última linha sem terminador.
+
+        Ao contrário da especificação, que descarta o evento incompleto, os
+        dados pendentes são despachados, preservando o comportamento tolerante
+        da implementação anterior baseada em ``iter_lines``.
+        """
+        return [
+            SSEEvent(data, event or "message", eid) for data, event, eid in self._close_frames()
+        ]
+
+    def _frames(self, chunk: bytes) -> List[_Frame]:
+        """Núcleo do parser: devolve ``(data, event, id)`` sem alocar objetos."""
+        if self._pending:
+            chunk = self._pending + chunk
+        lines = chunk.split(b"\n")
+        self._pending = lines.pop()
+        crlf = b"\r" in chunk
+        frames: List[_Frame] = []
+        data = self._data
+        for line in lines:
+            if crlf and line[-1:] == b"\r":
+                line = line[:-1]
+            if not line:
+                if data:
+                    frames.append(
+                        (data[0] if len(data) == 1 else b"\n".join(data), self._event, self.last_event_id)
+                    )
+                    data = self._data = []
+                self._event = None
+            elif line[:5] == b"data:":
+                data.append(line[6:] if line[5:6] == b" " else line[5:])
+            elif line[0] != 58:  # 58 == ':' (comentário)
+                self._field(line)
+        return frames
+
+    def _close_frames(self) -> List[_Frame]:
+        frames = self._frames(b"\n") if self._pending else []
+        return frames + self._frames(b"\n") if self._data else frames
+
+    def _field(self, line: bytes) -> None:
+        name, sep, value = line.partition(b":")
+        if sep and value[:1] == b" ":
+            value = value[1:]
+        if name == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif name == b"id" and b"\0" not in value:
+            self.last_event_id = value.decode("utf-8", "replace")
+        elif name == b"retry" and value.isdigit():
+            self.retry = int(value)
+
+
+def delta_from_data(data: bytes) -> Optional[str]:
+    """Extrai ``choices[0].delta.content`` do ``data`` de um evento.
+
+    Retorna ``None`` para eventos sem conteúdo ou com JSON inválido e levanta
+    ``StreamDone`` para ``data: [DONE]``.
+    """
+    if data == DONE_MARKER or data.strip() == DONE_MARKER:
+        raise StreamDone
+    try:
+        payload = _decode_json(data.decode("utf-8"))
+        return payload.get("choices", [{}])[0].get("delta", {}).get("content") or None
+    except Exception:
+        return None
+
+
+def event_delta(event: SSEEvent) -> Optional[str]:
+    """Atalho de ``delta_from_data`` para um ``SSEEvent``."""
+    return delta_from_data(event.data)
+
+
+def iter_deltas(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Gera os *deltas* de texto a partir de blocos de bytes SSE."""
+    parser = SSEParser()
+    frames = parser._frames
+    try:
+        for chunk in chunks:
+            for data, _, _ in frames(chunk):
+                c = delta_from_data(data)
+                if c:
+                    yield c
+        for data, _, _ in parser._close_frames():
+            c = delta_from_data(data)
+            if c:
+                yield c
+    except StreamDone:
+        return
+
+
+async def aiter_deltas(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Versão assíncrona de ``iter_deltas`` sobre o mesmo parser."""
+    parser = SSEParser()
+    try:
+        async for chunk in chunks:
+            for data, _, _ in parser._frames(chunk):
+                c = delta_from_data(data)
+                if c:
+                    yield c
+        for data, _, _ in parser._close_frames():
+            c = delta_from_data(data)
+            if c:
+                yield c
+    except StreamDone:
+        return
@@ -0,0 +1,228 @@
+"""Telemetria de desempenho por execução: *spans* nomeados e métricas JSONL.
+
+Cada etapa relevante de uma chamada (``read_config``, ``get_api_key``, cada
+``upload``, ``chat_headers`` — tempo até os cabeçalhos da resposta —,
+``stream_chat_completion``, ``save_session``, ``append_history``) é medida
+com ``span(nome, **atributos)``. Com a telemetria desligada (padrão),
+``span`` não guarda nada e custa apenas uma verificação de atributo.
+
+``gpt --timings`` imprime o detalhamento em stderr ao final; com
+``METRICS_LOG=1`` cada execução acrescenta uma linha a
+``~/.local/state/chatgpt-cli/metrics.jsonl``, que ``gpt --timings-report``
+resume em percentis por etapa.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Span:
+    """Uma etapa medida: início relativo à execução e duração, em ms."""
+
+    name: str
+    start_ms: float = 0.0
+    ms: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round(self.start_ms, 3),
+            "ms": round(self.ms, 3),
+            **self.attrs,
+        }
+
+
+@dataclass
+class Telemetry:
+    """Coletor de *spans* do processo.
+
+    Segue o padrão *Collecting Parameter*: cada etapa acrescenta seu *span*
+    ao coletor global em vez de devolver tempos por todas as chamadas. Uma
+    alternativa mais completa seria o OpenTelemetry, mas a dependência e o
+    custo de importação não se justificam para uma CLI de curta duração.
+    """
+
+    enabled: bool = False
+    log_path: Optional[Path] = None
+    spans: List[Span] = field(default_factory=list)
+    labels: Dict[str, Any] = field(default_factory=dict)
+    origin: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def enable(self, log_path: Optional[Path] = None) -> None:
+        """Liga a coleta, descartando *spans* de uma execução anterior."""
+        self.enabled = True
+        self.log_path = log_path
+        with self._lock:
+            self.spans.clear()
+
+    def disable(self) -> None:
+        """Desliga a coleta e descarta o que já foi medido."""
+        self.enabled = False
+        self.log_path = None
+        with self._lock:
+            self.spans.clear()
+
+    def now_ms(self) -> float:
+        return (time.perf_counter() - self.origin) * 1000
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        """Mede o bloco; o *span* recebido aceita atributos via ``set``."""
+        current = Span(name, attrs=attrs)
+        if not self.enabled:
+            yield current
+            return
+        current.start_ms = self.now_ms()
+        try:
+            yield current
+        finally:
+            current.ms = self.now_ms() - current.start_ms
+            with self._lock:
+                self.spans.append(current)
+
+    def record(self, **info: Any) -> Dict[str, Any]:
+        """Registro da execução no formato do ``metrics.jsonl``."""
+        with self._lock:
+            spans = [s.as_dict() for s in self.spans]
+        return {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "total_ms": round(self.now_ms(), 3),
+            **self.labels,
+            **info,
+            "spans": spans,
+        }
+
+    def finish(self, out: Optional[TextIO] = None, **info: Any) -> None:
+        """Imprime em ``out`` e/ou grava a linha de métricas, se configurados."""
+        if not self.enabled:
+            return
+        record = self.record(**info)
+        if out is not None:
+            out.write(format_record(record))
+        if self.log_path is not None and record["spans"]:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+                fd = os.open(self.log_path, flags, 0o600)
+                try:
+                    os.write(fd, line.encode("utf-8"))
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass  # métricas nunca devem derrubar a CLI
+
+
+TELEMETRY = Telemetry()
+
+
+def span(name: str, **attrs: Any) -> Any:
+    """Atalho para ``TELEMETRY.span``."""
+    return TELEMETRY.span(name, **attrs)
+
+
+def _attrs(values: Dict[str, Any]) -> str:
+    return " ".join(
+        f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}"
+        for k, v in values.items()
+        if k not in ("name", "start_ms", "ms")
+    )
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    """Tabela legível de um registro (saída de ``--timings``)."""
+    spans: List[Dict[str, Any]] = record.get("spans", [])
+    width = max([len(s["name"]) for s in spans] + [5])
+    lines = ["Tempos (ms):"]
+    for s in spans:
+        extra = _attrs(s)
+        lines.append(
+            f"  {s['name']:<{width}} {s['start_ms']:>9.1f} +{s['ms']:>9.1f}"
+            + (f"  {extra}" if extra else "")
+        )
+    lines.append(f"  {'total':<{width}} {record['total_ms']:>21.1f}")
+    return "\n".join(lines) + "\n"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por interpolação linear (``values`` já ordenados)."""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def aggregate(records: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Percentis da duração de cada etapa (e do total) em vários registros.
+
+    Atributos numéricos terminados em ``_ms`` (ex.: ``first_delta_ms``)
+    também são agregados, como ``etapa.atributo``.
+    """
+    samples: Dict[str, List[float]] = {}
+    for record in records:
+        samples.setdefault("total", []).append(float(record.get("total_ms", 0.0)))
+        for s in record.get("spans", []):
+            samples.setdefault(s["name"], []).append(float(s["ms"]))
+            for key, value in s.items():
+                if (
+                    key.endswith("_ms")
+                    and key != "start_ms"
+                    and isinstance(value, (int, float))
+                ):
+                    samples.setdefault(f"{s['name']}.{key}", []).append(float(value))
+    summary: Dict[str, Dict[str, float]] = {}
+    for name, values in samples.items():
+        values.sort()
+        row = {"n": float(len(values))}
+        row.update({f"p{p}": percentile(values, p) for p in PERCENTILES})
+        summary[name] = row
+    return summary
+
+
+def read_metrics(path: Path) -> Iterator[Dict[str, Any]]:
+    """Lê ``metrics.jsonl`` ignorando linhas corrompidas."""
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+    except FileNotFoundError:
+        return
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    if not summary:
+        return "Nenhuma métrica registrada.\n"
+    width = max(len(name) for name in summary)
+    lines = [
+        f"{'etapa':<{width}} {'n':>7} "
+        + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+    ]
+    for name, row in summary.items():
+        lines.append(
+            f"{name:<{width}} {int(row['n']):>7} "
+            + " ".join(f"{row[f'p{p}']:>9.1f}" for p in PERCENTILES)
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,190 @@
+"""Camada de transporte HTTP compartilhada por todas as chamadas à API.
+
+Mantém uma única ``requests.Session`` por processo, com *pool* de conexões
+keep-alive e política de *retry* configuráveis, de modo que várias requisições
+na mesma execução (uploads, chat, ``/v1/responses`` e remoções) reutilizem a
+conexão TLS já estabelecida com ``api.openai.com``.
+
+O ``requests`` (e com ele ``urllib3``, ``certifi`` e ``http.client``) só é
+importado quando a primeira sessão é criada: comandos que não falam com a
+API, como ``--clear-session`` ou ``--history``, não pagam esse custo.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Mapping, Optional, Tuple, Type
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+from .settings import (
+    API_BASE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RETRY_BACKOFF,
+)
+
+RETRY_STATUS: frozenset = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS: frozenset = frozenset({"GET", "DELETE"})
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Parâmetros do *pool* de conexões e da política de *retry*.
+
+    ``frozen=True`` torna a instância imutável e *hashable*, permitindo
+    compará-la para decidir se a sessão atual precisa ser recriada.
+    """
+
+    pool_size: int = DEFAULT_POOL_SIZE
+    max_retries: int = DEFAULT_MAX_RETRIES
+    retry_backoff: float = DEFAULT_RETRY_BACKOFF
+
+    @classmethod
+    def from_dict(cls, cfg: Mapping[str, str]) -> "TransportConfig":
+        """Constrói a configuração a partir do arquivo do usuário.
+
+        Valores ausentes ou inválidos recaem nos padrões, seguindo o mesmo
+        tratamento tolerante aplicado a ``REQUEST_TIMEOUT``.
+        """
+
+        def _int(key: str, default: int, minimum: int) -> int:
+            try:
+                return max(minimum, int(cfg.get(key, default)))
+            except ValueError:
+                return default
+
+        try:
+            backoff = max(0.0, float(cfg.get("RETRY_BACKOFF", DEFAULT_RETRY_BACKOFF)))
+        except ValueError:
+            backoff = DEFAULT_RETRY_BACKOFF
+        return cls(
+            pool_size=_int("POOL_SIZE", DEFAULT_POOL_SIZE, 1),
+            max_retries=_int("MAX_RETRIES", DEFAULT_MAX_RETRIES, 0),
+            retry_backoff=backoff,
+        )
+
+
+_config: TransportConfig = TransportConfig()
+
+
+@lru_cache(maxsize=1)
+def _retry_class() -> type:
+    """``Retry`` que só repete um POST quando o servidor não o processou.
+
+    Chat, ``/responses`` e uploads não são idempotentes e são cobrados: um
+    ``5xx`` pode chegar depois de o pedido ter sido atendido. Para eles só
+    valem ``429`` e ``503`` com ``Retry-After``, respostas de recusa.
+    ``GET`` e ``DELETE`` seguem a lista completa de ``RETRY_STATUS``.
+    """
+    from urllib3.util.retry import Retry
+
+    class SafeRetry(Retry):
+        def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+            if method.upper() not in IDEMPOTENT_METHODS and not (
+                status_code == 429 or (status_code == 503 and has_retry_after)
+            ):
+                return False
+            return super().is_retry(method, status_code, has_retry_after)
+
+    return SafeRetry
+
+
+def build_session(config: TransportConfig, status_retries: bool = True) -> requests.Session:
+    """Cria uma ``Session`` com *pool* dimensionado e *retry* com *backoff*.
+
+    Apenas falhas de conexão e respostas ``429``/``5xx`` são repetidas, e um
+    POST só com ``429`` ou ``503`` + ``Retry-After`` (ver ``_retry_class``);
+    erros de leitura não, para não duplicar uma requisição que o servidor já
+    pode ter processado. ``Retry-After`` é respeitado quando presente.
+
+    Com ``status_retries=False`` só falhas de conexão são repetidas: quem
+    chama trata ``429`` por conta própria (remoções, escalonador de chaves).
+    Repetir também aqui multiplicaria as tentativas, e as esperas do
+    ``urllib3`` ficariam invisíveis para esse controle.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    retry = _retry_class()(
+        total=config.max_retries,
+        connect=config.max_retries,
+        read=0,
+        status=config.max_retries if status_retries else 0,
+        backoff_factor=config.retry_backoff,
+        status_forcelist=RETRY_STATUS if status_retries else frozenset(),
+        allowed_methods=frozenset({"GET", "POST", "DELETE"}),
+        respect_retry_after_header=status_retries,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_size,
+        pool_maxsize=config.pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_open: List["requests.Session"] = []
+
+
+@lru_cache(maxsize=2)
+def get_session(status_retries: bool = True) -> requests.Session:
+    """Retorna a sessão compartilhada do processo.
+
+    Usa o mesmo *Singleton* via ``lru_cache`` de ``get_api_key``, uma
+    instância por valor de ``status_retries`` (ver ``build_session``); a
+    limpeza do cache em ``configure_transport`` força a recriação com novos
+    parâmetros.
+    """
+    session = build_session(_config, status_retries)
+    _open.append(session)
+    return session
+
+
+def configure_transport(config: TransportConfig) -> None:
+    """Aplica ``config`` à sessão compartilhada, recriando-a se necessário."""
+    global _config
+    if config == _config:
+        return
+    close_session()
+    _config = config
+
+
+def close_session() -> None:
+    """Fecha a sessão compartilhada (se criada) e libera o *pool*."""
+    get_session.cache_clear()
+    while _open:
+        _open.pop().close()
+
+
+def request_errors() -> Tuple[Type[BaseException], ...]:
+    """Exceções de rede do ``requests``, para uso em cláusulas ``except``.
+
+    A expressão de um ``except`` só é avaliada quando uma exceção já está em
+    curso, então ``except request_errors()`` adia a importação do
+    ``requests`` sem deixar de capturar suas falhas.
+    """
+    from requests.exceptions import RequestException
+
+    return (RequestException,)
+
+
+def api_url(path: str, base: Optional[str] = None) -> str:
+    """Monta a URL absoluta de um *endpoint* da API.
+
+    ``base`` (a URL de um perfil, por exemplo) tem precedência sobre
+    ``API_BASE``.
+    """
+    return f"{(base or API_BASE).rstrip('/')}/{path.lstrip('/')}"
+
+
+def set_api_base(url: str) -> None:
+    """Troca a URL base usada por ``api_url`` no restante do processo."""
+    global API_BASE
+    API_BASE = url.rstrip("/")
@@ -0,0 +1,294 @@
+"""Verificação de novas versões sem processos externos.
+
+Substitui o *pipeline* de ``check-update.sh`` (``curl``, ``grep``, ``awk``,
+``jq``/``sed`` e ``sort -V``) por uma única requisição HTTP no próprio
+processo. A resposta anterior fica em ``github_release.cache`` ou
+``url_release.cache`` (linhas ``CHAVE=valor``) junto com o ``ETag``, o
+``Last-Modified`` e o instante da consulta:
+
+* dentro de ``UPDATE_CHECK_TTL`` segundos, o resultado vem do *cache*, sem
+  rede;
+* depois disso, a requisição é condicional (``If-None-Match`` /
+  ``If-Modified-Since``) e um ``304`` apenas renova o instante da consulta.
+
+``check_for_update`` devolve um ``UpdateCheck`` usado por ``update.py``
+(``GitHubStrategy``), por ``gpt --check-update`` e, via
+``python -m chatgpt_cli.update_check --machine-read``, pelo
+``check-update.sh`` que a GUI chama.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .settings import DEFAULT_UPDATE_CHECK_TTL, Settings, load_settings
+
+CONFIG_PATH = Path.home() / ".config/chatgpt-cli/config"
+STATE_DIR = Path.home() / ".local/state/chatgpt-cli"
+VERSION_FILE = Path(__file__).resolve().parent.parent / "version.txt"
+GH_CACHE_NAME: str = "github_release.cache"
+URL_CACHE_NAME: str = "url_release.cache"
+GITHUB_API: str = "https://api.github.com"
+ASSET_MARKER: str = "chatgpt-cli-secure"
+DEFAULT_CHECK_TIMEOUT: float = 10.0
+ENV_KEYS: Tuple[str, ...] = ("GH_REPO", "UPDATE_URL", "UPDATE_CHECK_TTL")
+
+_VERSION_PART = re.compile(r"(\d+|[^\d.]+)")
+_STRICT_LINE = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)=(.*)$")
+
+
+class ConfigError(ValueError):
+    """O arquivo de configuração tem linhas fora do formato ``CHAVE=valor``."""
+
+
+@dataclass
+class UpdateCheck:
+    """Resultado de uma verificação, com a mesma informação de ``--machine-read``.
+
+    *Value Object* imutável na prática; uma alternativa mais enxuta seria
+    devolver o ``dict`` de linhas ``CHAVE=valor``, mas cada chamador voltaria
+    a fazer o *parse* que este módulo existe para eliminar.
+    """
+
+    local_version: str
+    has_update: bool = False
+    new_version: str = ""
+    new_url: str = ""
+    message: str = "Nenhuma origem de atualização configurada."
+    source: Optional[str] = None
+    cached: bool = False
+    """``True`` quando nenhuma requisição foi feita (TTL ainda válido)."""
+
+    def machine_lines(self) -> List[str]:
+        return [
+            f"HAS_UPDATE={int(self.has_update)}",
+            f"NEW_VERSION={self.new_version}",
+            f"NEW_URL={self.new_url}",
+            f"__HUMAN__={self.message}",
+        ]
+
+    def human_lines(self) -> List[str]:
+        if self.has_update:
+            lines = [f"Nova versão {self.new_version} disponível.", f"URL: {self.new_url}"]
+        else:
+            lines = [f"Você está na versão mais recente ({self.local_version})."]
+        return lines + [self.message]
+
+
+def update_settings(path: Optional[Path] = None, state_dir: Optional[Path] = None) -> Settings:
+    """``load_settings`` com a validação estrita de ``check-update.sh``.
+
+    O resto da CLI aceita ``CHAVE = valor``, ``CHAVE: valor`` e comentários
+    com ``;``; aqui, como no *script* antigo chamado pela GUI, só linhas
+    vazias, comentários com ``#`` e ``CHAVE=valor`` passam, e qualquer outra
+    gera ``ConfigError``. Os valores de ``ENV_KEYS`` perdem aspas simples ou
+    duplas; o arquivo prevalece e a variável de ambiente homônima só vale
+    para a chave que ele não define.
+    """
+    path = path or CONFIG_PATH
+    settings = load_settings(path, state_dir)
+    try:
+        content = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        content = ""
+    strict: Dict[str, str] = {}
+    for raw in content.splitlines():
+        line = raw.rstrip("\r")
+        if not line or line.startswith("#"):
+            continue
+        match = _STRICT_LINE.match(line)
+        if not match:
+            raise ConfigError(f"Linha malformada em {path}: {line}")
+        key, value = match.groups()
+        if key in ENV_KEYS:
+            strict[key] = value.strip().strip('"').strip("'")
+    env = {k: os.environ[k] for k in ENV_KEYS if os.environ.get(k) and k not in strict}
+    overrides = {**env, **strict}
+    if not overrides:
+        return settings
+    return Settings.from_raw({**settings.raw, **overrides}, settings.malformed)
+
+
+def version_key(version: str) -> Tuple[Tuple[int, object], ...]:
+    """Chave de ordenação equivalente a ``sort -V`` para os casos usuais.
+
+    ``v1.10.0`` > ``1.9.2``; trechos numéricos comparam como inteiros e
+    vêm antes de sufixos textuais no mesmo ponto (``1.0`` < ``1.0rc``, como
+    no ``sort -V``).
+    """
+    parts = _VERSION_PART.findall(version.strip().lstrip("vV"))
+    return tuple((0, int(p)) if p.isdigit() else (1, p) for p in parts)
+
+
+def is_newer(candidate: str, current: str) -> bool:
+    return version_key(candidate) > version_key(current)
+
+
+def local_version(path: Path = VERSION_FILE) -> str:
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return "0"
+
+
+def _read_cache(path: Path) -> Dict[str, str]:
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return {}
+    return dict(line.split("=", 1) for line in lines if "=" in line)
+
+
+def _write_cache(path: Path, entry: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text("".join(f"{k}={v}\n" for k, v in entry.items() if v), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _conditional_get(
+    url: str, entry: Dict[str, str], timeout: float, accept: Optional[str] = None
+) -> Optional[Tuple[bytes, Dict[str, str]]]:
+    """``GET`` condicional; ``None`` quando o servidor responde ``304``."""
+    headers = {"User-Agent": ASSET_MARKER}
+    if accept:
+        headers["Accept"] = accept
+    etag = entry.get("ETAG")
+    if etag:
+        # Caches gravados pelo *script* antigo guardavam o ETag sem aspas.
+        quoted = etag if etag.startswith(('"', "W/")) else f'"{etag}"'
+        headers["If-None-Match"] = quoted
+    if entry.get("LAST_MODIFIED"):
+        headers["If-Modified-Since"] = entry["LAST_MODIFIED"]
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            validators = {
+                "ETAG": response.headers.get("ETag") or "",
+                "LAST_MODIFIED": response.headers.get("Last-Modified") or "",
+            }
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            return None
+        raise
+    return body, validators
+
+
+def _fetch_github(repo: str, entry: Dict[str, str], timeout: float) -> Optional[Dict[str, str]]:
+    fetched = _conditional_get(
+        f"{GITHUB_API}/repos/{repo}/releases/latest",
+        entry,
+        timeout,
+        accept="application/vnd.github+json",
+    )
+    if fetched is None:
+        return None
+    body, validators = fetched
+    release = json.loads(body)
+    url = next(
+        (
+            asset.get("browser_download_url", "")
+            for asset in release.get("assets") or []
+            if ASSET_MARKER in asset.get("browser_download_url", "")
+        ),
+        "",
+    )
+    return {**validators, "TAG": release.get("tag_name") or "", "URL": url}
+
+
+def _fetch_url(base: str, entry: Dict[str, str], timeout: float) -> Optional[Dict[str, str]]:
+    base = base.rstrip("/")
+    fetched = _conditional_get(f"{base}/version.txt", entry, timeout)
+    if fetched is None:
+        return None
+    body, validators = fetched
+    tag = body.decode("utf-8", "replace").strip()
+    return {**validators, "TAG": tag, "URL": f"{base}/{ASSET_MARKER}.tar.gz"}
+
+
+def check_for_update(
+    config_path: Optional[Path] = None,
+    state_dir: Optional[Path] = None,
+    current: Optional[str] = None,
+    ttl: Optional[float] = None,
+    force: bool = False,
+    timeout: float = DEFAULT_CHECK_TIMEOUT,
+) -> UpdateCheck:
+    """Consulta a origem configurada (``GH_REPO`` ou ``UPDATE_URL``).
+
+    Aplica *Cache-Aside* com validação condicional: o *cache* em disco é
+    consultado primeiro e só é reescrito quando o servidor devolve conteúdo
+    novo. ``force`` ignora o TTL, mas ainda envia os validadores. Erros de
+    rede não levantam exceção: viram ``message`` e ``has_update=False``.
+    ``ConfigError`` é propagado.
+    """
+    state_dir = state_dir or STATE_DIR
+    settings = update_settings(config_path, state_dir)
+    result = UpdateCheck(local_version=current or local_version())
+    if settings.gh_repo:
+        source, target = "github", settings.gh_repo
+        cache_path, fetch = state_dir / GH_CACHE_NAME, _fetch_github
+        ok_msg, error_msg = "Verificação via GitHub.", "Erro ao consultar GitHub."
+    elif settings.update_url:
+        source, target = "url", settings.update_url
+        cache_path, fetch = state_dir / URL_CACHE_NAME, _fetch_url
+        ok_msg, error_msg = "Verificação via URL.", "Erro ao obter cabeçalhos em URL."
+    else:
+        return result
+    result.source = source
+    if ttl is None:
+        ttl = settings.update_check_ttl
+
+    entry = _read_cache(cache_path)
+    if entry.get("SOURCE", target) != target:
+        entry = {}  # origem mudou desde a última consulta
+    try:
+        checked = float(entry.get("CHECKED", 0))
+    except ValueError:
+        checked = 0.0
+    now = time.time()
+    if not force and entry.get("TAG") and ttl > 0 and 0 <= now - checked < ttl:
+        result.cached = True
+    else:
+        try:
+            fresh = fetch(target, entry, timeout)
+        except (OSError, ValueError):
+            # ``URLError`` e ``HTTPError`` são ``OSError``; JSON inválido é ``ValueError``.
+            result.message = error_msg
+            return result
+        if fresh is not None:
+            entry = fresh
+        entry.update(SOURCE=target, CHECKED=str(int(now)))
+        if entry.get("TAG"):
+            _write_cache(cache_path, entry)
+    result.message = ok_msg
+    tag, url = entry.get("TAG", ""), entry.get("URL", "")
+    if tag and url and is_newer(tag, result.local_version):
+        result.has_update, result.new_version, result.new_url = True, tag, url
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Interface de ``check-update.sh``: ``[--machine-read] [--force]``."""
+    args = sys.argv[1:] if argv is None else argv
+    try:
+        result = check_for_update(force="--force" in args)
+    except ConfigError as exc:
+        sys.stderr.write(f"{exc}\n")
+        sys.exit(1)
+    lines = result.machine_lines() if "--machine-read" in args else result.human_lines()
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,23 @@ if [ ! -f "$SECRET_FILE" ]; then
     exit 1
 fi
 
-OPENAI_API_KEY=$(cat "$SECRET_FILE")
+read_api_key() {
+    # Chave criptografada (JSON): o agente devolve a chave sem pedir a senha
+    # enquanto estiver ativo; caso contrário, a senha é pedida pelo zenity.
+    if [ "$(head -c1 "$SECRET_FILE")" = "{" ]; then
+        PYTHONPATH="$SCRIPT_DIR" python3 "$SCRIPT_DIR/gpt_secure_setup.py" --print-key --stdin < /dev/null 2>/dev/null \
+            || zenity --password --title="Senha da chave API" \
+                | PYTHONPATH="$SCRIPT_DIR" python3 "$SCRIPT_DIR/gpt_secure_setup.py" --print-key --stdin
+    else
+        cat "$SECRET_FILE"
+    fi
+}
 
-if [ -f "$CONFIG_DIR/config" ]; then
-    . "$CONFIG_DIR/config"
-fi
+OPENAI_API_KEY=$(read_api_key)
+
+# Snapshot já convertido (e em cache) pelo próprio gpt, em vez de executar o
+# arquivo de configuração como shell.
+eval "$("$SCRIPT_DIR/wrappers/gpt" --print-config --format=env 2>/dev/null)"
 MODEL=${MODEL:-gpt-4o-mini}
 TEMP=${TEMP:-0.7}
 
@@ -99,11 +111,16 @@ while true; do
             fi
             ;;
         "Checar atualização")
-            out=$("$SCRIPT_DIR/check-update.sh" --machine-read 2>/dev/null || true)
-            HAS=$(echo "$out" | grep '^HAS_UPDATE=' | cut -d= -f2)
-            NEW_VERSION=$(echo "$out" | grep '^NEW_VERSION=' | cut -d= -f2)
-            NEW_URL=$(echo "$out" | grep '^NEW_URL=' | cut -d= -f2)
-            HUMAN=$(echo "$out" | grep '^__HUMAN__' | cut -d= -f2-)
+            HAS=0 NEW_VERSION="" NEW_URL="" HUMAN=""
+            # ``read`` separa CHAVE=valor sem subprocessos extras (grep/cut).
+            while IFS='=' read -r key value; do
+                case "$key" in
+                    HAS_UPDATE) HAS="$value" ;;
+                    NEW_VERSION) NEW_VERSION="$value" ;;
+                    NEW_URL) NEW_URL="$value" ;;
+                    __HUMAN__) HUMAN="$value" ;;
+                esac
+            done < <("$SCRIPT_DIR/check-update.sh" --machine-read 2>/dev/null || true)
             if [ "$HAS" = "1" ]; then
                 if zenity --question --title="Atualização Disponível" --text="Nova versão $NEW_VERSION disponível.\nDeseja atualizar agora?"; then
                     "$SCRIPT_DIR/update.sh" --from-url "$NEW_URL"
@@ -139,7 +156,7 @@ while true; do
             ;;
         "Configurar chave")
             "$SCRIPT_DIR/gpt_secure_setup.py"
-            OPENAI_API_KEY=$(cat "$SECRET_FILE")
+            OPENAI_API_KEY=$(read_api_key)
             ;;
         "Sair")
             break
@@ -1,18 +1,91 @@
 #!/usr/bin/env python3
-"""Configura a chave API de forma simples usando ``save_api_key``."""
+"""Configura a chave API de forma simples usando ``save_api_key``.
 
+Por padrão a chave é gravada em texto puro. ``--encrypt`` pede uma senha e
+grava a chave criptografada (``--kdf-cost`` ajusta o ``n`` do ``scrypt``).
+``--print-key`` decifra e imprime a chave salva, reaproveitando o agente de
+chaves quando ativo e respeitando ``KEY_AGENT_TTL`` do arquivo de
+configuração (``0`` não guarda a chave derivada no agente); com ``--stdin``, a senha é lida da entrada padrão
+(usado pela GUI com ``zenity --password``).
+"""
+
+import argparse
+import sys
 from getpass import getpass
+from pathlib import Path
+from typing import Optional
+
+from chatgpt_cli.key_agent import socket_path
+from chatgpt_cli.secure_storage import (
+    DEFAULT_SCRYPT_N,
+    KdfParams,
+    KeyLocation,
+    KeyStoreError,
+    load_api_key,
+    save_api_key,
+)
+from chatgpt_cli.settings import load_settings
+
+CONFIG_PATH = Path.home() / ".config/chatgpt-cli/config"
+STATE_DIR = Path.home() / ".local/state/chatgpt-cli"
+
+
+def kdf_cost(value: str) -> int:
+    """Tipo do argparse para ``--kdf-cost``: potência de 2 maior que 1."""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"não é um inteiro: {value}") from None
+    if n < 2 or n & (n - 1):
+        raise argparse.ArgumentTypeError(f"deve ser uma potência de 2 maior que 1: {value}")
+    return n
 
-from chatgpt_cli.secure_storage import KeyLocation, save_api_key
+
+def print_key(from_stdin: bool) -> None:
+    def passphrase() -> Optional[str]:
+        secret = sys.stdin.readline().rstrip("\n") if from_stdin else getpass("Senha da chave API: ")
+        return secret or None
+
+    try:
+        api_key = load_api_key(
+            passphrase=passphrase,
+            agent=socket_path(STATE_DIR),
+            agent_ttl=load_settings(CONFIG_PATH, STATE_DIR).key_agent_ttl,
+        )
+    except (OSError, KeyStoreError) as e:
+        sys.stderr.write(f"Erro: {e}\n")
+        sys.exit(1)
+    print(api_key)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Configura a chave da API OpenAI.")
+    parser.add_argument("--encrypt", action="store_true", help="Criptografa a chave com uma senha.")
+    parser.add_argument(
+        "--kdf-cost",
+        type=kdf_cost,
+        default=DEFAULT_SCRYPT_N,
+        help=f"Parâmetro n do scrypt, potência de 2 (padrão {DEFAULT_SCRYPT_N}).",
+    )
+    parser.add_argument("--print-key", action="store_true", help="Imprime a chave salva e sai.")
+    parser.add_argument("--stdin", action="store_true", help="Com --print-key: lê a senha da entrada padrão.")
+    args = parser.parse_args()
+    if args.print_key:
+        print_key(args.stdin)
+        return
+
     print("Configuração da chave API OpenAI.")
     api_key: str = getpass("Digite sua OpenAI API key: ")
     if not api_key:
         print("Chave vazia. Abortando.")
         return
-    save_api_key(api_key)
+    passphrase = None
+    if args.encrypt:
+        passphrase = getpass("Senha para criptografar a chave: ")
+        if not passphrase or passphrase != getpass("Repita a senha: "):
+            print("Senhas vazias ou diferentes. Abortando.")
+            return
+    save_api_key(api_key, passphrase=passphrase, kdf=KdfParams(n=args.kdf_cost))
     print(f"Chave salva em {KeyLocation().path}")
 
 
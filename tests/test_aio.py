@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from chatgpt_cli import Config
+from chatgpt_cli.aio import AsyncChatClient
+
+
+def _sse(words: List[str]) -> bytes:
+    events = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": w}}]}) + "\n\n"
+        for w in words
+    ]
+    return ("".join(events) + "data: [DONE]\n\n").encode("utf-8")
+
+
+async def _serve(status: int = 200) -> Tuple[asyncio.AbstractServer, Dict[str, Any]]:
+    """Servidor HTTP mínimo que responde SSE em *chunks* de 7 bytes."""
+    stats: Dict[str, Any] = {"connections": 0, "requests": 0}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        stats["connections"] += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(
+                    next(
+                        line.split(b":", 1)[1]
+                        for line in head.split(b"\r\n")
+                        if line.lower().startswith(b"content-length")
+                    )
+                )
+                payload = json.loads(await reader.readexactly(length))
+                stats["requests"] += 1
+                words = payload["messages"][-1]["content"].split()
+                body = _sse(words) if status == 200 else b'{"error":"x"}'
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nTransfer-Encoding: chunked\r\n\r\n".encode()
+                )
+                for i in range(0, len(body), 7):
+                    piece = body[i : i + 7]
+                    writer.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                    await writer.drain()
+                    await asyncio.sleep(0)
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, stats
+
+
+def _base_url(server: asyncio.AbstractServer) -> str:
+    port = server.sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def test_concurrent_streams_share_one_event_loop() -> None:
+    async def scenario() -> Tuple[List[str], Dict[str, Any]]:
+        server, stats = await _serve()
+        async with server:
+            async with AsyncChatClient("k", base_url=_base_url(server), timeout=5) as client:
+
+                async def ask(text: str) -> str:
+                    msgs = [{"role": "user", "content": text}]
+                    parts = [d async for d in client.stream_chat(msgs, Config("m", 0.0))]
+                    return "".join(parts)
+
+                answers = await asyncio.gather(ask("a b c"), ask("olá mundo"), ask("x"))
+                # Conexões drenadas voltam ao *pool* e são reutilizadas.
+                await ask("de novo")
+        return list(answers), stats
+
+    answers, stats = asyncio.run(scenario())
+    assert answers == ["abc", "olámundo", "x"]
+    assert stats["requests"] == 4
+    assert stats["connections"] == 3
+
+
+def test_stream_chat_raises_on_error_status() -> None:
+    async def scenario() -> None:
+        server, _ = await _serve(status=401)
+        async with server:
+            async with AsyncChatClient("k", base_url=_base_url(server), timeout=5) as client:
+                async for _ in client.stream_chat([{"role": "user", "content": "x"}], Config("m", 0.0)):
+                    pass
+
+    with pytest.raises(RuntimeError, match="401"):
+        asyncio.run(scenario())
@@ -0,0 +1,79 @@
+"""Destino configurável: OpenAI ou servidor compatível (``chatgpt_cli.backend``)."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+from mock_openai import MockConfig, MockOpenAI  # noqa: E402
+
+import chatgpt_cli  # noqa: E402
+from chatgpt_cli import transport  # noqa: E402
+from chatgpt_cli.backend import (  # noqa: E402
+    BackendError,
+    cache_scope,
+    inline_attachments,
+    key_fingerprint,
+    resolve_backend,
+)
+from chatgpt_cli.output import BufferedSink  # noqa: E402
+from chatgpt_cli.secure_storage import KeyLocation  # noqa: E402
+
+
+def test_resolve_backend() -> None:
+    official = resolve_backend("https://api.openai.com/v1/")
+    assert (official.kind, official.files, official.key_required) == ("openai", True, True)
+    assert official.base_url == "https://api.openai.com/v1"
+    local = resolve_backend("http://127.0.0.1:8080/v1")
+    assert (local.kind, local.files, local.key_required) == ("compat", False, False)
+    assert resolve_backend("https://proxy.local/v1", "openai").files
+    with pytest.raises(BackendError):
+        resolve_backend("http://x", "outro")
+
+
+def test_key_fingerprint() -> None:
+    assert key_fingerprint(None) == key_fingerprint("") == ""
+    fp = key_fingerprint("sk-um")
+    assert len(fp) == 16 and fp == key_fingerprint("sk-um") != key_fingerprint("sk-outro")
+    assert "sk-um" not in fp
+    assert cache_scope("https://api.openai.com/v1/", "sk-um") == f"https://api.openai.com/v1#{fp}"
+    assert cache_scope("http://127.0.0.1:8080/v1", "sk-um") != cache_scope("https://api.openai.com/v1", "sk-um")
+
+
+def test_inline_attachments(tmp_path: Path) -> None:
+    text = tmp_path / "notas.txt"
+    text.write_text("conteúdo")
+    assert inline_attachments("resuma", [text]) == "resuma\n\n--- notas.txt ---\nconteúdo"
+    binary = tmp_path / "img.png"
+    binary.write_bytes(b"\x89PNG\xff\xfe")
+    with pytest.raises(BackendError):
+        inline_attachments("x", [binary])
+
+
+@pytest.fixture
+def mock(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[MockOpenAI]:
+    with MockOpenAI(MockConfig(tokens=3, token="ok ")) as server:
+        monkeypatch.setattr(transport, "API_BASE", transport.API_BASE)  # restaurado ao final
+        monkeypatch.setattr(chatgpt_cli, "CONFIG_PATH", tmp_path / "config")
+        monkeypatch.setattr(chatgpt_cli, "STATE_DIR", tmp_path)
+        monkeypatch.setattr(chatgpt_cli, "append_history", lambda *a: None)
+        monkeypatch.setattr(chatgpt_cli, "select_sink", lambda **_: BufferedSink(sys.stdout))
+        monkeypatch.setattr(chatgpt_cli, "KeyLocation", lambda: KeyLocation(base_dir=tmp_path))
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        yield server
+
+
+def test_cli_against_local_server_without_key(mock: MockOpenAI, tmp_path: Path, monkeypatch: Any, capsys: Any) -> None:
+    doc = tmp_path / "doc.md"
+    doc.write_text("# título")
+    monkeypatch.setattr(sys, "argv", ["gpt", "--no-daemon", "--file", str(doc), "resuma"])
+    chatgpt_cli.main()
+    assert capsys.readouterr().out == "ok ok ok \n"
+    (auth, payload), = mock.server.chats
+    assert auth is None
+    assert payload["messages"][-1]["content"] == "resuma\n\n--- doc.md ---\n# título"
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import threading
+from io import StringIO
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from chatgpt_cli import Config, batch
+from chatgpt_cli.context import ContextWindow
+
+
+@pytest.fixture
+def fake_api(monkeypatch: pytest.MonkeyPatch) -> Dict[str, Any]:
+    state: Dict[str, Any] = {"sessions": {}, "history": [], "calls": [], "trims": []}
+    lock = threading.Lock()
+
+    def fake_chat(api_key: str, messages: List[Dict[str, Any]], config: Config, timeout: float, **kwargs: Any) -> Dict[str, Any]:
+        prompt = messages[-1]["content"]
+        with lock:
+            state["calls"].append((config.model, len(messages)))
+        if prompt == "boom":
+            raise RuntimeError("Erro 500: falhou")
+        return {
+            "choices": [{"message": {"content": prompt.upper()}}],
+            "usage": {"total_tokens": 3},
+        }
+
+    def fake_save(name: str, messages: List[Dict[str, Any]], tokens: Any = None) -> None:
+        state["sessions"][name] = list(messages)
+
+    def fake_history(session: Optional[str], prompt: str, response: str) -> None:
+        state["history"].append((session, prompt, response))
+
+    monkeypatch.setattr(batch, "chat_completion", fake_chat)
+    monkeypatch.setattr(batch, "load_session", lambda name: list(state["sessions"].get(name, [])))
+    monkeypatch.setattr(batch, "save_session", fake_save)
+    monkeypatch.setattr(batch, "load_session_tokens", lambda name: [])
+    monkeypatch.setattr(batch, "record_context_trim", lambda name, result: state["trims"].append(name))
+    monkeypatch.setattr(batch, "append_history", fake_history)
+    return state
+
+
+def _run(lines: List[str], concurrency: int = 3) -> List[Dict[str, Any]]:
+    out = StringIO()
+    runner = batch.BatchRunner("key", 1.0, concurrency)
+    runner.run(lines, Config(model="base", temperature=0.5), out)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_batch_preserves_index_and_reports_errors(fake_api: Dict[str, Any]) -> None:
+    lines = [
+        json.dumps({"prompt": "a"}),
+        "",
+        json.dumps({"prompt": "b", "model": "other"}),
+        "not json",
+        json.dumps({"prompt": "boom"}),
+        json.dumps("c"),
+    ]
+    results = {r["index"]: r for r in _run(lines)}
+    assert sorted(results) == [0, 2, 3, 4, 5]
+    assert results[0]["response"] == "A"
+    assert results[2]["model"] == "other"
+    assert "error" in results[3]
+    assert "500" in results[4]["error"]
+    assert results[5]["response"] == "C"
+    assert len(fake_api["history"]) == 3
+
+
+def test_batch_serializes_turns_of_same_session(fake_api: Dict[str, Any]) -> None:
+    lines = [json.dumps({"prompt": f"p{i}", "session": "s"}) for i in range(6)]
+    _run(lines, concurrency=4)
+    contents = [m["content"] for m in fake_api["sessions"]["s"]]
+    assert contents == [x for i in range(6) for x in (f"p{i}", f"P{i}")]
+
+
+def test_batch_stats_accumulate_tokens(fake_api: Dict[str, Any]) -> None:
+    runner = batch.BatchRunner("key", 1.0, 2)
+    stats = runner.run(
+        [json.dumps({"prompt": "x"}), json.dumps({"prompt": "y"})],
+        Config(model="base", temperature=0.5),
+        StringIO(),
+    )
+    assert (stats.ok, stats.failed, stats.tokens) == (2, 0, 6)
+    assert "req/s" in stats.report()
+
+
+def test_parse_line_rejects_invalid_temperature() -> None:
+    with pytest.raises(ValueError):
+        batch.parse_line(0, json.dumps({"prompt": "x", "temperature": 3}), Config("m", 0.1))
+
+
+def test_batch_sessions_respect_context_budget(fake_api: Dict[str, Any]) -> None:
+    lines = [json.dumps({"prompt": f"pergunta {i} " + "x" * 200, "session": "s"}) for i in range(6)]
+    runner = batch.BatchRunner("key", 1.0, 2, ContextWindow(budget=200))
+    runner.run(lines, Config(model="base", temperature=0.5), StringIO())
+    assert max(n for _, n in fake_api["calls"]) < 11  # sem corte, a última levaria 11
+    assert fake_api["trims"] and len(fake_api["sessions"]["s"]) == 12
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+import sys
+import zlib
+from io import StringIO
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+
+import chatgpt_cli
+from chatgpt_cli import Config
+from chatgpt_cli.cache import ResponseCache, cache_key, replay
+from chatgpt_cli.output import BufferedSink, OutputSink
+
+
+def test_cache_key_is_canonical() -> None:
+    cfg = Config(model="m", temperature=0.0)
+    a = cache_key("chat", cfg, [{"role": "user", "content": "x"}])
+    b = cache_key("chat", cfg, [{"content": "x", "role": "user"}])
+    assert a == b
+    assert a != cache_key("chat", Config(model="m", temperature=0.1), [{"role": "user", "content": "x"}])
+    assert a != cache_key("chat", cfg, [{"role": "user", "content": "x"}], [("input_file", "abc")])
+    assert a != cache_key("chat", cfg, [{"role": "user", "content": "x"}], scope="https://api.openai.com/v1#0123456789abcdef")
+
+
+def test_get_put_ttl_and_stats(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "c.db", ttl=60)
+    assert cache.get("k") is None
+    cache.put("k", "resposta")
+    assert cache.get("k") == "resposta"
+    stats = cache.stats()
+    assert (stats.entries, stats.hits, stats.misses) == (1, 1, 1)
+    expired = ResponseCache(tmp_path / "c.db", ttl=1e-9)
+    assert expired.get("k") is None
+    assert expired.stats().entries == 0
+
+
+def test_lru_eviction_respects_size_bound(tmp_path: Path) -> None:
+    # Conteúdo aleatório comprime pouco: cabem duas entradas, não três.
+    blobs = {k: os.urandom(512).hex() for k in "abc"}
+    size = max(len(zlib.compress(b.encode())) for b in blobs.values())
+    cache = ResponseCache(tmp_path / "c.db", max_bytes=size * 2 + 10)
+    cache.put("a", blobs["a"])
+    cache.put("b", blobs["b"])
+    assert cache.get("a") == blobs["a"]  # "b" passa a ser o menos recente
+    cache.put("c", blobs["c"])
+    assert cache.get("b") is None
+    assert cache.get("a") == blobs["a"]
+    assert cache.get("c") == blobs["c"]
+
+
+class _Recorder(OutputSink):
+    def __init__(self) -> None:
+        super().__init__(StringIO())
+        self.pieces: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.pieces.append(text)
+
+
+def test_replay_streams_in_chunks() -> None:
+    sink = _Recorder()
+    assert replay("abcdefghij", sink, chunk=4) == "abcdefghij"
+    assert sink.pieces == ["abcd", "efgh", "ij"]
+
+
+def test_main_serves_repeated_prompt_from_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: Any
+) -> None:
+    monkeypatch.setattr(chatgpt_cli, "CONFIG_PATH", tmp_path / "config")
+    monkeypatch.setattr(chatgpt_cli, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(chatgpt_cli, "RESPONSE_CACHE_FILE", tmp_path / "cache.db")
+    monkeypatch.setattr(chatgpt_cli, "append_history", lambda *a: None)
+    monkeypatch.setenv("OPENAI_API_KEY", "k")
+    monkeypatch.setattr(chatgpt_cli, "select_sink", lambda **_: BufferedSink(sys.stdout))
+    calls: List[Any] = []
+
+    def fake_stream(api_key: str, messages: Any, *a: Any) -> str:
+        calls.append(messages)
+        return "resposta da API"
+
+    monkeypatch.setattr(chatgpt_cli, "stream_chat_completion", fake_stream)
+    for _ in range(2):
+        monkeypatch.setattr(sys, "argv", ["gpt", "--cache", "--temp", "0", "pergunta"])
+        chatgpt_cli.main()
+    assert len(calls) == 1
+    assert capsys.readouterr().out.endswith("resposta da API\n")
+    monkeypatch.setattr(sys, "argv", ["gpt", "--cache-stats"])
+    with pytest.raises(SystemExit):
+        chatgpt_cli.main()
+    assert "1 acerto(s), 1 falha(s)" in capsys.readouterr().out
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from chatgpt_cli import context
+from chatgpt_cli.context import ContextWindow, estimate_tokens, message_tokens
+from chatgpt_cli.sessions import SessionStore
+
+
+def _turns(n: int, words: int = 20) -> List[Dict[str, Any]]:
+    body = " ".join(["palavra"] * words)
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Turno {i}. {body}"}
+        for i in range(n)
+    ]
+
+
+def test_estimate_tokens_approximates_bpe() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("oi, mundo!") == 5
+    # Palavras longas custam mais de um token.
+    assert estimate_tokens("paralelepípedo") == 4
+
+
+def test_fit_keeps_system_and_latest_turns_within_budget() -> None:
+    system = {"role": "system", "content": "Seja breve."}
+    messages = [system] + _turns(10) + [{"role": "user", "content": "Nova pergunta?"}]
+    costs = [message_tokens(m) for m in messages]
+    budget = costs[0] + costs[-1] + sum(costs[-5:-1])
+    result = ContextWindow(budget=budget).fit(messages)
+    assert result.messages[0] == system
+    assert result.messages[-1] == messages[-1]
+    assert result.messages[1:-1] == messages[-5:-1]
+    assert result.messages[1]["role"] == "user"
+    assert result.tokens <= budget
+    assert result.dropped == len(messages) - 6
+    assert result.counts == costs
+
+
+def test_fit_does_not_start_with_orphan_answer() -> None:
+    messages = _turns(6) + [{"role": "user", "content": "E agora?"}]
+    costs = [message_tokens(m) for m in messages]
+    budget = costs[-1] + costs[-2] + costs[-3] + costs[-4]
+    result = ContextWindow(budget=budget).fit(messages)
+    assert [m["role"] for m in result.messages] == ["user", "assistant", "user"]
+
+
+def test_fit_summarizes_evicted_turns() -> None:
+    messages = _turns(12) + [{"role": "user", "content": "Resumo?"}]
+    budget = sum(message_tokens(m) for m in messages[-3:]) + 80
+    result = ContextWindow(budget=budget, summary_budget=80).fit(messages)
+    assert result.summary is not None
+    assert result.summary.splitlines()[1] == "- user: Turno 0."
+    assert result.messages[0] == {"role": "system", "content": result.summary}
+    assert result.tokens <= budget
+
+
+def test_cached_counts_are_not_recomputed(monkeypatch: Any) -> None:
+    messages = _turns(3)
+    calls: List[Any] = []
+    real = context.message_tokens
+
+    def counting(m: Dict[str, Any]) -> int:
+        calls.append(m)
+        return real(m)
+
+    monkeypatch.setattr(context, "message_tokens", counting)
+    ContextWindow().fit(messages, [10, 20])
+    assert calls == [messages[2]]
+
+
+def test_session_store_memoizes_tokens_and_trims(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path, compact_min_dead=1)
+    messages = _turns(4)
+    store.save("s", messages[:2], [11, 12])
+    store.record_trim("s", {"dropped": 3})
+    store.save("s", messages, [None, None, 13, 14])
+    fresh = SessionStore(tmp_path)
+    assert fresh.token_counts("s") == [11, 12, 13, 14]
+    assert fresh.last_trim("s") == {"dropped": 3}
+    store.save("s", messages[:1])
+    records = [
+        json.loads(line)
+        for line in store.path("s").read_text(encoding="utf-8").splitlines()
+    ]
+    assert records == [{"m": messages[0], "t": 11}, {"trim": {"dropped": 3}}]
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+import chatgpt_cli
+from chatgpt_cli import daemon
+from chatgpt_cli.output import OutputSink
+
+
+class _Recorder(OutputSink):
+    def __init__(self) -> None:
+        super().__init__(StringIO())
+        self.pieces: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.pieces.append(text)
+
+
+@pytest.fixture
+def state(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(chatgpt_cli, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(chatgpt_cli, "SESSIONS_DIR", tmp_path / "sessions")
+    monkeypatch.setattr(chatgpt_cli, "append_history", lambda *a: None)
+    monkeypatch.setattr(daemon, "append_history", lambda *a: None)
+    monkeypatch.setenv("OPENAI_API_KEY", "k")
+    return tmp_path
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> List[List[Dict[str, Any]]]:
+    seen: List[List[Dict[str, Any]]] = []
+
+    def fake_deltas(api_key: str, messages: Any, *a: Any) -> Iterator[str]:
+        seen.append(list(messages))
+        yield "olá, "
+        yield f"turno {len(seen)}"
+
+    monkeypatch.setattr(daemon, "iter_chat_deltas", fake_deltas)
+    return seen
+
+
+def _start(path: Path, idle_timeout: float = 0) -> daemon.Daemon:
+    server = daemon.Daemon(path, idle_timeout=idle_timeout)
+    server.bind()
+    threading.Thread(target=server.serve, daemon=True).start()
+    return server
+
+
+def _chat(path: Path, prompt: str, session: str = "s") -> Any:
+    request = {
+        "op": "chat",
+        "prompt": prompt,
+        "session": session,
+        "config": {"model": "m", "temperature": 0.0},
+    }
+    sink = _Recorder()
+    return daemon.forward(path, request, sink), sink.pieces
+
+
+def test_daemon_streams_and_keeps_session_in_memory(
+    state: Path, calls: List[Any]
+) -> None:
+    sock = state / "daemon.sock"
+    server = _start(sock)
+    try:
+        assert _chat(sock, "primeira") == ("olá, turno 1", ["olá, ", "turno 1"])
+        text, _ = _chat(sock, "segunda")
+        assert text == "olá, turno 2"
+        assert [m["content"] for m in calls[1]] == ["primeira", "olá, turno 1", "segunda"]
+        server.flush()
+        assert [m["content"] for m in chatgpt_cli.load_session("s")] == [
+            "primeira", "olá, turno 1", "segunda", "olá, turno 2"
+        ]
+    finally:
+        server.stop()
+
+
+def test_daemon_reloads_session_changed_on_disk(state: Path, calls: List[Any]) -> None:
+    sock = state / "daemon.sock"
+    server = _start(sock)
+    try:
+        _chat(sock, "primeira")
+        server.flush()
+        chatgpt_cli.clear_session("s")
+        _chat(sock, "depois de limpar")
+        assert [m["content"] for m in calls[-1]] == ["depois de limpar"]
+    finally:
+        server.stop()
+
+
+def test_daemon_shuts_down_when_idle(state: Path) -> None:
+    sock = state / "daemon.sock"
+    server = daemon.Daemon(sock, idle_timeout=0.2)
+    worker = threading.Thread(target=server.serve)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert not sock.exists()
+
+
+def test_shutdown_request_and_stale_socket(state: Path) -> None:
+    sock = state / "daemon.sock"
+    server = daemon.Daemon(sock)
+    worker = threading.Thread(target=server.serve)
+    server.bind()
+    worker.start()
+    assert daemon.request(sock, "shutdown") == {"done": True}
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    sock.touch()  # arquivo órfão de um daemon morto
+    assert daemon.forward(sock, {"op": "ping"}, _Recorder()) is None
+
+
+def test_main_forwards_to_running_daemon(
+    state: Path, calls: List[Any], monkeypatch: pytest.MonkeyPatch, capsys: Any
+) -> None:
+    sock = state / "daemon.sock"
+    monkeypatch.setattr(chatgpt_cli, "DAEMON_SOCKET", sock)
+    monkeypatch.setattr(chatgpt_cli, "CONFIG_PATH", state / "config")
+
+    def direct(*a: Any) -> str:
+        raise AssertionError("não deveria chamar a API diretamente")
+
+    monkeypatch.setattr(chatgpt_cli, "stream_chat_completion", direct)
+    server = _start(sock)
+    try:
+        monkeypatch.setattr(sys, "argv", ["gpt", "--session", "s", "pergunta"])
+        with pytest.raises(SystemExit) as exc:
+            chatgpt_cli.main()
+        assert exc.value.code == 0
+        assert "olá, turno 1" in capsys.readouterr().out
+    finally:
+        server.stop()
+    deadline = time.monotonic() + 5
+    while sock.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    monkeypatch.setattr(chatgpt_cli, "stream_chat_completion", lambda *a: "direto")
+    monkeypatch.setattr(sys, "argv", ["gpt", "pergunta"])
+    chatgpt_cli.main()
+
+
+def test_daemon_declines_other_base_url(state: Path, calls: List[Any], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(chatgpt_cli.transport, "API_BASE", "https://api.openai.com/v1")
+    sock = state / "daemon.sock"
+    server = _start(sock)
+    try:
+        request = {
+            "op": "chat",
+            "prompt": "oi",
+            "config": {"model": "m", "temperature": 0.0},
+            "base_url": "http://127.0.0.1:8080/v1",
+        }
+        sink = _Recorder()
+        assert daemon.forward(sock, request, sink) is None
+        assert sink.pieces == [] and sink.stream.getvalue() == ""  # type: ignore[attr-defined]
+        assert calls == []
+        request["base_url"] = "https://api.openai.com/v1/"
+        assert daemon.forward(sock, request, _Recorder()) == "olá, turno 1"
+    finally:
+        server.stop()
@@ -4,6 +4,20 @@ from types import SimpleNamespace
 from typing import Any, List
 
 import utils.dependency_manager as dependency_manager
+from utils.dependency_manager import DependencyGraph
+
+
+def _dist(name: str, *requires: str, requested: bool = False) -> SimpleNamespace:
+    marker = "" if requested else None
+    return SimpleNamespace(
+        metadata={"Name": name},
+        requires=list(requires) or None,
+        read_text=lambda filename: marker if filename == "REQUESTED" else None,
+    )
+
+
+def _graph(*dists: SimpleNamespace) -> DependencyGraph:
+    return DependencyGraph.from_environment(dists)  # type: ignore[arg-type]
 
 
 def test_remove_dependencies_uninstalls_unused_packages_once(monkeypatch: Any) -> None:
@@ -13,10 +27,53 @@ def test_remove_dependencies_uninstalls_unused_packages_once(monkeypatch: Any) -
         called.append(cmd)
         return SimpleNamespace(returncode=0, stdout="")
 
-    monkeypatch.setattr(dependency_manager, "dependency_in_use", lambda pkg: pkg == "keep")
     monkeypatch.setattr(dependency_manager.subprocess, "run", fake_run)
+    graph = _graph(_dist("remove1"), _dist("keep"), _dist("remove2"), _dist("other", "keep>=1"))
 
-    dependency_manager.remove_dependencies(["remove1", "keep", "remove2"])
+    removed = dependency_manager.remove_dependencies(["remove1", "keep", "remove2"], graph)
 
+    assert removed == ["remove1", "remove2"]
     assert called == [["pip", "uninstall", "--yes", "remove1", "remove2"]]
 
+
+def test_graph_normalizes_names_and_ignores_extras() -> None:
+    graph = _graph(
+        _dist("Requests", "urllib3<3,>=1.21.1", "PySocks!=1.5.7; extra == 'socks'"),
+        _dist("urllib3"),
+        _dist("PySocks"),
+    )
+    assert graph.in_use("URLLIB3")
+    assert not graph.in_use("pysocks")
+    assert not graph.in_use("urllib3", ignoring=["requests"])
+    assert dependency_manager.dependency_in_use("urllib3", graph)
+    assert dependency_manager._read_dependencies() == ["requests"]
+
+
+def test_uninstall_plan_follows_transitive_dependencies() -> None:
+    graph = _graph(
+        _dist("chatgpt-cli-secure", "requests>=2.31.0"),
+        _dist("requests", "urllib3", "certifi", "idna"),
+        _dist("urllib3"),
+        _dist("certifi"),
+        _dist("idna"),
+        _dist("httpx", "idna", "certifi"),
+    )
+    plan = graph.uninstall_plan(["requests"], removing=["chatgpt_cli_secure"])
+    assert plan == ["requests", "urllib3"]
+    assert graph.uninstall_plan(["requests"]) == []
+    assert graph.uninstall_plan(["requests", "missing"], removing=["chatgpt-cli-secure"], transitive=False) == [
+        "requests"
+    ]
+
+
+def test_uninstall_plan_keeps_directly_installed_dependencies() -> None:
+    graph = _graph(
+        _dist("chatgpt-cli-secure", "requests>=2.31.0", requested=True),
+        _dist("requests", "urllib3", "certifi", "idna", requested=True),
+        _dist("urllib3"),
+        _dist("certifi", requested=True),
+        _dist("idna"),
+    )
+    assert graph.requested == {"chatgpt-cli-secure", "requests", "certifi"}
+    plan = graph.uninstall_plan(["requests"], removing=["chatgpt-cli-secure"])
+    assert plan == ["idna", "requests", "urllib3"]
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, List
+
+import pytest
+
+from chatgpt_cli import files, transport
+from chatgpt_cli.files import FileOwner, MultipartFileStream, UploadCache, UploadError
+from chatgpt_cli.sessions import locked_file
+
+
+def _parse_multipart(body: bytes, content_type: str) -> dict:
+    msg = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    return {
+        part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+        for part in msg.iter_parts()
+    }
+
+
+def test_multipart_stream_reads_in_blocks_and_rewinds(tmp_path: Path) -> None:
+    path = tmp_path / "doc.pdf"
+    content = bytes(range(256)) * 100
+    path.write_bytes(content)
+    with MultipartFileStream(path, {"purpose": "assistants"}) as body:
+        blocks: List[bytes] = []
+        while True:
+            block = body.read(333)
+            if not block:
+                break
+            blocks.append(block)
+        data = b"".join(blocks)
+        assert len(data) == len(body)
+        body.seek(0)
+        assert body.read() == data
+    parts = _parse_multipart(data, body.content_type)
+    assert parts["purpose"] == b"assistants"
+    assert parts["file"] == content
+
+
+def test_upload_cache_ttl_and_discard(tmp_path: Path) -> None:
+    cache = UploadCache(tmp_path / "uploads.json", ttl=60)
+    cache.put("abc", "file-1")
+    assert UploadCache(tmp_path / "uploads.json", ttl=60).get("abc") == "file-1"
+    assert UploadCache(tmp_path / "uploads.json", ttl=1e-9).get("abc") is None
+    cache.discard(["file-1"])
+    assert UploadCache(tmp_path / "uploads.json", ttl=60).get("abc") is None
+
+
+def test_upload_cache_is_scoped_per_key(tmp_path: Path) -> None:
+    path = tmp_path / "uploads.json"
+    UploadCache(path, ttl=60, scope="conta-a").put("abc", "file-a")
+    assert UploadCache(path, ttl=60, scope="conta-a").get("abc") == "file-a"
+    assert UploadCache(path, ttl=60, scope="conta-b").get("abc") is None
+    assert UploadCache(path, ttl=60).get("abc") is None
+
+
+def test_upload_attachments_parallel_and_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    bodies: List[bytes] = []
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def fake_post(url: str, headers: dict, data: Any, timeout: float) -> SimpleNamespace:
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.05)
+        payload = data.read()
+        with lock:
+            in_flight["now"] -= 1
+            bodies.append(payload)
+            n = len(bodies)
+        return SimpleNamespace(status_code=200, json=lambda: {"id": f"file-{n}"}, text="")
+
+    monkeypatch.setattr(files, "get_session", lambda: SimpleNamespace(post=fake_post))
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.png"
+    a.write_bytes(b"A" * 10)
+    b.write_bytes(b"B" * 10)
+    cache = UploadCache(tmp_path / "uploads.json")
+    attachments = [("input_file", a), ("input_image", b)]
+
+    first = files.upload_attachments(attachments, "k", 1.0, cache)
+    assert [r.key for r in first] == ["input_file", "input_image"]
+    assert not any(r.cached for r in first)
+    assert in_flight["max"] == 2
+
+    second = files.upload_attachments(attachments, "k", 1.0, cache)
+    assert all(r.cached for r in second)
+    assert [r.file_id for r in second] == [r.file_id for r in first]
+    assert len(bodies) == 2
+
+
+def test_upload_file_reports_http_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_post(*_: Any, **__: Any) -> SimpleNamespace:
+        return SimpleNamespace(status_code=400, text="ruim", json=lambda: {})
+
+    monkeypatch.setattr(files, "get_session", lambda: SimpleNamespace(post=fake_post))
+    path = tmp_path / "x.txt"
+    path.write_text("x")
+    with pytest.raises(UploadError, match="ruim"):
+        files.upload_file(path, "k", 1.0)
+
+
+def test_delete_files_concurrent_with_429_backoff(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    attempts: dict = {}
+    lock = threading.Lock()
+
+    def fake_delete(url: str, headers: dict, timeout: float) -> SimpleNamespace:
+        fid = url.rsplit("/", 1)[1]
+        with lock:
+            attempts[fid] = attempts.get(fid, 0) + 1
+            n = attempts[fid]
+        if fid == "f-limited" and n == 1:
+            return SimpleNamespace(status_code=429, text="", headers={"Retry-After": "0.01"})
+        if fid == "f-bad":
+            return SimpleNamespace(status_code=500, text="falha", headers={})
+        status = 404 if fid == "f-gone" else 200
+        return SimpleNamespace(status_code=status, text="", headers={})
+
+    monkeypatch.setattr(files, "get_session", lambda **_: SimpleNamespace(delete=fake_delete))
+    ledger = files.FileLedger(tmp_path / "ledger.jsonl")
+    ids = ["f-ok", "f-limited", "f-gone", "f-bad"]
+    ledger.add(ids)
+
+    start = time.monotonic()
+    deleted, errors = files.delete_files(ids + ["f-ok"], "k", 1.0, ledger=ledger)
+    assert time.monotonic() - start < 1.0
+    assert sorted(deleted) == ["f-gone", "f-limited", "f-ok"]
+    assert attempts["f-limited"] == 2 and attempts["f-ok"] == 1
+    assert len(errors) == 1 and "500" in errors[0]
+    assert ledger.live() == ["f-bad"]
+
+
+def test_ledger_survives_torn_record_and_compacts(tmp_path: Path) -> None:
+    ledger = files.FileLedger(tmp_path / "ledger.jsonl")
+    ledger.add(["a", "b", "c"])
+    ledger.remove(["b"])
+    with open(ledger.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": "tru')
+    assert ledger.live() == ["a", "c"]
+    ledger.compact()
+    assert ledger.path.read_text(encoding="utf-8").count("\n") == 2
+    assert ledger.live() == ["a", "c"]
+    ledger.path.write_text('{"op": "add", "id": "a"}\n{"op": "add", "id": "tru', encoding="utf-8")
+    ledger.add(["d"])
+    assert ledger.live() == ["a", "d"]
+
+
+def test_ledger_compact_does_not_lose_concurrent_add(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    ours, other = files.FileLedger(path), files.FileLedger(path)
+    ours.add(["a", "b"])
+    ours.remove(["a"])
+    with locked_file(path, os.O_RDWR):
+        threads = [
+            threading.Thread(target=other.add, args=(["c"],)),
+            threading.Thread(target=ours.compact),
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+    for t in threads:
+        t.join(2)
+    assert ours.live() == ["b", "c"]
+
+
+def test_ledger_groups_live_ids_by_owner(tmp_path: Path) -> None:
+    ledger = files.FileLedger(tmp_path / "ledger.jsonl")
+    work = FileOwner("trabalho", "https://proxy.local/v1")
+    ledger.add(["a"], work)
+    ledger.add(["b"])
+    with open(ledger.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": "c"}\n')  # registro anterior ao campo ``profile``
+    expected = {work: ["a"], FileOwner(): ["b", "c"]}
+    assert ledger.live_by_owner() == expected
+    ledger.compact()
+    assert ledger.live_by_owner() == expected
+
+
+def test_404_is_kept_when_key_is_not_the_uploader(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    urls: List[str] = []
+
+    def fake_delete(url: str, headers: dict, timeout: float) -> SimpleNamespace:
+        urls.append(url)
+        return SimpleNamespace(status_code=404, text="", headers={})
+
+    monkeypatch.setattr(files, "get_session", lambda **_: SimpleNamespace(delete=fake_delete))
+    ledger = files.FileLedger(tmp_path / "ledger.jsonl")
+    ledger.add(["a", "b"])
+    deleted, errors = files.delete_files(
+        ["a"], "k", 1.0, ledger=ledger, base_url="https://proxy.local/v1", missing_ok=False
+    )
+    assert deleted == [] and len(errors) == 1
+    assert urls == ["https://proxy.local/v1/files/a"]
+    deleted, errors = files.delete_files(["b"], "k", 1.0, ledger=ledger)
+    assert deleted == ["b"] and errors == []
+    assert ledger.live() == ["a"]
+
+
+def test_spawn_background_delete_passes_owner(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: List[Any] = []
+    monkeypatch.setattr("subprocess.Popen", lambda cmd, **kw: calls.append((cmd, kw)))
+    files.spawn_background_delete(["f1", "f2"], FileOwner("trabalho", "https://proxy.local/v1"))
+    (cmd, kw), = calls
+    assert cmd[-5:] == ["--profile", "trabalho", "--delete-file-ids", "f1", "f2"]
+    assert kw["env"]["OPENAI_BASE_URL"] == "https://proxy.local/v1"
+    assert kw["start_new_session"]
+
+
+def test_delete_retries_429_only_in_delete_file(monkeypatch: pytest.MonkeyPatch) -> None:
+    hits: Counter = Counter()
+
+    class Limited(BaseHTTPRequestHandler):
+        def do_DELETE(self) -> None:  # noqa: N802
+            hits[self.path] += 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *_: Any) -> None:
+            pass
+
+    monkeypatch.setattr(files, "DELETE_BACKOFF_MAX", 0.0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Limited)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport.close_session()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        deleted, errors = files.delete_files(["f1", "f2"], "k", 2.0, base_url=base)
+    finally:
+        server.shutdown()
+        server.server_close()
+        transport.close_session()
+    assert deleted == [] and len(errors) == 2
+    assert hits == {"/v1/files/f1": files.DELETE_MAX_ATTEMPTS, "/v1/files/f2": files.DELETE_MAX_ATTEMPTS}
@@ -9,7 +9,7 @@ from chatgpt_cli import get_api_key
 def test_get_api_key_calls_decrypt_once(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
     calls: int = 0
 
-    def fake_load_api_key(*, loc: object) -> str:
+    def fake_load_api_key(*, loc: object, **_: object) -> str:
         nonlocal calls
         calls += 1
         return "decrypted"
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+from chatgpt_cli.history import HistoryStore
+
+
+def _fill(store: HistoryStore) -> None:
+    store.append("trabalho", "Como otimizar consultas SQL?", "Use índices compostos.")
+    store.append(None, "Receita de pão", "Farinha, água e fermentação lenta.")
+    store.append("trabalho", "Explique índices parciais", "Cobrem só parte das linhas.")
+
+
+def test_search_ranks_and_filters(tmp_path: Path) -> None:
+    store = HistoryStore(tmp_path)
+    _fill(store)
+    hits = store.search("indices")
+    assert {h.prompt.replace("[", "").replace("]", "") for h in hits} == {
+        "Como otimizar consultas SQL?",
+        "Explique índices parciais",
+    }
+    assert "[índices]" in hits[0].prompt + hits[0].response
+    assert store.search("pão", session="trabalho") == []
+    assert [h.session for h in store.search("pão")] == [None]
+    assert store.search("indices", since="2999-01-01T00:00:00") == []
+    assert len(store.search("", limit=2)) == 2
+
+
+def test_existing_log_is_indexed_incrementally(tmp_path: Path) -> None:
+    log = tmp_path / "history.jsonl"
+    legacy = {"timestamp": "2020-01-01T00:00:00", "session": None,
+              "prompt": "antigo", "response": "registro legado"}
+    log.write_text(json.dumps(legacy) + "\n" + '{"timestamp": "tru', encoding="utf-8")
+    store = HistoryStore(tmp_path)
+    assert [h.timestamp for h in store.search("legado")] == ["2020-01-01T00:00:00"]
+    # Linha incompleta não é indexada até ser concluída.
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('ncado"}\n')
+    store.append(None, "novo", "outro legado")
+    assert len(store.search("legado")) == 2
+
+
+def test_rotation_keeps_archives_searchable(tmp_path: Path) -> None:
+    store = HistoryStore(tmp_path, max_bytes=200)
+    for i in range(6):
+        store.append("s", f"pergunta {i} sobre rotação", "x" * 60)
+    segments = store.segments()
+    assert segments
+    archived = gzip.decompress(segments[0].read_bytes()).decode("utf-8")
+    assert "pergunta 0" in archived
+    assert store.log_path.stat().st_size < 200
+    assert len(store.search("rotação", limit=50)) == 6
+    assert {h.segment for h in store.search("rotação", limit=50)} >= {segments[0].name}
+
+    store.close()
+    store.db_path.unlink()
+    fresh = HistoryStore(tmp_path)
+    assert len(fresh.search("rotação", limit=50)) == 6
+    assert fresh.rebuild() == 6
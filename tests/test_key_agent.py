@@ -0,0 +1,65 @@
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from chatgpt_cli import key_agent
+from chatgpt_cli.key_agent import KeyAgent
+from chatgpt_cli.secure_storage import KdfParams, KeyLocation, load_api_key, save_api_key
+
+
+@pytest.fixture
+def sock_path(tmp_path: Path) -> Iterator[Path]:
+    path = tmp_path / "run" / "agent.sock"
+    yield path
+    key_agent.forget(path)
+
+
+def _serve(path: Path, ttl: float = 60.0) -> threading.Thread:
+    agent = KeyAgent(path)
+    agent.put("inicial", b"k" * 64, ttl)
+    agent.bind()
+    thread = threading.Thread(target=agent.serve, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_agent_get_put_forget(sock_path: Path) -> None:
+    thread = _serve(sock_path)
+    assert stat.S_IMODE(sock_path.stat().st_mode) == 0o600
+    assert stat.S_IMODE(sock_path.parent.stat().st_mode) == 0o700
+    assert key_agent.fetch(sock_path, "inicial") == b"k" * 64
+    assert key_agent.fetch(sock_path, "outra") is None
+    key_agent.store(sock_path, "outra", b"o" * 64, 60.0)
+    assert key_agent.fetch(sock_path, "outra") == b"o" * 64
+    assert key_agent.forget(sock_path)
+    thread.join(2)
+    assert not thread.is_alive() and not sock_path.exists()
+    assert not key_agent.forget(sock_path)
+
+
+def test_agent_exits_when_keys_expire(sock_path: Path) -> None:
+    thread = _serve(sock_path, ttl=0.2)
+    assert key_agent.fetch(sock_path, "inicial") is not None
+    time.sleep(0.3)
+    assert key_agent.fetch(sock_path, "inicial") is None
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_second_unlock_uses_spawned_agent(tmp_path: Path, sock_path: Path) -> None:
+    loc = KeyLocation(base_dir=tmp_path)
+    save_api_key("sk-agente", loc=loc, passphrase="senha", kdf=KdfParams(n=1 << 10))
+    prompts: List[int] = []
+
+    def passphrase() -> str:
+        prompts.append(1)
+        return "senha"
+
+    assert load_api_key(loc=loc, passphrase=passphrase, agent=sock_path, agent_ttl=30) == "sk-agente"
+    assert sock_path.exists()  # agente iniciado em outro processo
+    assert load_api_key(loc=loc, passphrase=passphrase, agent=sock_path, agent_ttl=30) == "sk-agente"
+    assert prompts == [1]
@@ -0,0 +1,39 @@
+"""Caminho HTTP real (``requests`` + SSE) contra o servidor de ``benchmarks``."""
+
+from __future__ import annotations
+
+import sys
+from io import StringIO
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+from mock_openai import MockConfig, MockOpenAI  # noqa: E402
+
+from chatgpt_cli import Config, stream_chat_completion, transport  # noqa: E402
+from chatgpt_cli.files import upload_attachments  # noqa: E402
+from chatgpt_cli.output import FinalOnlySink  # noqa: E402
+
+
+@pytest.fixture
+def mock(monkeypatch: pytest.MonkeyPatch) -> Iterator[MockOpenAI]:
+    with MockOpenAI(MockConfig(tokens=50, chunk_tokens=3, token="ab ")) as server:
+        monkeypatch.setattr(transport, "API_BASE", server.base_url)
+        yield server
+
+
+def test_stream_and_upload_against_mock(mock: MockOpenAI, tmp_path: Path) -> None:
+    out = StringIO()
+    text = stream_chat_completion(
+        "k", [{"role": "user", "content": "x"}], Config("m", 0.0), 5.0, None, FinalOnlySink(out)
+    )
+    assert text == "ab " * 50
+    assert out.getvalue() == text + "\n"
+
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x" * 300_000)
+    results = upload_attachments([("input_file", path)], "k", 5.0)
+    assert results[0].file_id.startswith("file-mock")
+    assert mock.server.uploaded_bytes > 300_000
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import time
+from io import StringIO
+from typing import List
+
+from chatgpt_cli.output import (
+    BufferedSink,
+    CoalescingSink,
+    FinalOnlySink,
+    select_sink,
+)
+
+
+class RecordingStream(StringIO):
+    """``StringIO`` que registra cada ``write`` efetivo."""
+
+    def __init__(self, tty: bool = False) -> None:
+        super().__init__()
+        self.writes: List[str] = []
+        self._tty = tty
+
+    def write(self, s: str) -> int:
+        self.writes.append(s)
+        return super().write(s)
+
+    def isatty(self) -> bool:
+        return self._tty
+
+
+def test_select_sink_by_destination() -> None:
+    assert isinstance(select_sink(RecordingStream(tty=True)), CoalescingSink)
+    assert isinstance(select_sink(RecordingStream()), BufferedSink)
+    assert isinstance(select_sink(RecordingStream(tty=True), final_only=True), FinalOnlySink)
+
+
+def test_final_only_emits_once_on_close() -> None:
+    stream = RecordingStream()
+    sink = FinalOnlySink(stream)
+    for token in ("a", "b", "c"):
+        sink.write(token)
+    assert stream.writes == []
+    sink.close()
+    assert stream.getvalue() == "abc\n"
+
+
+def test_coalescing_sink_groups_bursts_by_size() -> None:
+    stream = RecordingStream(tty=True)
+    sink = CoalescingSink(stream, interval=60.0, max_bytes=4)
+    for token in "abcdefghij":
+        sink.write(token)
+    sink.close()
+    assert stream.getvalue() == "abcdefghij\n"
+    # Primeiro token sai na hora; o resto é agrupado em blocos de 4.
+    assert stream.writes[:4] == ["a", "bcde", "fghi", "j"]
+
+
+def test_coalescing_sink_flushes_pending_after_interval() -> None:
+    stream = RecordingStream(tty=True)
+    sink = CoalescingSink(stream, interval=0.02, max_bytes=1024)
+    sink.write("a")
+    sink.write("b")
+    deadline = time.monotonic() + 2
+    while stream.getvalue() != "ab" and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert stream.getvalue() == "ab"
+    sink.close()
+    assert stream.getvalue() == "ab\n"
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+import chatgpt_cli
+from chatgpt_cli import Config, batch, files, transport
+from chatgpt_cli.files import FileLedger, FileOwner
+from chatgpt_cli.profiles import ProfileError, load_profiles, select_profiles
+from chatgpt_cli.ratelimit import KeyBudget, KeyScheduler
+from chatgpt_cli.secure_storage import KdfParams, KeyLocation, save_api_key
+
+
+def test_load_profiles_and_keys(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    save_api_key("sk-arquivo", loc=KeyLocation(base_dir=tmp_path, file_name="trabalho.txt"))
+    ini = tmp_path / "profiles.ini"
+    ini.write_text(
+        f"[trabalho]\nkey_file = {tmp_path / 'trabalho.txt'}\nmodel = gpt-4o\nrpm = 10\n\n"
+        "[pessoal]\nkey_env = CHAVE_PESSOAL\nbase_url = http://localhost:8080/v1/\n"
+    )
+    monkeypatch.setenv("CHAVE_PESSOAL", "sk-env")
+    profiles = load_profiles(ini)
+    assert list(profiles) == ["trabalho", "pessoal"]
+    assert profiles["trabalho"].api_key() == "sk-arquivo"
+    assert profiles["trabalho"].model == "gpt-4o" and profiles["trabalho"].rpm == 10
+    assert profiles["pessoal"].api_key() == "sk-env"
+    assert profiles["pessoal"].base_url == "http://localhost:8080/v1"
+    assert load_profiles(tmp_path / "ausente.ini") == {}
+    with pytest.raises(ProfileError):
+        select_profiles(profiles, ["outro"])
+
+
+def test_encrypted_profile_key_and_invalid_section(tmp_path: Path) -> None:
+    loc = KeyLocation(base_dir=tmp_path, file_name="cifrada.txt")
+    save_api_key("sk-cifrada", loc=loc, passphrase="senha", kdf=KdfParams(n=1 << 10))
+    ini = tmp_path / "profiles.ini"
+    ini.write_text(f"[c]\nkey_file = {loc.path}\n\n[vazio]\nmodel = x\n")
+    with pytest.raises(ProfileError):
+        load_profiles(ini)
+    ini.write_text(f"[c]\nkey_file = {loc.path}\n")
+    assert load_profiles(ini)["c"].api_key(passphrase=lambda: "senha") == "sk-cifrada"
+
+
+def test_batch_spreads_requests_and_requeues_429(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: List[str] = []
+    lock = threading.Lock()
+
+    class Resp:
+        def __init__(self, status: int, headers: Dict[str, str]) -> None:
+            self.status_code, self.headers = status, headers
+
+    def fake_chat(api_key: str, messages: List[Dict[str, Any]], config: Config, timeout: float, **kw: Any) -> Dict[str, Any]:
+        with lock:
+            calls.append(api_key)
+        if calls == ["ka"]:
+            kw["on_response"](Resp(429, {"retry-after": "0.05"}))
+            raise RuntimeError("Erro 429: limite")
+        time.sleep(0.03)
+        kw["on_response"](Resp(200, {"x-ratelimit-remaining-requests": "100"}))
+        return {"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 1}}
+
+    monkeypatch.setattr(batch, "chat_completion", fake_chat)
+    monkeypatch.setattr(batch, "append_history", lambda *a: None)
+    monkeypatch.setenv("KA", "ka")
+    monkeypatch.setenv("KB", "kb")
+    ini = tmp_path / "profiles.ini"
+    ini.write_text("[a]\nkey_env = KA\n\n[b]\nkey_env = KB\n")
+    profiles = load_profiles(ini).values()
+    scheduler = KeyScheduler([p.budget(p.api_key()) for p in profiles])
+    out = StringIO()
+    lines = [json.dumps({"prompt": "limite"})] + [json.dumps({"prompt": f"p{i}"}) for i in range(7)]
+    stats = batch.BatchRunner(scheduler, 1.0, 2).run(lines, Config("m", 0.5), out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert stats.failed == 0 and stats.ok == 8
+    assert {r["profile"] for r in results} == {"a", "b"}
+    assert len(calls) == 9  # a primeira chamada (429) voltou para a fila
+
+
+def test_batch_reroutes_429_after_a_single_request() -> None:
+    seen: List[str] = []
+
+    class Api(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            self.rfile.read(int(self.headers["Content-Length"]))
+            seen.append(self.headers["Authorization"])
+            if self.headers["Authorization"] == "Bearer ka":
+                body, status, extra = b"{}", 429, {"Retry-After": "5"}
+            else:
+                body, status, extra = b'{"choices": [], "usage": {"total_tokens": 1}}', 200, {}
+            self.send_response(status)
+            for name, value in {**extra, "Content-Length": str(len(body))}.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Api)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport.close_session()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        scheduler = KeyScheduler([KeyBudget("a", "ka", base_url=base), KeyBudget("b", "kb", base_url=base)])
+        started = time.monotonic()
+        _, profile = batch.BatchRunner(scheduler, 2.0)._complete([{"role": "user", "content": "oi"}], Config("m", 0.5))
+    finally:
+        server.shutdown()
+        server.server_close()
+        transport.close_session()
+    assert profile == "b"
+    assert seen == ["Bearer ka", "Bearer kb"]  # sem *retries* do transporte na chave esgotada
+    assert time.monotonic() - started < 2.0
+
+
+def test_gc_files_deletes_each_file_with_its_uploader_key(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    ini = tmp_path / "profiles.ini"
+    ini.write_text("[trabalho]\nkey_env = CHAVE_TRABALHO\n")
+    ledger = FileLedger(tmp_path / "uploaded_files.jsonl")
+    ledger.add(["f-padrao"], FileOwner(None, "https://api.openai.com/v1"))
+    ledger.add(["f-trabalho"], FileOwner("trabalho", "https://proxy.local/v1"))
+    ledger.add(["f-antigo"], FileOwner("antigo", "https://api.openai.com/v1"))
+    for name, value in [
+        ("PROFILES_PATH", ini),
+        ("UPLOAD_LEDGER_FILE", ledger.path),
+        ("UPLOAD_CACHE_FILE", tmp_path / "uploads.json"),
+        ("CONFIG_PATH", tmp_path / "config"),
+        ("STATE_DIR", tmp_path),
+    ]:
+        monkeypatch.setattr(chatgpt_cli, name, value)
+    monkeypatch.setattr(transport, "API_BASE", transport.API_BASE)  # restaurado ao final
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-padrao")
+    monkeypatch.setenv("CHAVE_TRABALHO", "sk-trabalho")
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    seen: List[Any] = []
+
+    def fake_delete(url: str, headers: dict, timeout: float) -> SimpleNamespace:
+        seen.append((url, headers["Authorization"]))
+        return SimpleNamespace(status_code=200, text="", headers={})
+
+    monkeypatch.setattr(files, "get_session", lambda **_: SimpleNamespace(delete=fake_delete))
+    monkeypatch.setattr("sys.argv", ["gpt", "--gc-files"])
+    chatgpt_cli.get_api_key.cache_clear()
+    try:
+        with pytest.raises(SystemExit) as exc:
+            chatgpt_cli.main()
+    finally:
+        chatgpt_cli.get_api_key.cache_clear()
+    assert exc.value.code == 1  # o perfil "antigo" não existe mais
+    assert sorted(seen) == [
+        ("https://api.openai.com/v1/files/f-padrao", "Bearer sk-padrao"),
+        ("https://proxy.local/v1/files/f-trabalho", "Bearer sk-trabalho"),
+    ]
+    assert ledger.live() == ["f-antigo"]
+    assert "2 de 3" in capsys.readouterr().out
+
+
+def test_deferred_delete_ready_requires_agent_for_encrypted_keys(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    loc = KeyLocation(base_dir=tmp_path, file_name="cifrada.txt")
+    save_api_key("sk-cifrada", loc=loc, passphrase="senha", kdf=KdfParams(n=1 << 10))
+    ini = tmp_path / "profiles.ini"
+    ini.write_text(f"[c]\nkey_file = {loc.path}\n\n[e]\nkey_env = CHAVE_E\n")
+    profiles = load_profiles(ini)
+    monkeypatch.setattr(chatgpt_cli, "STATE_DIR", tmp_path)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    assert chatgpt_cli.deferred_delete_ready(profiles["e"])
+    assert not chatgpt_cli.deferred_delete_ready(profiles["c"])
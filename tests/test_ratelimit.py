@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Dict
+
+import pytest
+
+from chatgpt_cli.ratelimit import KeyBudget, KeyScheduler, Lease, parse_duration
+
+
+def _finish(scheduler: KeyScheduler, lease: Lease, status: int = 200, **headers: str) -> None:
+    lease.status = status
+    lease.headers = {k.replace("_", "-"): v for k, v in headers.items()}
+    scheduler.release(lease)
+
+
+def test_parse_duration() -> None:
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1h1m1.5s") == pytest.approx(3661.5)
+    assert parse_duration("2") == 2
+    assert parse_duration("soon") is None
+
+
+def test_routes_to_least_loaded_key() -> None:
+    scheduler = KeyScheduler([KeyBudget("a", "ka"), KeyBudget("b", "kb")])
+    first, second = scheduler.acquire(), scheduler.acquire()
+    assert {first.budget.name, second.budget.name} == {"a", "b"}
+    _finish(scheduler, first)
+    assert scheduler.acquire().budget is first.budget
+
+
+def test_headers_exhaust_key_and_route_elsewhere() -> None:
+    a, b = KeyBudget("a", "ka"), KeyBudget("b", "kb")
+    scheduler = KeyScheduler([a, b])
+    lease = scheduler.acquire()
+    assert lease.budget is a
+    _finish(
+        scheduler,
+        lease,
+        x_ratelimit_remaining_requests="0",
+        x_ratelimit_reset_requests="30s",
+        x_ratelimit_remaining_tokens="900",
+    )
+    assert a.remaining_requests == 0 and a.remaining_tokens == 900
+    assert [scheduler.acquire().budget.name for _ in range(3)] == ["b", "b", "b"]
+
+
+def test_queues_until_reset_instead_of_failing() -> None:
+    scheduler = KeyScheduler([KeyBudget("a", "ka")])
+    lease = scheduler.acquire()
+    _finish(scheduler, lease, x_ratelimit_remaining_requests="0", x_ratelimit_reset_requests="200ms")
+    got: Dict[str, float] = {}
+
+    def worker() -> None:
+        start = time.monotonic()
+        scheduler.acquire()
+        got["waited"] = time.monotonic() - start
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join(3)
+    assert 0.1 < got["waited"] < 2
+
+
+def test_429_blocks_key_for_retry_after() -> None:
+    a, b = KeyBudget("a", "ka"), KeyBudget("b", "kb")
+    scheduler = KeyScheduler([a, b])
+    lease = scheduler.acquire()
+    _finish(scheduler, lease, status=429, retry_after="10")
+    assert a.blocked_until > time.monotonic() + 5
+    assert scheduler.acquire().budget is b
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from io import StringIO
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+
+import chatgpt_cli
+from chatgpt_cli import Config, ContextWindow, repl
+from chatgpt_cli.output import OutputSink
+
+
+class _Recorder(OutputSink):
+    def __init__(self) -> None:
+        super().__init__(StringIO())
+        self.pieces: List[str] = []
+
+    def write(self, text: str) -> None:
+        self.pieces.append(text)
+
+
+@pytest.fixture
+def history(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> List[Any]:
+    monkeypatch.setattr(chatgpt_cli, "SESSIONS_DIR", tmp_path / "sessions")
+    entries: List[Any] = []
+    monkeypatch.setattr(repl, "append_history", lambda *a: entries.append(a))
+    return entries
+
+
+def _repl(session: str = "s") -> repl.Repl:
+    return repl.Repl(
+        api_key="k",
+        config=Config(model="m", temperature=0.0),
+        window=ContextWindow(budget=0),
+        timeout=1.0,
+        chunk_size=None,
+        make_sink=_Recorder,
+        session=session,
+    )
+
+
+def _lines(*lines: str) -> Any:
+    pending = list(lines)
+
+    def read(prompt: str) -> str:
+        if not pending:
+            raise EOFError
+        line = pending.pop(0)
+        if line == "^C":
+            raise KeyboardInterrupt
+        return line
+
+    return read
+
+
+def test_repl_keeps_conversation_and_persists_turns(
+    history: List[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sent: List[Any] = []
+
+    def fake_deltas(api_key: str, messages: Any, *a: Any) -> Iterator[str]:
+        sent.append([m["content"] for m in messages])
+        yield f"r{len(sent)}"
+
+    monkeypatch.setattr(repl, "iter_chat_deltas", fake_deltas)
+    _repl().run("a", read=_lines("", "^C", "b", "/sair", "ignorada"))
+    assert sent == [["a"], ["a", "r1", "b"]]
+    assert [m["content"] for m in chatgpt_cli.load_session("s")] == ["a", "r1", "b", "r2"]
+    assert [e[1:] for e in history] == [("a", "r1"), ("b", "r2")]
+
+
+def test_ctrl_c_cancels_only_the_stream(
+    history: List[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    closed: List[bool] = []
+
+    def fake_deltas(api_key: str, messages: Any, *a: Any) -> Iterator[str]:
+        try:
+            if messages[-1]["content"] == "longa":
+                yield "parcial"
+                raise KeyboardInterrupt
+            yield "ok"
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(repl, "iter_chat_deltas", fake_deltas)
+    session = _repl()
+    assert session.ask("curta") == "ok"
+    assert session.ask("longa") is None
+    assert len(closed) == 2
+    session.close()
+    assert [m["content"] for m in chatgpt_cli.load_session("s")] == ["curta", "ok"]
+    assert len(history) == 1
+
+
+def test_clear_truncates_session(
+    history: List[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(repl, "iter_chat_deltas", lambda *a: (d for d in ["ok"]))
+    _repl().run("oi", read=_lines("/limpar"))
+    assert chatgpt_cli.load_session("s") == []
+    assert _repl().messages == []
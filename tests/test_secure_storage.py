@@ -1,9 +1,19 @@
+import json
 import stat
 from pathlib import Path
+from typing import Any, List
 
 import pytest
 
-from chatgpt_cli.secure_storage import KeyLocation, load_api_key, save_api_key
+from chatgpt_cli.secure_storage import (
+    KdfParams,
+    KeyLocation,
+    KeyStoreError,
+    is_encrypted,
+    key_unattended,
+    load_api_key,
+    save_api_key,
+)
 
 
 def test_save_and_load_api_key(tmp_path: Path) -> None:
@@ -19,3 +29,76 @@ def test_load_api_key_missing_file(tmp_path: Path) -> None:
     loc = KeyLocation(base_dir=tmp_path)
     with pytest.raises(FileNotFoundError):
         load_api_key(loc=loc)
+
+
+def test_encrypted_key_round_trip(tmp_path: Path) -> None:
+    loc = KeyLocation(base_dir=tmp_path)
+    save_api_key("sk-segredo", loc=loc, passphrase="senha", kdf=KdfParams(n=1 << 10))
+    content = loc.path.read_text()
+    assert is_encrypted(content) and "sk-segredo" not in content
+    assert stat.S_IMODE(loc.path.stat().st_mode) == 0o600
+    assert load_api_key(loc=loc, passphrase=lambda: "senha") == "sk-segredo"
+    with pytest.raises(KeyStoreError, match="Senha incorreta"):
+        load_api_key(loc=loc, passphrase=lambda: "errada")
+    with pytest.raises(KeyStoreError, match="senha necessária"):
+        load_api_key(loc=loc)
+
+
+def test_encrypted_key_with_pbkdf2_and_tampering(tmp_path: Path) -> None:
+    loc = KeyLocation(base_dir=tmp_path)
+    kdf = KdfParams(name="pbkdf2-sha256", iterations=1000)
+    save_api_key("sk-" + "x" * 100, loc=loc, passphrase="senha", kdf=kdf)
+    assert load_api_key(loc=loc, passphrase=lambda: "senha") == "sk-" + "x" * 100
+    data = json.loads(loc.path.read_text())
+    data["kdf"]["iterations"] = 999  # parâmetros também são autenticados
+    loc.path.write_text(json.dumps(data))
+    with pytest.raises(KeyStoreError):
+        load_api_key(loc=loc, passphrase=lambda: "senha")
+
+
+def test_setup_rejects_invalid_kdf_cost() -> None:
+    import argparse
+
+    from gpt_secure_setup import kdf_cost
+
+    assert kdf_cost("1024") == 1024
+    for bad in ("1000", "1", "0", "x"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            kdf_cost(bad)
+
+
+def test_print_key_honours_configured_agent_ttl(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    import gpt_secure_setup
+    from chatgpt_cli import settings
+
+    ttls: List[float] = []
+
+    def fake_load(**kw: Any) -> str:
+        ttls.append(kw["agent_ttl"])
+        return "sk-gui"
+
+    config = tmp_path / "config"
+    monkeypatch.setattr(gpt_secure_setup, "CONFIG_PATH", config)
+    monkeypatch.setattr(gpt_secure_setup, "STATE_DIR", tmp_path / "state")
+    monkeypatch.setattr(gpt_secure_setup, "load_api_key", fake_load)
+    settings._memo.clear()
+    config.write_text("KEY_AGENT_TTL=0\n")
+    gpt_secure_setup.print_key(from_stdin=True)
+    config.write_text("KEY_AGENT_TTL=120\n")
+    gpt_secure_setup.print_key(from_stdin=True)
+    settings._memo.clear()
+    assert ttls == [0.0, 120.0]
+    assert capsys.readouterr().out == "sk-gui\nsk-gui\n"
+
+
+def test_key_unattended_needs_plain_file_or_agent(tmp_path: Path) -> None:
+    plain = KeyLocation(base_dir=tmp_path / "plain")
+    save_api_key("sk-texto", loc=plain)
+    assert key_unattended(loc=plain)
+    sealed = KeyLocation(base_dir=tmp_path / "sealed")
+    save_api_key("sk-segredo", loc=sealed, passphrase="senha", kdf=KdfParams(n=1 << 10))
+    assert not key_unattended(loc=sealed)
+    assert not key_unattended(loc=sealed, agent=tmp_path / "sem-agente.sock")
+    assert not key_unattended(loc=KeyLocation(base_dir=tmp_path / "ausente"))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from chatgpt_cli.sessions import SessionStore, locked_file
+
+
+def _msgs(n: int) -> list:
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"} for i in range(n)]
+
+
+def test_save_appends_only_new_turns(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path)
+    store.save("s", _msgs(2))
+    path = store.path("s")
+    before = path.read_bytes()
+    store.save("s", _msgs(4))
+    after = path.read_bytes()
+    assert after.startswith(before)
+    assert after.count(b"\n") == 4
+    assert SessionStore(tmp_path).load("s") == _msgs(4)
+
+
+def test_divergent_history_truncates_and_compacts(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path, compact_min_dead=4)
+    store.save("s", _msgs(4))
+    edited = _msgs(2) + [{"role": "user", "content": "outro"}]
+    store.save("s", edited)
+    assert SessionStore(tmp_path).load("s") == edited
+    lines = store.path("s").read_text(encoding="utf-8").splitlines()
+    # 4 mensagens, 1 truncate e 1 nova; ainda abaixo do limiar de compactação.
+    assert len(lines) == 6
+    store.save("s", _msgs(1))
+    assert len(store.path("s").read_text(encoding="utf-8").splitlines()) == 1
+    assert SessionStore(tmp_path).load("s") == _msgs(1)
+
+
+def test_torn_last_record_is_recovered(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path)
+    store.save("s", _msgs(2))
+    with open(store.path("s"), "ab") as f:
+        f.write(b'{"m": {"role": "user", "cont')
+    fresh = SessionStore(tmp_path)
+    assert fresh.load("s") == _msgs(2)
+    fresh.save("s", _msgs(3))
+    assert SessionStore(tmp_path).load("s") == _msgs(3)
+
+
+def test_legacy_json_session_is_migrated(tmp_path: Path) -> None:
+    (tmp_path / "antiga.json").write_text(json.dumps(_msgs(3)), encoding="utf-8")
+    store = SessionStore(tmp_path)
+    assert store.load("antiga") == _msgs(3)
+    assert not (tmp_path / "antiga.json").exists()
+    assert store.path("antiga").exists()
+    assert store.delete("antiga")
+    assert not store.exists("antiga")
+
+
+def test_compact_keeps_appends_from_other_process(tmp_path: Path) -> None:
+    ours, other = SessionStore(tmp_path), SessionStore(tmp_path)
+    ours.save("s", _msgs(2))
+    other.save("s", _msgs(4))  # outro processo acrescentou depois do nosso load
+    ours.compact("s")
+    assert SessionStore(tmp_path).load("s") == _msgs(4)
+
+
+def test_append_waiting_on_compaction_goes_to_new_file(tmp_path: Path) -> None:
+    store = SessionStore(tmp_path)
+    store.save("s", _msgs(2))
+    path = store.path("s")
+    with locked_file(path, os.O_RDWR):
+        writer = threading.Thread(target=SessionStore._append, args=(path, [{"m": {"content": "x"}}]))
+        writer.start()
+        time.sleep(0.1)
+        tmp = path.with_name("novo.tmp")
+        tmp.write_bytes(path.read_bytes())
+        os.replace(tmp, path)  # como uma compactação
+    writer.join(2)
+    assert SessionStore(tmp_path).load("s")[-1] == {"content": "x"}
+
+
+def test_replay_rereads_torn_tail_under_lock(tmp_path: Path) -> None:
+    path = tmp_path / "s.jsonl"
+    record = json.dumps({"m": {"content": "completo"}}).encode()
+    path.write_bytes(record[:10])
+    result: list = []
+    with locked_file(path, os.O_RDWR) as fd:
+        reader = threading.Thread(target=lambda: result.append(SessionStore(tmp_path).load("s")))
+        reader.start()
+        time.sleep(0.1)
+        os.pwrite(fd, record[10:] + b"\n", 10)  # o outro processo termina o append
+    reader.join(2)
+    assert result == [[{"content": "completo"}]]
+
+
+def test_load_session_ignores_malformed_truncate(tmp_path: Path, monkeypatch) -> None:
+    import chatgpt_cli
+
+    monkeypatch.setattr(chatgpt_cli, "SESSIONS_DIR", tmp_path)
+    (tmp_path / "s.jsonl").write_text('{"m": {"content": "a"}}\n{"truncate": null}\n')
+    assert chatgpt_cli.load_session("s") == []
@@ -0,0 +1,64 @@
+import json
+import os
+import shlex
+from pathlib import Path
+
+import pytest
+
+import chatgpt_cli
+from chatgpt_cli import settings as settings_mod
+from chatgpt_cli.settings import Settings, load_settings, parse_config_text
+
+
+@pytest.fixture(autouse=True)
+def _clear_memo() -> None:
+    settings_mod._memo.clear()
+
+
+def test_parse_config_text_accepts_common_forms() -> None:
+    raw, malformed = parse_config_text(
+        '# comentário\n; outro\nMODEL="gpt-4o"\nTEMP = 0.3\nGH_REPO: dono/repo\nsem-separador\n'
+    )
+    assert raw == {"MODEL": "gpt-4o", "TEMP": "0.3", "GH_REPO": "dono/repo"}
+    assert malformed == ["sem-separador"]
+
+
+def test_invalid_values_fall_back_to_defaults() -> None:
+    s = Settings.from_raw({"REQUEST_TIMEOUT": "abc", "POOL_SIZE": "0", "RESPONSE_CACHE": "yes", "X": "1"})
+    assert s.request_timeout == settings_mod.DEFAULT_REQUEST_TIMEOUT
+    assert s.pool_size == 1 and s.response_cache is True
+    assert s.raw["X"] == "1"
+
+
+def test_snapshot_cached_by_mtime_and_size(tmp_path: Path, monkeypatch) -> None:
+    config = tmp_path / "config"
+    config.write_text("MODEL=gpt-4o\n")
+    state = tmp_path / "state"
+    assert load_settings(config, state).model == "gpt-4o"
+    cache = json.loads((state / settings_mod.CACHE_NAME).read_text())
+    assert cache["raw"] == {"MODEL": "gpt-4o"}
+
+    # Outro processo: sem memo, o JSON basta e o arquivo não é relido.
+    settings_mod._memo.clear()
+    monkeypatch.setattr(settings_mod, "parse_config_text", lambda text: pytest.fail("reparse"))
+    assert load_settings(config, state).model == "gpt-4o"
+    monkeypatch.undo()
+
+    st = config.stat()
+    config.write_text("MODEL=gpt-4.1\n")
+    os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns))  # mesmo mtime, tamanho diferente
+    assert load_settings(config, state).model == "gpt-4.1"
+
+
+def test_as_env_is_shell_safe_and_matches_cli(tmp_path: Path, monkeypatch, capsys) -> None:
+    config = tmp_path / "config"
+    config.write_text("GH_REPO=a'b; rm -rf /\nMETRICS_LOG=on\n")
+    monkeypatch.setattr(chatgpt_cli, "CONFIG_PATH", config)
+    monkeypatch.setattr(chatgpt_cli, "STATE_DIR", tmp_path / "state")
+    monkeypatch.setattr("sys.argv", ["gpt", "--print-config", "--format=env"])
+    with pytest.raises(SystemExit) as exc:
+        chatgpt_cli.main()
+    assert exc.value.code == 0
+    env = dict(shlex.split(line)[0].split("=", 1) for line in capsys.readouterr().out.splitlines())
+    assert env["GH_REPO"] == "a'b; rm -rf /"
+    assert env["METRICS_LOG"] == "1" and env["MODEL"] == "gpt-4o-mini"
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+from typing import List
+
+from chatgpt_cli.sse import SSEParser, iter_deltas
+
+
+def _event(text: str) -> bytes:
+    return b"data: " + json.dumps({"choices": [{"delta": {"content": text}}]}, ensure_ascii=False).encode("utf-8") + b"\n\n"
+
+
+def _split(data: bytes, size: int) -> List[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_iter_deltas_handles_any_chunk_boundary() -> None:
+    wire = _event("olá") + _event(" 🌍") + b"data: [DONE]\n\n" + _event("depois")
+    for size in range(1, len(wire) + 1):
+        # Blocos de 1 byte partem "á" e o emoji no meio da sequência UTF-8.
+        assert "".join(iter_deltas(_split(wire, size))) == "olá 🌍"
+
+
+def test_parser_joins_multiline_data_and_reads_fields() -> None:
+    parser = SSEParser()
+    wire = b": keep-alive\r\nevent: delta\r\nid: 7\r\ndata: {\"a\":\r\ndata: 1}\r\n\r\nretry: 1500\n\n"
+    events = parser.feed(wire[:10]) + parser.feed(wire[10:])
+    assert len(events) == 1
+    assert json.loads(events[0].data) == {"a": 1}
+    assert events[0].event == "delta"
+    assert events[0].id == "7"
+    assert parser.retry == 1500
+
+
+def test_close_dispatches_trailing_event_without_blank_line() -> None:
+    parser = SSEParser()
+    assert parser.feed(b"data: x") == []
+    (event,) = parser.close()
+    assert event.data == b"x"
+
+
+def test_iter_deltas_skips_invalid_json_and_empty_deltas() -> None:
+    wire = b"data: {bad\n\n" + b'data: {"choices":[{"delta":{}}]}\n\n' + _event("ok")
+    assert list(iter_deltas([wire])) == ["ok"]
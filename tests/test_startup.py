@@ -0,0 +1,86 @@
+"""Orçamento de inicialização medido com ``python -X importtime``.
+
+Os comandos locais mais comuns não devem importar a pilha HTTP
+(``requests``/``urllib3``), nem o ``sqlite3`` quando não tocam o histórico.
+O orçamento em milissegundos pode ser relaxado em máquinas lentas via
+``CHATGPT_CLI_STARTUP_BUDGET_MS``.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = float(os.environ.get("CHATGPT_CLI_STARTUP_BUDGET_MS", "150"))
+HTTP_STACK = ("requests", "urllib3", "http.client")
+
+
+def _importtime(args: List[str], home: Path) -> Tuple[Dict[str, int], str]:
+    """Executa o Python com ``-X importtime``; retorna ``{módulo: µs acumulados}``."""
+    env = os.environ.copy()
+    env.update(HOME=str(home), PYTHONPATH=str(REPO_ROOT), OPENAI_API_KEY="k")
+    env.pop("PYTHONSTARTUP", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=home,
+    )
+    modules: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            modules[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # cabeçalho
+    return modules, proc.stdout
+
+
+def _package_ms(modules: Dict[str, int]) -> float:
+    return sum(us for name, us in modules.items() if name == "chatgpt_cli") / 1000
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["-c", "import chatgpt_cli"],
+        ["-m", "chatgpt_cli", "--clear-session", "inexistente"],
+        ["-m", "chatgpt_cli", "--history", "search", "nada"],
+        ["-m", "chatgpt_cli", "--help"],
+    ],
+)
+def test_local_commands_skip_http_stack(args: List[str], tmp_path: Path) -> None:
+    modules, _ = _importtime(args, tmp_path)
+    assert "chatgpt_cli" in modules
+    loaded = [m for m in HTTP_STACK if m in modules]
+    assert not loaded, f"pilha HTTP importada sem requisição: {loaded}"
+    assert _package_ms(modules) < BUDGET_MS
+
+
+def test_clear_session_fast_path_skips_argparse(tmp_path: Path) -> None:
+    modules, out = _importtime(
+        ["-m", "chatgpt_cli", "--clear-session", "inexistente"], tmp_path
+    )
+    assert "Sessão 'inexistente' não encontrada." in out
+    assert "argparse" not in modules
+    assert "sqlite3" not in modules
+
+
+def test_clear_session_ignores_invalid_backend(tmp_path: Path) -> None:
+    config = tmp_path / ".config/chatgpt-cli/config"
+    config.parent.mkdir(parents=True)
+    config.write_text("API_BACKEND=inexistente\n", encoding="utf-8")
+    # ``--no-daemon`` leva ao caminho completo, fora de ``_fast_path``.
+    _, out = _importtime(
+        ["-m", "chatgpt_cli", "--clear-session", "inexistente", "--no-daemon"], tmp_path
+    )
+    assert "Sessão 'inexistente' não encontrada." in out
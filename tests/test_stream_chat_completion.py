@@ -1,13 +1,15 @@
 import json
 from contextlib import redirect_stdout
 from io import StringIO
-from typing import Any, Dict, Iterator, List
+from typing import Any, Dict, Iterator, List, Optional
 
 import requests
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
+import chatgpt_cli
 from chatgpt_cli import Config, stream_chat_completion
 
 
@@ -27,6 +29,14 @@ class FakeResponse:
         for line in self._lines:
             yield line.encode("utf-8")
 
+    def iter_content(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        # Reconstrói o fluxo SSE como trafega na rede (eventos separados por
+        # linha em branco) e o entrega em blocos arbitrários.
+        wire = "".join(line + "\n\n" for line in self._lines).encode("utf-8")
+        step = chunk_size or 5
+        for i in range(0, len(wire), step):
+            yield wire[i : i + step]
+
 
 def old_stream_chat_completion(
     api_key: str, payload: Dict[str, Any], timeout: float,
@@ -81,7 +91,9 @@ def test_stream_chat_completion_equivalence(monkeypatch) -> None:
         old_result: str = old_stream_chat_completion("key", {}, 0.0)
     old_print: str = old_out.getvalue()
 
-    monkeypatch.setattr(requests, "post", fake_post_new)
+    monkeypatch.setattr(
+        chatgpt_cli, "get_session", lambda: SimpleNamespace(post=fake_post_new)
+    )
     with redirect_stdout(StringIO()) as new_out:
         new_result: str = stream_chat_completion(
             "key", [], Config(model="m", temperature=0.0), 0.0,
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+
+import chatgpt_cli
+from chatgpt_cli.output import BufferedSink
+from chatgpt_cli.telemetry import Telemetry, aggregate, percentile
+
+
+def test_disabled_telemetry_records_nothing() -> None:
+    telemetry = Telemetry()
+    with telemetry.span("etapa") as s:
+        s.set(x=1)
+    assert telemetry.spans == []
+    telemetry.enable()
+    with telemetry.span("etapa", arquivo="a.txt") as s:
+        s.set(x=1)
+    assert [(sp.name, sp.attrs) for sp in telemetry.spans] == [
+        ("etapa", {"arquivo": "a.txt", "x": 1})
+    ]
+    assert telemetry.spans[0].ms >= 0
+
+
+def test_aggregate_percentiles() -> None:
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+    assert percentile([10.0, 20.0], 90) == pytest.approx(19.0)
+    records = [
+        {"total_ms": float(i), "spans": [{"name": "stream", "ms": float(i), "first_delta_ms": 1.0}]}
+        for i in range(1, 101)
+    ]
+    summary = aggregate(records)
+    assert summary["stream"]["n"] == 100
+    assert summary["stream"]["p50"] == pytest.approx(50.5)
+    assert summary["stream"]["p99"] == pytest.approx(99.01)
+    assert summary["stream.first_delta_ms"]["p90"] == 1.0
+
+
+def test_main_timings_and_metrics_log(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: Any
+) -> None:
+    config = tmp_path / "config"
+    config.write_text('METRICS_LOG="1"\n', encoding="utf-8")
+    monkeypatch.setattr(chatgpt_cli, "CONFIG_PATH", config)
+    monkeypatch.setattr(chatgpt_cli, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(chatgpt_cli, "SESSIONS_DIR", tmp_path / "sessions")
+    monkeypatch.setattr(chatgpt_cli, "METRICS_FILE", tmp_path / "metrics.jsonl")
+    monkeypatch.setattr(chatgpt_cli, "DAEMON_SOCKET", tmp_path / "daemon.sock")
+    monkeypatch.setenv("OPENAI_API_KEY", "k")
+    monkeypatch.setattr(chatgpt_cli, "select_sink", lambda **_: BufferedSink(sys.stdout))
+
+    def fake_deltas(*a: Any) -> Iterator[str]:
+        yield "um "
+        yield "dois"
+
+    monkeypatch.setattr(chatgpt_cli, "iter_chat_deltas", fake_deltas)
+    monkeypatch.setattr(sys, "argv", ["gpt", "--timings", "--session", "s", "oi"])
+    chatgpt_cli.main()
+    err = capsys.readouterr().err
+    assert "Tempos (ms):" in err
+    assert "deltas=2" in err
+    for name in ("read_config", "stream_chat_completion", "save_session", "append_history"):
+        assert name in err
+    lines: List[Any] = [
+        json.loads(line) for line in (tmp_path / "metrics.jsonl").read_text().splitlines()
+    ]
+    assert len(lines) == 1
+    names = [s["name"] for s in lines[0]["spans"]]
+    assert "stream_chat_completion" in names and lines[0]["session"] is True
+
+    monkeypatch.setattr(sys, "argv", ["gpt", "--timings-report"])
+    with pytest.raises(SystemExit):
+        chatgpt_cli.main()
+    report = capsys.readouterr().out
+    assert "stream_chat_completion.first_delta_ms" in report
+    assert len((tmp_path / "metrics.jsonl").read_text().splitlines()) == 1
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+import pytest
+
+from chatgpt_cli import transport
+from chatgpt_cli.transport import TransportConfig
+
+
+@pytest.fixture(autouse=True)
+def reset_session() -> Iterator[None]:
+    transport.close_session()
+    yield
+    transport.configure_transport(TransportConfig())
+    transport.close_session()
+
+
+def test_transport_config_from_dict_parses_and_falls_back() -> None:
+    cfg = TransportConfig.from_dict(
+        {"POOL_SIZE": "8", "MAX_RETRIES": "abc", "RETRY_BACKOFF": "-1"}
+    )
+    assert cfg.pool_size == 8
+    assert cfg.max_retries == transport.DEFAULT_MAX_RETRIES
+    assert cfg.retry_backoff == 0.0
+
+
+def test_get_session_is_shared_and_pooled() -> None:
+    transport.configure_transport(TransportConfig(pool_size=7, max_retries=3))
+    session = transport.get_session()
+    assert transport.get_session() is session
+    adapter = session.get_adapter(transport.api_url("files"))
+    assert adapter._pool_maxsize == 7
+    assert adapter.max_retries.total == 3
+    assert 429 in adapter.max_retries.status_forcelist
+
+
+def test_configure_transport_recreates_session_on_change() -> None:
+    first = transport.get_session()
+    transport.configure_transport(TransportConfig())
+    assert transport.get_session() is first
+    transport.configure_transport(TransportConfig(pool_size=2))
+    assert transport.get_session() is not first
+
+
+def test_post_is_not_retried_after_server_errors() -> None:
+    retry = transport.get_session().get_adapter(transport.api_url("files")).max_retries
+    assert retry.is_retry("GET", 500) and retry.is_retry("DELETE", 502)
+    assert not retry.is_retry("POST", 500) and not retry.is_retry("POST", 503)
+    assert retry.is_retry("POST", 429)
+    assert retry.is_retry("POST", 503, has_retry_after=True)
+    assert not retry.new().is_retry("POST", 502)  # a política sobrevive a cada tentativa
+
+
+def test_session_without_status_retries_is_separate() -> None:
+    shared = transport.get_session()
+    paced = transport.get_session(status_retries=False)
+    assert paced is not shared and transport.get_session(status_retries=False) is paced
+    retry = paced.get_adapter(transport.api_url("files")).max_retries
+    assert retry.status == 0 and not retry.is_retry("DELETE", 429, has_retry_after=True)
+    assert retry.connect == transport.DEFAULT_MAX_RETRIES
@@ -0,0 +1,132 @@
+import io
+import json
+import re
+import urllib.error
+import urllib.request
+from email.message import Message
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from chatgpt_cli import update_check
+from chatgpt_cli.update_check import ConfigError, check_for_update, is_newer, update_settings
+
+RELEASE_URL = "https://api.github.com/repos/dono/repo/releases/latest"
+
+
+class _Response(io.BytesIO):
+    def __init__(self, data: bytes, headers: Dict[str, str]) -> None:
+        super().__init__(data)
+        self.headers = Message()
+        for k, v in headers.items():
+            self.headers[k] = v
+
+
+def _server(monkeypatch: pytest.MonkeyPatch, bodies: Dict[str, bytes], etag: str = '"r1"') -> List[Dict[str, str]]:
+    """Servidor falso que responde 304 quando ``If-None-Match`` coincide."""
+    seen: List[Dict[str, str]] = []
+
+    def urlopen(request, timeout=None):  # type: ignore[no-untyped-def]
+        headers = dict(request.header_items())
+        seen.append(headers)
+        if request.full_url not in bodies:
+            raise urllib.error.URLError("offline")
+        if headers.get("If-none-match") == etag:
+            raise urllib.error.HTTPError(request.full_url, 304, "not modified", Message(), None)
+        return _Response(bodies[request.full_url], {"ETag": etag})
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    return seen
+
+
+def _config(tmp_path: Path, text: str) -> Path:
+    path = tmp_path / "config"
+    path.write_text(text)
+    return path
+
+
+def test_version_ordering() -> None:
+    assert is_newer("v1.10.0", "1.9.2")
+    assert is_newer("2.0", "1.99")
+    assert not is_newer("1.2.0", "1.2.0")
+    assert not is_newer("v1.2", "1.2")
+    assert is_newer("1.0rc", "1.0")
+
+
+def test_update_settings_falls_back_to_env_and_validates_lines(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("GH_REPO", "env/repo")
+    monkeypatch.setenv("UPDATE_URL", "https://env.example")
+    monkeypatch.delenv("UPDATE_CHECK_TTL", raising=False)
+    cfg = update_settings(_config(tmp_path, '# c\nMODEL="x"\nGH_REPO="dono/repo"\nUPDATE_CHECK_TTL=60\n'))
+    assert (cfg.gh_repo, cfg.update_url, cfg.update_check_ttl) == ("dono/repo", "https://env.example", 60.0)
+    assert cfg.model == "x"
+    with pytest.raises(ConfigError, match="Linha malformada"):
+        update_settings(_config(tmp_path, "BADLINE\n"))
+
+
+@pytest.mark.parametrize("line", ["GH_REPO = dono/repo", "GH_REPO: dono/repo", "; comentário", " GH_REPO=dono/repo"])
+def test_update_settings_keeps_the_script_strictness(tmp_path: Path, line: str) -> None:
+    # O resto da CLI aceita estas formas; a verificação de versões, não.
+    with pytest.raises(ConfigError, match=f"Linha malformada em .*: {re.escape(line)}$"):
+        update_settings(_config(tmp_path, f"{line}\n"))
+
+
+def test_update_settings_strips_single_quotes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("UPDATE_URL", raising=False)
+    cfg = update_settings(_config(tmp_path, "GH_REPO='dono/repo'\n"))
+    assert cfg.gh_repo == "dono/repo"
+
+
+def test_github_check_uses_ttl_and_conditional_requests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("UPDATE_URL", raising=False)
+    release = {
+        "tag_name": "v2.0.0",
+        "assets": [
+            {"browser_download_url": "https://x/outro.zip"},
+            {"browser_download_url": "https://x/chatgpt-cli-secure.tar.gz"},
+        ],
+    }
+    seen = _server(monkeypatch, {RELEASE_URL: json.dumps(release).encode()})
+    config = _config(tmp_path, "GH_REPO=dono/repo\n")
+    state = tmp_path / "state"
+
+    first = check_for_update(config, state, current="1.5.0")
+    assert (first.has_update, first.new_version, first.new_url) == (True, "v2.0.0", "https://x/chatgpt-cli-secure.tar.gz")
+    assert first.machine_lines()[0] == "HAS_UPDATE=1"
+    assert first.message == "Verificação via GitHub." and not first.cached
+    assert "If-none-match" not in seen[0]
+
+    second = check_for_update(config, state, current="1.5.0")
+    assert second.cached and second.has_update and len(seen) == 1
+
+    third = check_for_update(config, state, current="2.0.0", force=True)
+    assert seen[-1]["If-none-match"] == '"r1"'
+    assert not third.has_update and not third.cached
+    assert "TAG=v2.0.0" in (state / "github_release.cache").read_text()
+
+
+def test_url_check_and_network_errors(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("GH_REPO", raising=False)
+    _server(monkeypatch, {"https://dl.example/version.txt": b"3.1\n"})
+    state = tmp_path / "state"
+    result = check_for_update(_config(tmp_path, 'UPDATE_URL="https://dl.example/"\n'), state, current="3.0")
+    assert result.new_url == "https://dl.example/chatgpt-cli-secure.tar.gz"
+    assert result.new_version == "3.1" and result.source == "url"
+
+    offline = check_for_update(_config(tmp_path, "UPDATE_URL=https://off.example\n"), state, current="3.0")
+    assert not offline.has_update
+    assert offline.message == "Erro ao obter cabeçalhos em URL."
+    assert "HAS_UPDATE=0" in offline.machine_lines()
+
+
+def test_main_reports_malformed_config(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(update_check, "CONFIG_PATH", _config(tmp_path, "BADLINE\n"))
+    with pytest.raises(SystemExit) as exc:
+        update_check.main(["--machine-read"])
+    assert exc.value.code == 1
+    assert "Linha malformada" in capsys.readouterr().err
@@ -1,17 +1,30 @@
 import os
 import tarfile
-import shutil
 import io
+import json
 from pathlib import Path
-from typing import Dict
-import subprocess
+import urllib.error
 import urllib.request
 import sys
+from email.message import Message
+from typing import Dict, List, Optional
 
 import pytest
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
-from update_strategies import FileStrategy, GitHubStrategy, URLStrategy, _safe_extract
+import update_strategies
+from chatgpt_cli import update_check
+from update_strategies import (
+    DeltaStrategy,
+    FileStrategy,
+    GitHubStrategy,
+    URLStrategy,
+    _safe_extract,
+    build_manifest,
+    download,
+    extract_archive,
+    sha256_file,
+)
 
 
 def _create_package(tmp_dir: Path, script: str) -> Path:
@@ -26,6 +39,40 @@ def _create_package(tmp_dir: Path, script: str) -> Path:
     return tar_path
 
 
+class _FakeHTTPResponse(io.BytesIO):
+    def __init__(self, data: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(data)
+        self.status = status
+        self.headers = Message()
+        for k, v in (headers or {}).items():
+            self.headers[k] = v
+
+
+def _fake_urlopen(files: Dict[str, Path], seen: Optional[List[Dict[str, str]]] = None, etag: str = '"v1"'):
+    """``urlopen`` que serve ``files`` e respeita ``Range``/``If-Range``."""
+
+    def urlopen(request, timeout=None):  # type: ignore[no-untyped-def]
+        url = request if isinstance(request, str) else request.full_url
+        headers = {} if isinstance(request, str) else dict(request.header_items())
+        if seen is not None:
+            seen.append(headers)
+        if url not in files:
+            raise urllib.error.HTTPError(url, 404, "not found", Message(), None)
+        data = files[url].read_bytes()
+        rng = headers.get("Range")
+        if rng and headers.get("If-range", etag) == etag:
+            start = int(rng.split("=")[1].rstrip("-"))
+            if start >= len(data):
+                raise urllib.error.HTTPError(url, 416, "range", Message(), None)
+            content_range = f"bytes {start}-{len(data) - 1}/{len(data)}"
+            return _FakeHTTPResponse(
+                data[start:], 206, {"ETag": etag, "Content-Range": content_range}
+            )
+        return _FakeHTTPResponse(data, 200, {"ETag": etag})
+
+    return urlopen
+
+
 def _sha256(path: Path) -> str:
     import hashlib
 
@@ -53,21 +100,17 @@ def test_url_strategy_downloads_and_installs(tmp_path: Path, monkeypatch: pytest
     url = "https://example.com/pkg.tar"
     files: Dict[str, Path] = {url: tar_path, url + ".sha256": sha_path}
 
-    def fake_urlretrieve(link: str, filename: str, *args, **kwargs):
-        shutil.copy(files[link], filename)
-        return filename, None
-
-    monkeypatch.setattr(urllib.request, "urlretrieve", fake_urlretrieve)
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen(files))
     out = tmp_path / "out.txt"
     os.environ["OUTPUT"] = str(out)
     try:
-        URLStrategy(url).run()
+        URLStrategy(url, download_dir=tmp_path / "dl").run()
     finally:
         os.environ.pop("OUTPUT")
     assert out.read_text().strip() == "ok"
 
 
-def test_github_strategy_uses_check_script(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+def test_github_strategy_uses_update_check(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
     tar_path = _create_package(tmp_path, "#!/bin/bash\necho ok > \"$OUTPUT\"\n")
     sha = _sha256(tar_path)
     sha_path = tmp_path / "pkg.tar.sha256"
@@ -75,19 +118,15 @@ def test_github_strategy_uses_check_script(tmp_path: Path, monkeypatch: pytest.M
     url = "https://example.com/pkg.tar"
     files: Dict[str, Path] = {url: tar_path, url + ".sha256": sha_path}
 
-    def fake_urlretrieve(link: str, filename: str, *args, **kwargs):
-        shutil.copy(files[link], filename)
-        return filename, None
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen(files))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    calls: List[bool] = []
 
-    monkeypatch.setattr(urllib.request, "urlretrieve", fake_urlretrieve)
-    real_run = subprocess.run
+    def fake_check(force: bool = False, **kwargs):  # type: ignore[no-untyped-def]
+        calls.append(force)
+        return update_check.UpdateCheck("1.0", has_update=True, new_version="2.0", new_url=url)
 
-    def fake_run(cmd, *args, **kwargs):
-        if "--machine-read" in cmd:
-            return subprocess.CompletedProcess(cmd, 0, stdout=f"HAS_UPDATE=1\nNEW_URL={url}\n", stderr="")
-        return real_run(cmd, *args, **kwargs)
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
+    monkeypatch.setattr(update_check, "check_for_update", fake_check)
     out = tmp_path / "out.txt"
     os.environ["OUTPUT"] = str(out)
     try:
@@ -95,6 +134,7 @@ def test_github_strategy_uses_check_script(tmp_path: Path, monkeypatch: pytest.M
     finally:
         os.environ.pop("OUTPUT")
     assert out.read_text().strip() == "ok"
+    assert calls == [True]
 
 
 def test_safe_extract_detects_path_traversal(tmp_path: Path) -> None:
@@ -107,3 +147,251 @@ def test_safe_extract_detects_path_traversal(tmp_path: Path) -> None:
     with tarfile.open(tar_path) as tar:
         with pytest.raises(ValueError):
             _safe_extract(tar, tmp_path)
+
+
+def _tar_gz(path: Path, members: Dict[str, bytes], link: Optional[str] = None) -> Path:
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o4755 if name.endswith(".sh") else 0o666
+            tar.addfile(info, io.BytesIO(data))
+        if link:
+            info = tarfile.TarInfo(link)
+            info.type = tarfile.SYMTYPE
+            info.linkname = "/etc/passwd"
+            tar.addfile(info)
+    return path
+
+
+def test_extract_archive_swaps_staging_into_place(tmp_path: Path) -> None:
+    archive = _tar_gz(tmp_path / "rel.tar.gz", {"pkg/install.sh": b"#!/bin/sh\n", "pkg/a/b.txt": b"b"})
+    dest = tmp_path / "out" / "release"
+    dest.mkdir(parents=True)
+    (dest / "velho.txt").write_text("x")
+    extract_archive(archive, dest)
+    assert sorted(p.relative_to(dest).as_posix() for p in dest.rglob("*")) == [
+        "pkg",
+        "pkg/a",
+        "pkg/a/b.txt",
+        "pkg/install.sh",
+    ]
+    assert (dest / "pkg" / "install.sh").stat().st_mode & 0o7777 == 0o755
+    assert (dest / "pkg" / "a" / "b.txt").stat().st_mode & 0o777 == 0o644
+    assert [p.name for p in dest.parent.iterdir()] == ["release"]
+
+
+def test_extract_archive_rejects_links_without_touching_dest(tmp_path: Path) -> None:
+    archive = _tar_gz(tmp_path / "bad.tar.gz", {"pkg/ok.txt": b"ok"}, link="pkg/passwd")
+    dest = tmp_path / "out" / "release"
+    dest.mkdir(parents=True)
+    (dest / "velho.txt").write_text("x")
+    with pytest.raises(ValueError, match="Unsupported archive member"):
+        extract_archive(archive, dest)
+    assert [p.name for p in dest.iterdir()] == ["velho.txt"]
+    assert [p.name for p in dest.parent.iterdir()] == ["release"]
+
+
+def test_safe_extract_refuses_symlinked_parent(tmp_path: Path) -> None:
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    (dest / "sub").symlink_to(outside)
+    archive = _tar_gz(tmp_path / "rel.tar.gz", {"sub/x.txt": b"x"})
+    with tarfile.open(archive, "r|*") as tar:
+        with pytest.raises(ValueError, match="Path traversal"):
+            _safe_extract(tar, dest)
+    assert list(outside.iterdir()) == []
+
+
+def test_sha256_file_matches_whole_read(tmp_path: Path) -> None:
+    path = tmp_path / "big.bin"
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    assert sha256_file(path, chunk_size=4096) == _sha256(path)
+
+
+def test_download_resumes_with_range(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    src = tmp_path / "pkg.tar"
+    src.write_bytes(os.urandom(200_000))
+    url = "https://example.com/pkg.tar"
+    seen: List[Dict[str, str]] = []
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen({url: src}, seen))
+    dest = tmp_path / "dl" / "pkg.tar"
+    dest.parent.mkdir()
+    # Tentativa anterior interrompida: 50 KB já baixados com o mesmo ETag.
+    dest.with_name("pkg.tar.part").write_bytes(src.read_bytes()[:50_000])
+    dest.with_name("pkg.tar.validator").write_text('"v1"')
+    digest, stats = download(url, dest, chunk_size=8192)
+    assert digest == _sha256(src)
+    assert dest.read_bytes() == src.read_bytes()
+    assert seen[0]["Range"] == "bytes=50000-"
+    assert (stats.resumed_from, stats.received) == (50_000, 150_000)
+    assert "resumed" in stats.report()
+    assert not dest.with_name("pkg.tar.part").exists()
+
+
+def test_download_restarts_when_file_changed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    src = tmp_path / "pkg.tar"
+    src.write_bytes(os.urandom(10_000))
+    url = "https://example.com/pkg.tar"
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen({url: src}, etag='"v2"'))
+    dest = tmp_path / "pkg-dl.tar"
+    dest.with_name("pkg-dl.tar.part").write_bytes(b"stale" * 100)
+    dest.with_name("pkg-dl.tar.validator").write_text('"v1"')
+    digest, stats = download(url, dest)
+    assert digest == _sha256(src) and stats.resumed_from == 0
+    assert dest.read_bytes() == src.read_bytes()
+
+
+def test_url_strategy_keeps_partial_download_on_failure(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    tar_path = _create_package(tmp_path, "#!/bin/bash\nexit 0\n")
+    url = "https://example.com/pkg.tar"
+    real = _fake_urlopen({url: tar_path})
+
+    class _Broken(_FakeHTTPResponse):
+        def read(self, size: int = -1) -> bytes:
+            if self.tell() >= 1024:
+                raise ConnectionResetError("link caiu")
+            return super().read(min(size, 1024))
+
+    def flaky(request, timeout=None):  # type: ignore[no-untyped-def]
+        resp = real(request, timeout)
+        if getattr(request, "full_url", "").endswith(".tar"):
+            return _Broken(resp.getvalue(), resp.status, dict(resp.headers.items()))
+        return resp
+
+    monkeypatch.setattr(urllib.request, "urlopen", flaky)
+    strategy = URLStrategy(url, download_dir=tmp_path / "dl")
+    with pytest.raises(ConnectionResetError):
+        strategy.run()
+    part = strategy._partial_path().with_name(strategy._partial_path().name + ".part")
+    assert part.stat().st_size == 1024
+    monkeypatch.setattr(urllib.request, "urlopen", real)
+    lines: List[str] = []
+    URLStrategy(url, download_dir=tmp_path / "dl", report=lines.append).run()
+    assert "resumed" in lines[0]
+    assert list((tmp_path / "dl").iterdir()) == []
+
+
+def _release(tmp_path: Path) -> Path:
+    release = tmp_path / "release"
+    (release / "chatgpt_cli").mkdir(parents=True)
+    (release / "chatgpt_cli" / "__init__.py").write_text("novo\n")
+    (release / "README.md").write_text("igual\n")
+    (release / "wrappers").mkdir()
+    (release / "wrappers" / "gpt").write_text("#!/bin/sh\necho novo\n")
+    (release / "wrappers" / "gpt").chmod(0o755)
+    (release / "version.txt").write_text("9.9.9\n")
+    return release
+
+
+def _serve_release(release: Path, manifest: Dict[str, object], tmp_path: Path) -> Dict[str, Path]:
+    base = "https://example.com/rel"
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+    files = {f"{base}/{name}": release / name for name in manifest["files"]}  # type: ignore[index]
+    files[f"{base}/manifest.json"] = manifest_path
+    return files
+
+
+def _installed_tree(tmp_path: Path) -> Path:
+    prefix = tmp_path / "prefix"
+    (prefix / "chatgpt_cli").mkdir(parents=True)
+    (prefix / "chatgpt_cli" / "__init__.py").write_text("antigo\n")
+    (prefix / "README.md").write_text("igual\n")
+    (prefix / "obsoleto.py").write_text("x\n")
+    (prefix / "secret.txt").write_text("segredo\n")
+    old = {"files": {"obsoleto.py": {"sha256": "0"}, "README.md": {"sha256": "0"}}}
+    (prefix / ".manifest.json").write_text(json.dumps(old))
+    return prefix
+
+
+def test_build_manifest_skips_caches(tmp_path: Path) -> None:
+    release = _release(tmp_path)
+    (release / "chatgpt_cli" / "__pycache__").mkdir()
+    (release / "chatgpt_cli" / "__pycache__" / "x.pyc").write_bytes(b"")
+    manifest = build_manifest(release)
+    assert manifest["version"] == "9.9.9"
+    assert sorted(manifest["files"]) == ["README.md", "chatgpt_cli/__init__.py", "version.txt", "wrappers/gpt"]
+    assert manifest["files"]["wrappers/gpt"]["mode"] == 0o755
+
+
+def test_delta_strategy_fetches_only_changed_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = _release(tmp_path)
+    files = _serve_release(release, build_manifest(release), tmp_path)
+    seen: List[Dict[str, str]] = []
+    fetched: List[str] = []
+    opener = _fake_urlopen(files, seen)
+
+    def urlopen(request, timeout=None):  # type: ignore[no-untyped-def]
+        fetched.append(request if isinstance(request, str) else request.full_url)
+        return opener(request, timeout)
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    prefix = _installed_tree(tmp_path)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "gpt").write_text("velho")
+    lines: List[str] = []
+    DeltaStrategy("https://example.com/rel/manifest.json", prefix, bin_dir=bin_dir, report=lines.append).run()
+    downloaded = sorted(u.rsplit("/rel/", 1)[1] for u in fetched if not u.endswith((".json", ".sha256")))
+    assert downloaded == ["chatgpt_cli/__init__.py", "version.txt", "wrappers/gpt"]
+    assert (prefix / "chatgpt_cli" / "__init__.py").read_text() == "novo\n"
+    assert not (prefix / "obsoleto.py").exists()
+    assert (prefix / "secret.txt").read_text() == "segredo\n"
+    assert os.access(prefix / "wrappers" / "gpt", os.X_OK)
+    assert (bin_dir / "gpt").read_text() == "#!/bin/sh\necho novo\n"
+    assert json.loads((prefix / ".manifest.json").read_text())["version"] == "9.9.9"
+    assert not [p for p in prefix.iterdir() if p.name.startswith(".update-")]
+    assert "Updated 3 file(s), removed 1, kept 1" in lines[0]
+
+    lines.clear()
+    DeltaStrategy("https://example.com/rel/manifest.json", prefix, report=lines.append).run()
+    assert lines == ["Already up to date (4 files checked)"]
+
+
+def test_delta_strategy_rolls_back_on_failure(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = _release(tmp_path)
+    files = _serve_release(release, build_manifest(release), tmp_path)
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen(files))
+    prefix = _installed_tree(tmp_path)
+    before = {p.relative_to(prefix): p.read_bytes() for p in prefix.rglob("*") if p.is_file()}
+    real_replace = os.replace
+    calls: List[str] = []
+
+    def failing_replace(src, dst):  # type: ignore[no-untyped-def]
+        calls.append(str(dst))
+        if str(dst).endswith("version.txt"):
+            raise OSError("disco cheio")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(update_strategies.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        DeltaStrategy("https://example.com/rel/manifest.json", prefix, report=lambda _: None).run()
+    after = {p.relative_to(prefix): p.read_bytes() for p in prefix.rglob("*") if p.is_file()}
+    assert after == before
+    assert not [p for p in prefix.iterdir() if p.name.startswith(".update-")]
+
+
+def test_delta_strategy_rejects_corrupt_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = _release(tmp_path)
+    manifest = build_manifest(release)
+    manifest["files"]["chatgpt_cli/__init__.py"]["sha256"] = "0" * 64
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen(_serve_release(release, manifest, tmp_path)))
+    prefix = _installed_tree(tmp_path)
+    with pytest.raises(ValueError, match="SHA256 mismatch"):
+        DeltaStrategy("https://example.com/rel/manifest.json", prefix, report=lambda _: None).run()
+    assert (prefix / "chatgpt_cli" / "__init__.py").read_text() == "antigo\n"
+
+
+def test_delta_strategy_masks_manifest_modes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = _release(tmp_path)
+    manifest = build_manifest(release)
+    manifest["files"]["wrappers/gpt"]["mode"] = 0o4777
+    manifest["files"]["chatgpt_cli/__init__.py"]["mode"] = 0o666
+    monkeypatch.setattr(urllib.request, "urlopen", _fake_urlopen(_serve_release(release, manifest, tmp_path)))
+    prefix = _installed_tree(tmp_path)
+    DeltaStrategy("https://example.com/rel/manifest.json", prefix, report=lambda _: None).run()
+    assert (prefix / "wrappers" / "gpt").stat().st_mode & 0o7777 == 0o755
+    assert (prefix / "chatgpt_cli" / "__init__.py").stat().st_mode & 0o7777 == 0o644
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import argparse
+import json
 from pathlib import Path
 from typing import Callable, Dict
 
 from update_strategies import (
+    DeltaStrategy,
     FileStrategy,
     GitHubStrategy,
     UpdateStrategy,
     URLStrategy,
+    build_manifest,
 )
 
 
@@ -18,6 +21,12 @@ def parse_args() -> argparse.Namespace:
     group.add_argument("--from-github", action="store_true", help="Install from GitHub")
     group.add_argument("--from-url", type=str, help="Install from direct URL")
     group.add_argument("--from-file", type=str, help="Install from local file")
+    group.add_argument(
+        "--from-manifest", type=str, help="Update only the files that changed, per a release manifest URL"
+    )
+    group.add_argument(
+        "--write-manifest", type=str, metavar="DIR", help="Print the release manifest for DIR and exit"
+    )
     parser.add_argument("hash", nargs="?", default=None, help="SHA256 hash for --from-file")
     return parser.parse_args()
 
@@ -30,7 +39,11 @@ def main() -> None:
         "from_github": lambda a: GitHubStrategy(),
         "from_url": lambda a: URLStrategy(a.from_url),
         "from_file": lambda a: FileStrategy(Path(a.from_file), a.hash),
+        "from_manifest": lambda a: DeltaStrategy(a.from_manifest),
     }
+    if args.write_manifest:
+        print(json.dumps(build_manifest(Path(args.write_manifest)), indent=2, sort_keys=True))
+        return
     key = next(k for k in factories if getattr(args, k))
     strategy = factories[key](args)
     strategy.run()
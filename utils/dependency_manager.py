@@ -1,51 +1,157 @@
 from __future__ import annotations
 
+import re
 import subprocess
+from dataclasses import dataclass, field
+from importlib import metadata
 from pathlib import Path
-from typing import Iterable
+from typing import Dict, Iterable, Optional, Set
 import tomllib
 
 PYPROJECT = Path(__file__).resolve().parent.parent / "pyproject.toml"
 
+_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_EXTRA_MARKER = re.compile(r"\bextra\s*==")
 
-def _read_dependencies(pyproject_path: Path = PYPROJECT) -> list[str]:
-    """Read project dependencies from pyproject.toml."""
+
+def _normalize(name: str) -> str:
+    """PEP 503 normalized form, so ``Foo_Bar`` and ``foo-bar`` match."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _requirement_name(requirement: str) -> Optional[str]:
+    """Distribution name of a requirement string, or None for extras.
+
+    Requirements guarded by an ``extra == ...`` marker are only installed on
+    request, so they do not make a package "in use". Other markers are not
+    evaluated: keeping such a dependency is the safe answer.
+    """
+    spec, _, marker = requirement.partition(";")
+    if marker and _EXTRA_MARKER.search(marker):
+        return None
+    match = _NAME.match(spec)
+    return _normalize(match.group(1)) if match else None
+
+
+def _read_project(pyproject_path: Path = PYPROJECT) -> dict:
     with pyproject_path.open("rb") as f:
-        data = tomllib.load(f)
-    project = data.get("project", {})
-    return [dep.split(";")[0].strip() for dep in project.get("dependencies", [])]
+        return tomllib.load(f).get("project", {})
+
+
+def _read_dependencies(pyproject_path: Path = PYPROJECT) -> list[str]:
+    """Read project dependency names from pyproject.toml."""
+    names = (_requirement_name(dep) for dep in _read_project(pyproject_path).get("dependencies", []))
+    return [name for name in names if name]
 
-def dependency_in_use(package: str) -> bool:
+
+@dataclass
+class DependencyGraph:
+    """Forward and reverse dependency edges of the installed distributions.
+
+    Built once from ``importlib.metadata`` instead of one ``pip show``
+    subprocess per package; every name is PEP 503 normalized. ``requested``
+    holds the distributions with a ``REQUESTED`` marker, i.e. the ones the
+    user asked pip for by name rather than pulled in as dependencies.
+    """
+
+    requires: Dict[str, Set[str]] = field(default_factory=dict)
+    required_by: Dict[str, Set[str]] = field(default_factory=dict)
+    requested: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_environment(
+        cls, distributions: Optional[Iterable[metadata.Distribution]] = None
+    ) -> "DependencyGraph":
+        graph = cls()
+        for dist in metadata.distributions() if distributions is None else distributions:
+            raw = dist.metadata["Name"]
+            if not raw:
+                continue
+            name = _normalize(raw)
+            if name in graph.requires:
+                continue  # shadowed by an earlier entry on sys.path
+            deps = {dep for dep in map(_requirement_name, dist.requires or []) if dep and dep != name}
+            graph.requires[name] = deps
+            if dist.read_text("REQUESTED") is not None:
+                graph.requested.add(name)
+            for dep in deps:
+                graph.required_by.setdefault(dep, set()).add(name)
+        return graph
+
+    def installed(self, package: str) -> bool:
+        return _normalize(package) in self.requires
+
+    def dependents(self, package: str) -> Set[str]:
+        """Installed packages that require ``package``."""
+        return {d for d in self.required_by.get(_normalize(package), set()) if d in self.requires}
+
+    def in_use(self, package: str, ignoring: Iterable[str] = ()) -> bool:
+        """Whether a package outside ``ignoring`` requires ``package``."""
+        return bool(self.dependents(package) - {_normalize(p) for p in ignoring})
+
+    def uninstall_plan(
+        self, packages: Iterable[str], removing: Iterable[str] = (), transitive: bool = True
+    ) -> list[str]:
+        """Installed packages from ``packages`` that nothing else needs.
+
+        ``removing`` names packages being removed by other means (e.g. the
+        project itself), whose requirements therefore do not count. With
+        ``transitive`` the dependencies of the candidates are considered too,
+        so libraries that only the removed packages needed are included;
+        dependencies the user installed directly (``requested``) are never
+        added this way, even if nothing else requires them anymore. A
+        candidate is dropped whenever a package outside the plan requires it,
+        and the check repeats until nothing changes, since dropping one
+        candidate can keep its own dependencies in use.
+        """
+        gone = {_normalize(p) for p in removing}
+        candidates: Set[str] = set()
+        pending = [_normalize(p) for p in packages]
+        while pending:
+            name = pending.pop()
+            if name in candidates or name in gone or name not in self.requires:
+                continue
+            candidates.add(name)
+            if transitive:
+                pending.extend(dep for dep in self.requires[name] if dep not in self.requested)
+        changed = True
+        while changed:
+            keep = {c for c in candidates if self.dependents(c) - candidates - gone}
+            changed = bool(keep)
+            candidates -= keep
+        return sorted(candidates)
+
+
+def dependency_in_use(package: str, graph: Optional[DependencyGraph] = None) -> bool:
     """Return True if *package* is required by another installed package."""
-    result = subprocess.run(
-        ["pip", "show", package],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if result.returncode != 0:
-        return False
-    for line in result.stdout.splitlines():
-        if line.startswith("Required-by:"):
-            required_by = line.split(":", 1)[1].strip()
-            return bool(required_by and required_by != "None")
-    return False
-
-def remove_dependencies(packages: Iterable[str]) -> None:
+    return (graph or DependencyGraph.from_environment()).in_use(package)
+
+
+def remove_dependencies(
+    packages: Iterable[str],
+    graph: Optional[DependencyGraph] = None,
+    removing: Iterable[str] = (),
+) -> list[str]:
     """Uninstall packages that are not required by others.
 
-    Uninstalls are accumulated and executed in a single ``pip`` call for
-    efficiency.
+    The whole plan, transitive dependencies included, comes from a single
+    ``DependencyGraph`` and the uninstalls are executed in one ``pip`` call.
+    Returns the packages that were passed to ``pip``.
     """
-    unused: list[str] = [pkg for pkg in packages if not dependency_in_use(pkg)]
+    graph = graph or DependencyGraph.from_environment()
+    unused = graph.uninstall_plan(packages, removing=removing)
     if unused:
         subprocess.run(
             ["pip", "uninstall", "--yes", *unused],
             check=False,
         )
+    return unused
+
 
 def main() -> None:
-    remove_dependencies(_read_dependencies())
+    project = _read_project()
+    remove_dependencies(_read_dependencies(), removing=[project.get("name", "")])
+
 
 if __name__ == "__main__":  # pragma: no cover
     main()